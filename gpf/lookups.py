@@ -18,14 +18,35 @@
 This module can be used to build lookup data structures from Esri tables and feature classes.
 
 .. automethod:: gpf.lookups._process_row
+.. automethod:: gpf.lookups._process_batch
 """
 
+import datetime as _dt
+import hashlib as _hashlib
+import heapq as _heapq
+import io as _io
+import math as _math
+import mmap as _mmap
+import os as _os
+import pickle as _pickle
+import struct as _struct
+import sys as _sys
+import time as _time
 import typing as _tp
+import uuid as _uuid
+from collections import Counter as _Counter
+from functools import partial as _partial
+from itertools import islice as _islice
+
+import more_itertools as _iter
+import numpy as _np
 
 import gpf.common.const as _const
 import gpf.common.textutils as _tu
 import gpf.common.validate as _vld
 import gpf.cursors as _cursors
+import gpf.loggers as _log
+import gpf.paths as _paths
 import gpf.tools.geometry as _geo
 import gpf.tools.metadata as _meta
 import gpf.tools.queries as _q
@@ -33,12 +54,64 @@ import gpf.tools.queries as _q
 _DUPEKEYS_ARG = 'duplicate_keys'
 _MUTABLE_ARG = 'mutable_values'
 _ROWFUNC_ARG = 'row_func'
+_BATCHFUNC_ARG = 'batch_func'
+_BATCHSIZE_ARG = 'batch_size'
+_INDEXES_ARG = 'indexes'
+_STORAGE_ARG = 'storage'
+_INTERN_ARG = 'intern_strings'
+_TRACKING_ARG = 'change_tracking'
+_PICKLE_PROTOCOL = 4
+_SQL_DISTINCT = ('DISTINCT', None)
+# SQL date literals by DBMS client name (as returned by the connectionProperties of an enterprise geodatabase).
+# The default (ANSI) literal is used for file and mobile geodatabases and for all other databases.
+_SQL_TIMESTAMP = "TIMESTAMP '{:%Y-%m-%d %H:%M:%S}'"
+_SQL_TIMESTAMPS = {
+    'sqlserver': "'{:%Y-%m-%d %H:%M:%S}'",
+    'oracle': "TO_DATE('{:%Y-%m-%d %H:%M:%S}', 'YYYY-MM-DD HH24:MI:SS')"
+}
+_SQL_IN_LIMIT = 1000
+
+#: Storage option for :class:`RowLookup` values: each row is stored as a separate tuple (or list).
+STORAGE_ROWS = 'rows'
+#: Storage option for :class:`RowLookup` values: each field is stored as a typed (NumPy) array.
+STORAGE_COLUMNAR = 'columnar'
+
+#: Change tracking option for :func:`Lookup.refresh`: uses the editor tracking "last edited at" field.
+TRACK_EDITS = 'edits'
+#: Change tracking option for :func:`Lookup.refresh`: uses the highest Object ID (detects inserts only).
+TRACK_OID = 'oid'
+#: Change tracking option for :func:`Lookup.refresh`: compares the Global IDs (detects inserts only).
+TRACK_GLOBALID = 'globalid'
+_TRACKING_FIELDS = {
+    TRACK_EDITS: _const.DESC_FIELD_EDITED,
+    TRACK_OID: _const.DESC_FIELD_OID,
+    TRACK_GLOBALID: _const.DESC_FIELD_GLOBALID
+}
+
+# Number of coordinates that is collected before they are converted into (unique) node keys
+_BATCH_SIZE = 1000000
+# Default number of rows that is passed to a lookup batch processor function
+_LOOKUP_BATCH_SIZE = 10000
+# Number of rows per chunk of which only the first row is timed when a row processor function is used
+_TIMING_CHUNK = 64
 
 #: The default (Esri-recommended) resolution that is used by the :func:`get_nodekey` function (i.e. for lookups).
 #: If coordinate values fall within this distance, they are considered equal.
 #: Set this to a higher or lower value (coordinate system units) if required.
 XYZ_RESOLUTION = 0.0001
 
+# Bit shift and offset used to pack 2D node keys into a single 64-bit integer (see pack_nodekeys())
+_PACK_SHIFT = 32
+_PACK_OFFSET = 1 << (_PACK_SHIFT - 1)
+_PACK_MASK = (1 << _PACK_SHIFT) - 1
+
+# Per-64-bit-word seeds used to compute geometry fingerprints (see get_fingerprint())
+_FP_SEEDS = (_np.uint64(0x6A09E667F3BCC908), _np.uint64(0xBB67AE8584CAA73B))
+# Node key of a missing Z value, viewed as uint64
+_FP_NO_Z = _np.uint64(1 << 63)
+# Number of geometries for which the vertex arrays are fingerprinted at once
+_FINGERPRINT_BATCH_SIZE = 100000
+
 
 def get_nodekey(*args) -> _tp.Tuple[int]:
     """
@@ -71,7 +144,10 @@ def get_nodekey(*args) -> _tp.Tuple[int]:
 
     :param args:    A minimum of 2 numeric values, an EsriJSON dictionary, an ArcPy Point or PointGeometry instance.
     """
-    return tuple(int(v / XYZ_RESOLUTION) for v in _geo.get_xyz(*args) if v is not None)
+    x, y, z = _geo.get_xyz(*args)
+    if z is None and x is not None and y is not None:
+        return int(x / XYZ_RESOLUTION), int(y / XYZ_RESOLUTION)
+    return tuple(int(v / XYZ_RESOLUTION) for v in (x, y, z) if v is not None)
 
 
 def get_coordtuple(node_key: _tp.Tuple[int]) -> _tp.Tuple[float]:
@@ -90,6 +166,303 @@ def get_coordtuple(node_key: _tp.Tuple[int]) -> _tp.Tuple[float]:
     return tuple((v * XYZ_RESOLUTION) for v in node_key)
 
 
+def get_nodekeys(coords: _tp.Union[_np.ndarray, _tp.Sequence]) -> _np.ndarray:
+    """
+    Vectorized version of the :func:`get_nodekey` function.
+    Converts an (N, 2) or (N, 3) array of X, Y(, Z) coordinates into an (N, 2) or (N, 3) array of ``int64`` node keys
+    in a single NumPy operation. Every row in the output equals the tuple that :func:`get_nodekey` would return.
+
+    If the coordinate array has a Z column that only contains NaN values (i.e. the geometry is not Z aware),
+    the Z column is dropped and 2D node keys are returned.
+
+    Example:
+
+        >>> keys = get_nodekeys([(4.2452, 23.24541), (1.0, 2.0)])
+        >>> keys
+        array([[ 42451, 232454],
+               [ 10000,  20000]], dtype=int64)
+        >>> tuple(keys[0]) == get_nodekey(4.2452, 23.24541)
+        True
+
+    :param coords:      An (N, 2) or (N, 3) array-like of floating point coordinates.
+    :raises ValueError: If the array does not have the expected shape or contains NaN values.
+    """
+    arr = _np.asarray(coords, dtype=_np.float64)
+    _vld.pass_if(arr.ndim == 2 and arr.shape[1] in (2, 3), ValueError,
+                 f'Coordinate array must have shape (N, 2) or (N, 3), got {arr.shape}')
+    if arr.shape[1] == 3 and _np.isnan(arr[:, 2]).all():
+        arr = arr[:, :2]
+    _vld.raise_if(_np.isnan(arr).any(), ValueError, 'Coordinate array contains NaN values')
+    # Casting to int64 truncates towards zero, exactly like int() does in get_nodekey()
+    return (arr / XYZ_RESOLUTION).astype(_np.int64)
+
+
+def get_coordtuples(node_keys: _tp.Union[_np.ndarray, _tp.Sequence]) -> _np.ndarray:
+    """
+    Vectorized version of the :func:`get_coordtuple` function.
+    Converts an (N, 2) or (N, 3) array of node keys back into an array of (approximate) ``float64`` coordinates.
+
+    .. warning::    The same limitations as for :func:`get_coordtuple` apply.
+
+    :param node_keys:   An (N, 2) or (N, 3) array-like of integer node keys.
+    :raises ValueError: If the array does not have the expected shape.
+    """
+    arr = _np.asarray(node_keys, dtype=_np.int64)
+    _vld.pass_if(arr.ndim == 2 and arr.shape[1] in (2, 3), ValueError,
+                 f'Node key array must have shape (N, 2) or (N, 3), got {arr.shape}')
+    return arr * XYZ_RESOLUTION
+
+
+def pack_nodekeys(node_keys: _tp.Union[_np.ndarray, _tp.Sequence],
+                  origin: _tp.Tuple[int, int] = (0, 0)) -> _np.ndarray:
+    """
+    Packs an (N, 2) array of 2D node keys (as returned by :func:`get_nodekeys`) into a 1D array of single ``int64``
+    values, so that they can be sorted, hashed and compared using e.g. ``np.unique`` or ``np.isin``.
+    The packed values sort in the same order as the (X, Y) node keys would (i.e. by X first, then by Y).
+
+    Because each key component is stored in 32 bits, the node keys must lie within a distance of 2^31 resolution
+    units from the *origin* node key (i.e. roughly 214 km when the default :attr:`XYZ_RESOLUTION` is used).
+    For national coordinate systems, a suitable *origin* (e.g. near the center of the data extent) should be specified:
+
+        >>> # Node key near the center of Switzerland (LV95)
+        >>> origin = get_nodekey(2660000, 1185000)
+        >>> packed = pack_nodekeys(get_nodekeys(coords), origin)
+
+    Packed keys can only be compared to other packed keys that were created using the same *origin*.
+
+    :param node_keys:   An (N, 2) array-like of integer node keys.
+    :param origin:      An optional 2D node key that serves as the packing origin. Defaults to (0, 0).
+    :raises ValueError: If the node keys are not 2D or if they lie too far away from the *origin*.
+    """
+    arr = _np.asarray(node_keys, dtype=_np.int64)
+    _vld.pass_if(arr.ndim == 2 and arr.shape[1] == 2, ValueError,
+                 f'Only 2D node keys with shape (N, 2) can be packed, got {arr.shape}')
+    rel = arr - _np.asarray(origin, dtype=_np.int64)
+    _vld.raise_if(arr.size and (rel.min() < -_PACK_OFFSET or rel.max() >= _PACK_OFFSET), ValueError,
+                  'Node keys lie too far away from the origin to be packed')
+    return (rel[:, 0] << _PACK_SHIFT) + (rel[:, 1] + _PACK_OFFSET)
+
+
+def unpack_nodekeys(packed_keys: _tp.Union[_np.ndarray, _tp.Sequence],
+                    origin: _tp.Tuple[int, int] = (0, 0)) -> _np.ndarray:
+    """
+    Unpacks a 1D array of packed node keys (created by :func:`pack_nodekeys`) into an (N, 2) array of node keys.
+
+    :param packed_keys: A 1D array-like of packed ``int64`` node keys.
+    :param origin:      The 2D node key that was used as the origin when the keys were packed. Defaults to (0, 0).
+    """
+    arr = _np.asarray(packed_keys, dtype=_np.int64)
+    out = _np.empty((arr.size, 2), dtype=_np.int64)
+    out[:, 0] = arr.ravel() >> _PACK_SHIFT
+    out[:, 1] = (arr.ravel() & _PACK_MASK) - _PACK_OFFSET
+    return out + _np.asarray(origin, dtype=_np.int64)
+
+
+def _segment_sums(values: _np.ndarray, offsets: _np.ndarray) -> _np.ndarray:
+    """ Returns the (wrapped) ``uint64`` sum of ``values[offsets[i]:offsets[i + 1]]`` for each segment *i*. """
+    totals = _np.zeros(len(values) + 1, dtype=_np.uint64)
+    _np.cumsum(values, out=totals[1:])
+    return totals[offsets[1:]] - totals[offsets[:-1]]
+
+
+def _segment_positions(offsets: _np.ndarray) -> _np.ndarray:
+    """ Returns the position of each element within its segment, where the segments are given by *offsets*. """
+    counts = _np.diff(offsets)
+    return _np.arange(offsets[-1] - offsets[0], dtype=_np.int64) - _np.repeat(offsets[:-1] - offsets[0], counts)
+
+
+def _rotate_min_first(keys: _np.ndarray, ring_offsets: _np.ndarray) -> _tp.Tuple[_np.ndarray, _np.ndarray]:
+    """
+    Removes the closing vertex of each closed ring (i.e. of which the first and last node key are equal) and rotates
+    the ring so that it starts at its smallest node key (by X, then Y, then Z). Returns the keys and ring offsets.
+    """
+    starts, lengths = ring_offsets[:-1], _np.diff(ring_offsets)
+    closed = lengths > 2
+    closed[closed] = (keys[starts[closed]] == keys[ring_offsets[1:][closed] - 1]).all(axis=1)
+    keep = _np.ones(len(keys), dtype=bool)
+    keep[ring_offsets[1:][closed] - 1] = False
+    keys, lengths = keys[keep], lengths - closed
+    ring_offsets = _np.zeros_like(ring_offsets)
+    _np.cumsum(lengths, out=ring_offsets[1:])
+
+    # Narrow down the candidate (smallest) vertices of each ring column by column, which avoids a full sort
+    ring_ids = _np.repeat(_np.arange(len(lengths)), lengths)
+    non_empty = lengths > 0
+    starts = ring_offsets[:-1][non_empty]
+    shifts = _np.zeros(len(lengths), dtype=_np.int64)
+    if len(starts):
+        segments = _np.repeat(_np.arange(len(starts)), lengths[non_empty])
+        candidates = _np.ones(len(keys), dtype=bool)
+        for column in keys.T:
+            values = _np.where(candidates, column, _np.iinfo(_np.int64).max)
+            candidates &= values == _np.minimum.reduceat(values, starts)[segments]
+        first = _np.minimum.reduceat(_np.where(candidates, _np.arange(len(keys)), len(keys)), starts)
+        shifts[non_empty] = first - starts
+    shifts[~closed] = 0
+    source = _np.repeat(ring_offsets[:-1], lengths) + \
+        (_segment_positions(ring_offsets) + shifts[ring_ids]) % lengths[ring_ids]
+    return keys[source], ring_offsets
+
+
+def get_fingerprints_from_arrays(coords: _np.ndarray, geometry_offsets: _np.ndarray, part_offsets: _np.ndarray,
+                                 ring_offsets: _np.ndarray, bits: int = 64,
+                                 rotation_invariant: bool = False) -> _np.ndarray:
+    """
+    Vectorized version of :func:`get_fingerprint`, which computes the fingerprints of all geometries in a set of
+    vertex arrays (e.g. from :func:`gpf.tools.geometry.get_vertex_arrays`) in a few NumPy operations.
+
+    :param coords:              An (N, 2) or (N, 3) coordinate array. ``NaN`` Z values are ignored.
+    :param geometry_offsets:    The offsets of the parts for each geometry (in *part_offsets*).
+    :param part_offsets:        The offsets of the rings for each part (in *ring_offsets*).
+    :param ring_offsets:        The offsets of the vertices for each ring (or path) (in *coords*).
+    :param bits:                The fingerprint size: 64 (default) or 128.
+    :param rotation_invariant:  If ``True``, the fingerprint does not depend on the start vertex of closed rings.
+    :returns:                   A ``uint64`` array of length G for 64-bit fingerprints,
+                                or a (G, 2) ``uint64`` array for 128-bit fingerprints.
+    :raises ValueError:         If the bit size is invalid or if the coordinates contain NaN X or Y values.
+    """
+    _vld.pass_if(bits in (64, 128), ValueError, 'Fingerprint size must be 64 or 128 bits')
+    coords = _np.asarray(coords, dtype=_np.float64)
+    geometry_offsets = _np.asarray(geometry_offsets, dtype=_np.int64)
+    part_offsets = _np.asarray(part_offsets, dtype=_np.int64)
+    ring_offsets = _np.asarray(ring_offsets, dtype=_np.int64)
+
+    keys = get_nodekeys(coords[:, :2])
+    if coords.shape[1] > 2:
+        # Missing Z values are marked with the smallest int64, so that they can be skipped below
+        has_z = ~_np.isnan(coords[:, 2])
+        z_keys = _np.full(len(coords), _np.iinfo(_np.int64).min)
+        z_keys[has_z] = (coords[has_z, 2] / XYZ_RESOLUTION).astype(_np.int64)
+        keys = _np.column_stack((keys, z_keys))
+    if rotation_invariant:
+        keys, ring_offsets = _rotate_min_first(keys, ring_offsets)
+    keys = keys.view(_np.uint64)
+
+    ring_bounds = part_offsets[geometry_offsets]
+    vertex_bounds = ring_offsets[ring_bounds]
+    vertex_positions = _segment_positions(vertex_bounds).view(_np.uint64)
+    ring_positions = _segment_positions(ring_bounds).view(_np.uint64)
+    part_positions = _segment_positions(geometry_offsets).view(_np.uint64)
+    ring_lengths = _np.diff(ring_offsets).view(_np.uint64)
+    part_sizes = _np.diff(part_offsets).view(_np.uint64)
+    num_parts = _np.diff(geometry_offsets).view(_np.uint64)
+
+    results = []
+    for seed in _FP_SEEDS[:bits // 64]:
+        # Each vertex, ring and part contributes a term that depends on its position within the geometry,
+        # so that the (wrapped) sum of the terms is sensitive to the vertex order and the part structure.
+        terms = _mix64(keys[:, 0] ^ seed)
+        terms = _mix64(terms ^ keys[:, 1])
+        if keys.shape[1] > 2:
+            has_z = keys[:, 2] != _FP_NO_Z
+            terms[has_z] = _mix64(terms[has_z] ^ keys[has_z, 2])
+        terms = _mix64(terms ^ vertex_positions)
+        total = _segment_sums(terms, vertex_bounds)
+        total += _segment_sums(_mix64(_mix64(ring_lengths ^ (seed + _np.uint64(1))) ^ ring_positions), ring_bounds)
+        total += _segment_sums(_mix64(_mix64(part_sizes ^ (seed + _np.uint64(2))) ^ part_positions), geometry_offsets)
+        results.append(_mix64(total ^ _mix64(num_parts ^ seed)))
+    return results[0] if bits == 64 else _np.column_stack(results)
+
+
+def get_fingerprints(geometries: _tp.Iterable, bits: int = 64, rotation_invariant: bool = False) -> _np.ndarray:
+    """
+    Batch version of :func:`get_fingerprint`, which computes the fingerprints of a column of geometries,
+    e.g. from a ``SearchCursor``. The geometries are processed in batches (see :func:`get_fingerprints_from_arrays`).
+    ``None`` values and empty geometries all have the same fingerprint.
+
+    Example:
+
+        >>> with SearchCursor('C:/Temp/test.gdb/parcels', ('OID@', 'SHAPE@')) as rows:
+        >>>     oids, shapes = zip(*rows)
+        >>> fingerprints = get_fingerprints(shapes)
+        >>> # find the Object IDs of all duplicate geometries
+        >>> unique, inverse, counts = numpy.unique(fingerprints, return_inverse=True, return_counts=True)
+        >>> duplicates = numpy.array(oids)[counts[inverse] > 1]
+
+    :param geometries:          An iterable of Esri Geometries, EsriJSON strings or EsriJSON dictionaries (or ``None``).
+    :param bits:                The fingerprint size: 64 (default) or 128.
+    :param rotation_invariant:  If ``True``, the fingerprint does not depend on the start vertex of closed rings.
+    :returns:                   A ``uint64`` array of length G for 64-bit fingerprints,
+                                or a (G, 2) ``uint64`` array for 128-bit fingerprints.
+    :raises ValueError:         If the bit size is invalid or if a geometry is not supported.
+    """
+    results = [get_fingerprints_from_arrays(*_geo.get_vertex_arrays(batch), bits, rotation_invariant)
+               for batch in _iter.chunked(geometries, _FINGERPRINT_BATCH_SIZE)]
+    if results:
+        return _np.concatenate(results)
+    return _np.zeros((0,) if bits == 64 else (0, 2), dtype=_np.uint64)
+
+
+def get_fingerprint(geometry, bits: int = 64, rotation_invariant: bool = False) -> _tp.Union[int, None]:
+    """
+    Returns a stable 64-bit or 128-bit fingerprint (as an integer) of a geometry, which can be used to find
+    duplicate or modified geometries without comparing the geometries themselves.
+
+    The fingerprint is computed from the node keys of the vertices (see :func:`get_nodekeys`), their order
+    and the part structure of the geometry (i.e. the number of rings and vertices of each part).
+    Because the node keys are truncated to the :attr:`XYZ_RESOLUTION` grid, floating point noise
+    (e.g. caused by a round trip through another format) does not change the fingerprint.
+    Note that the spatial reference and M values are not taken into account, and that a polyline and
+    a polygon with exactly the same vertices and parts have the same fingerprint.
+
+    If *rotation_invariant* is ``True``, each closed ring (or path) is considered to start at its smallest vertex
+    (by X, then Y, then Z), so that geometries of which only the start vertices of the rings differ
+    have the same fingerprint.
+
+    .. warning::    The same limitations as for :func:`get_nodekey` apply: coordinates that lie within the resolution
+                    distance but on different sides of a grid line result in different fingerprints.
+                    The fingerprints are meant for change detection and deduplication, not for cryptographic use.
+
+    Example:
+
+        >>> get_fingerprint(shape) == get_fingerprint(shape.JSON)
+        True
+
+    :param geometry:            An Esri Geometry, an EsriJSON string or an EsriJSON dictionary (or ``None``).
+    :param bits:                The fingerprint size: 64 (default) or 128.
+    :param rotation_invariant:  If ``True``, the fingerprint does not depend on the start vertex of closed rings.
+    :returns:                   The fingerprint, or ``None`` if *geometry* is ``None``.
+    :raises ValueError:         If the bit size is invalid or if the geometry is not supported.
+    """
+    if geometry is None:
+        return None
+    values = get_fingerprints((geometry, ), bits, rotation_invariant)[0]
+    return int(values) if bits == 64 else (int(values[0]) << 64) | int(values[1])
+
+
+def _keyviews(*node_keys: _np.ndarray) -> _tp.Tuple[_tp.List[_np.ndarray], _tp.Callable]:
+    """
+    Returns a list of 1D views of the given (N, d) node key arrays that can be used in NumPy set operations
+    (e.g. ``np.unique``, ``np.searchsorted``), and a function that converts such a 1D view back into node keys.
+    All arrays must have the same number of dimensions.
+
+    2D keys are packed into single ``int64`` values (around a shared origin) if their extent permits it,
+    since this is much faster. In all other cases, a structured (record) view of the rows is used.
+    """
+    dims = {k.shape[1] for k in node_keys}
+    _vld.raise_if(len(dims) > 1, ValueError, 'Node keys must have the same number of dimensions')
+    dims = dims.pop()
+    non_empty = [k for k in node_keys if k.size]
+
+    if dims == 2 and non_empty:
+        lo = _np.min([k.min(axis=0) for k in non_empty], axis=0)
+        hi = _np.max([k.max(axis=0) for k in non_empty], axis=0)
+        if ((hi - lo) < _PACK_MASK).all():
+            origin = tuple((lo + (hi - lo) // 2).tolist())
+            return [pack_nodekeys(k, origin) for k in node_keys], lambda v: unpack_nodekeys(v, origin)
+
+    row_type = _np.dtype([(f'f{i}', _np.int64) for i in range(dims)])
+    return ([_np.ascontiguousarray(k).view(row_type).ravel() for k in node_keys],
+            lambda v: _np.ascontiguousarray(v).view(_np.int64).reshape(-1, dims))
+
+
+def _and_where(where_clause: _tp.Union[str, _q.Where, None], condition: str) -> str:
+    """ Combines an (optional) where clause and an SQL *condition* using the AND operator. """
+    if not where_clause:
+        return condition
+    return f'({where_clause}) AND ({condition})'
+
+
 # noinspection PyUnusedLocal
 def _process_row(lookup: dict, row: _tp.Sequence, **kwargs) -> _tp.Union[str, None]:
     """
@@ -118,6 +491,29 @@ def _process_row(lookup: dict, row: _tp.Sequence, **kwargs) -> _tp.Union[str, No
     lookup[key] = v
 
 
+# noinspection PyUnusedLocal
+def _process_batch(lookup: dict, rows: list, **kwargs) -> _tp.Union[str, None]:
+    """
+    The batch processor function template, which can be used instead of a row processor function
+    (see :func:`_process_row`), in order to process multiple rows at once.
+    This avoids the overhead of a function call for each row and allows for vectorized processing.
+
+    :param lookup:  A reference to the lookup dictionary.
+                    If the process_batch() function is built in to a lookup class, *lookup* refers to *self*.
+    :param rows:    A list of row tuples (as returned by a :class:`SearchCursor`).
+                    Use ``zip(*rows)`` to get the values per field (column) instead.
+    :param kwargs:  Optional user-defined keyword arguments.
+    :rtype:         None, str, unicode
+
+    .. note::       This "private" function is documented here, so that users can see its signature and behaviour.
+                    The same rules as for the :func:`_process_row` function apply.
+    """
+    for row in rows:
+        failed = _process_row(lookup, row, **kwargs)
+        if failed:
+            return failed
+
+
 class Lookup(dict):
     """
     Lookup(table_path, key_field, value_field(s), {where_clause}, {**kwargs})
@@ -126,6 +522,7 @@ class Lookup(dict):
 
     This class can be instantiated directly, but typically, a user would create a custom lookup class based on
     this one and then override the :func:`Lookup._process_row` method.
+    Alternatively, the :func:`Lookup._process_batch` method can be overridden to process multiple rows at once.
     Please refer to other implementations (:class:`RowLookup`, :class:`ValueLookup`) for concrete examples.
 
     **Params:**
@@ -134,7 +531,7 @@ class Lookup(dict):
 
         Full source table or feature class path.
 
-    -   **key_field** (str, unicode):
+    -   **key_field** (str, unicode, list, tuple):
 
         The field to use for the lookup dictionary keys.
         If *SHAPE@X[Y[Z]]* is used as the key field, the coordinates are "hashed" using the
@@ -142,6 +539,10 @@ class Lookup(dict):
         This means, that the user should use this function as well in order to
         to create a coordinate key prior to looking up the matching value for it.
 
+        If multiple key fields are specified, the lookup will have composite keys (i.e. tuples of key values).
+        Note that coordinate fields (*SHAPE@X[Y[Z]]*) cannot be part of a composite key.
+        The row passed to a row processor function always starts with the key field value(s).
+
     -   **value_fields** (list, tuple, str, unicode):
 
         The field or fields to include as the lookup dictionary value(s), i.e. row.
@@ -158,17 +559,46 @@ class Lookup(dict):
         If the user wishes to call the standard `Lookup` class but simply wants to use
         a custom row processor function, you can pass in this function using the keyword *row_func*.
 
+    -   **batch_func**:
+
+        Similar to *row_func*, but for a custom batch processor function (see :func:`_process_batch`),
+        which receives a list of rows at once. If set, *row_func* is ignored.
+
+    -   **batch_size** (int):
+
+        The (maximum) number of rows passed to a batch processor function. Defaults to 10000.
+
+    -   **change_tracking** (str):
+
+        Enables incremental updates using the :func:`refresh` method. The following options are available:
+        :attr:`TRACK_EDITS` uses the editor tracking "last edited at" field to detect inserted and updated rows,
+        :attr:`TRACK_OID` only detects rows with a higher Object ID than before (i.e. inserts),
+        and :attr:`TRACK_GLOBALID` only detects rows with a Global ID that has not been seen before (i.e. inserts).
+        Removed keys are always detected. By default, change tracking is disabled.
+
     :raises RuntimeError:       When the lookup cannot be created or populated.
     :raises ValueError:         When a specified lookup field does not exist in the source table,
-                                or when multiple value fields were specified.
+                                when multiple value fields were specified,
+                                when a composite key contains a coordinate field
+                                or when the change tracking option is not supported by the source table.
     """
 
-    def __init__(self, table_path: str, key_field: str, value_fields: _tp.Union[str, _tp.Sequence[str]],
+    def __init__(self, table_path: str, key_field: _tp.Union[str, _tp.Sequence[str]],
+                 value_fields: _tp.Union[str, _tp.Sequence[str]],
                  where_clause: _tp.Union[str, _q.Where, None] = None, **kwargs):
         super().__init__()
 
-        fields = tuple([key_field] + list(value_fields if _vld.is_iterable(value_fields) else (value_fields, )))
-        self._hascoordkey = key_field.upper().startswith(_const.FIELD_X)
+        key_fields = list(key_field if _vld.is_iterable(key_field) else (key_field, ))
+        fields = tuple(key_fields + list(value_fields if _vld.is_iterable(value_fields) else (value_fields, )))
+        coord_keys = [f.upper().startswith(_const.FIELD_X) for f in key_fields]
+        _vld.raise_if(len(key_fields) > 1 and any(coord_keys), ValueError,
+                      'Coordinate fields cannot be part of a composite key')
+        self._keylen = len(key_fields)
+        self._hascoordkey = coord_keys[0]
+        self._source = table_path, fields, where_clause, kwargs
+        self._tracking = self._get_tracking(table_path, kwargs.get(_TRACKING_ARG))
+        self._watermark = None
+        self._timings = {}
         self._populate(table_path, fields, where_clause, **kwargs)
 
     @staticmethod
@@ -182,6 +612,21 @@ class Lookup(dict):
         _vld.pass_if(desc, RuntimeError, f'Failed to create lookup for {_tu.to_repr(table_path)}')
         return desc.get_fields(True, True)
 
+    @staticmethod
+    def _get_tracking(table_path: str, tracking: _tp.Union[str, None]) -> _tp.Union[_tp.Tuple[str, str], None]:
+        """
+        Returns a tuple of (*tracking*, field name) for the given change tracking option.
+        If *tracking* is not set, ``None`` is returned.
+
+        :raises ValueError: When the change tracking option is invalid or not supported by the table.
+        """
+        if not tracking:
+            return None
+        _vld.pass_if(tracking in _TRACKING_FIELDS, ValueError, f'Invalid {_TRACKING_ARG} option {tracking!r}')
+        field = _meta.Describe(table_path).get(_TRACKING_FIELDS[tracking])
+        _vld.pass_if(field, ValueError, f'{_tu.to_repr(table_path)} does not support {tracking!r} change tracking')
+        return tracking, field
+
     @staticmethod
     def _check_fields(user_fields: _tp.Iterable[str], table_fields: _tp.Iterable[str]):
         """
@@ -194,41 +639,298 @@ class Lookup(dict):
                          ValueError, 'Field {} does not exist'.format(field))
 
     @staticmethod
-    def _has_self(row_func):
-        """ Checks if `func` is an instance method or function and checks if it's a valid row processor. """
-        if _vld.signature_matches(row_func, Lookup._process_row):
+    def _has_self(row_func, batch: bool = False):
+        """
+        Checks if `func` is an instance method or function and checks if it's a valid row processor
+        (or batch processor, if *batch* is ``True``).
+        """
+        method, func = (Lookup._process_batch, _process_batch) if batch else (Lookup._process_row, _process_row)
+        if _vld.signature_matches(row_func, method):
             # row_func is an instance method (signature matches the default self._process_row())
             return True
-        elif _vld.signature_matches(row_func, _process_row):
+        elif _vld.signature_matches(row_func, func):
             # row_func is a regular function (signature matches _process_row())
             return False
         else:
-            raise ValueError('Row processor function has a bad signature')
+            raise ValueError(f'{"Batch" if batch else "Row"} processor function has a bad signature')
+
+    def _get_key(self, row: _tp.Sequence) -> _tp.Union[_tp.Hashable, None]:
+        """
+        Returns the (composite) key for the given row. Coordinate keys are turned into node keys.
+        If the key value is ``None`` (or all composite key values are ``None``), ``None`` is returned.
+        """
+        if self._keylen == 1:
+            key = row[0]
+            if key is not None and self._hascoordkey:
+                key = get_nodekey(*key)
+            return key
+        key = tuple(row[:self._keylen])
+        return None if all(k is None for k in key) else key
 
     def _process_row(self, row, **kwargs):
         """ Instance method version of the :func:`_process_row` module function. """
-        return _process_row(self, row, **kwargs)
+        if self._keylen == 1:
+            return _process_row(self, row, **kwargs)
+        key = self._get_key(row)
+        if key is None:
+            return
+        self[key] = row[self._keylen:] if len(row) > self._keylen + 1 else row[self._keylen]
+
+    def _process_batch(self, rows, **kwargs):
+        """
+        Instance method version of the :func:`_process_batch` module function.
+        By default, this calls :func:`_process_row` for each row. If a subclass overrides this method,
+        the lookup is populated in batches and :func:`_process_row` is no longer called by the lookup itself,
+        unless a further subclass overrides :func:`_process_row` again.
+        """
+        for row in rows:
+            failed = self._process_row(row, **kwargs)
+            if failed:
+                return failed
+
+    @classmethod
+    def _has_batch_override(cls) -> bool:
+        """
+        Returns ``True`` if the lookup class overrides :func:`_process_batch` and if that override is at least as
+        specific as the :func:`_process_row` implementation (i.e. a subclass that only overrides :func:`_process_row`
+        of a class with a built-in batch fast path still has its rows processed one by one).
+        """
+        mro = cls.__mro__
+        batch_owner = next(c for c in mro if '_process_batch' in vars(c))
+        row_owner = next(c for c in mro if '_process_row' in vars(c))
+        return batch_owner is not Lookup and mro.index(batch_owner) <= mro.index(row_owner)
+
+    def _get_processor(self, **kwargs) -> _tp.Tuple[_tp.Callable, bool]:
+        """
+        Returns the (validated) row or batch processor function, bound to the lookup instance,
+        and a boolean that is ``True`` if the processor expects batches of rows.
+        """
+        batch_func = kwargs.get(_BATCHFUNC_ARG)
+        if batch_func is None and _ROWFUNC_ARG not in kwargs and self._has_batch_override():
+            batch_func = self._process_batch
+        is_batch = batch_func is not None
+
+        func = batch_func if is_batch else kwargs.get(_ROWFUNC_ARG, self._process_row)
+        if self._has_self(func, is_batch):
+            return func, is_batch
+        return _partial(func, self), is_batch
+
+    def _feed(self, rows: _tp.Iterable[_tp.Sequence], **kwargs) -> _tp.Tuple[float, float]:
+        """
+        Passes the given rows to the (validated) row or batch processor function.
+        Returns the time (in seconds) that was spent on fetching the rows and on processing them.
+        """
+        process, is_batch = self._get_processor(**kwargs)
+        if is_batch:
+            # Rows must be copied, because the cursor reuses its row wrapper
+            rows = _iter.chunked(map(tuple, rows), kwargs.get(_BATCHSIZE_ARG) or _LOOKUP_BATCH_SIZE)
+        timer = _time.perf_counter
+        process_time = 0.
+        start = timer()
+        if is_batch:
+            for batch in rows:
+                t = timer()
+                failed = process(batch, **kwargs)
+                process_time += timer() - t
+                if failed:
+                    raise Exception(failed)
+            return timer() - start - process_time, process_time
+
+        # Only the first row of each chunk of rows is timed (and extrapolated), to keep the per-row overhead low
+        rows = iter(rows)
+        num_rows = num_timed = 0
+        for row in rows:
+            t = timer()
+            failed = process(row, **kwargs)
+            process_time += timer() - t
+            num_timed += 1
+            chunk_size = 1
+            if not failed:
+                for chunk_size, row in enumerate(_islice(rows, _TIMING_CHUNK - 1), 2):
+                    failed = process(row, **kwargs)
+                    if failed:
+                        break
+            if failed:
+                raise Exception(failed)
+            num_rows += chunk_size
+        total_time = timer() - start
+        if num_timed:
+            process_time = min(process_time * num_rows / num_timed, total_time)
+        return total_time - process_time, process_time
 
     def _populate(self, table_path, fields, where_clause=None, **kwargs):
-        """ Populates the lookup with data, calling _process_row() on each row returned by the SearchCursor. """
+        """
+        Populates the lookup with data, calling _process_row() on each row returned by the SearchCursor,
+        or _process_batch() on each batch of rows.
+        """
         try:
+            start = _time.perf_counter()
+
             # Validate fields
             self._check_fields(fields, self._get_fields(table_path))
 
-            # Validate row processor function (if any)
-            row_func = kwargs.get(_ROWFUNC_ARG, self._process_row)
-            has_self = self._has_self(row_func)
+            # Validate row or batch processor function (if any)
+            self._get_processor(**kwargs)
+
+            # Determine the change tracking state before reading, so that no concurrent changes are missed
+            if self._tracking:
+                self._watermark = self._read_watermark(table_path, where_clause)
 
             with _cursors.SearchCursor(table_path, fields, where_clause) as rows:
-                for row in rows:
-                    failed = row_func(row, **kwargs) if has_self else row_func(self, row, **kwargs)
-                    if failed:
-                        raise Exception(failed)
+                fetch_time, process_time = self._feed(rows, **kwargs)
+            self._timings = {
+                'build_time': _time.perf_counter() - start,
+                'fetch_time': fetch_time,
+                'process_time': process_time
+            }
 
         except Exception as e:
             raise RuntimeError('Failed to create {} for {}: {}'.format(self.__class__.__name__,
                                                                        _tu.to_repr(table_path), e))
 
+    @staticmethod
+    def _get_dbms(table_path: str) -> str:
+        """
+        Returns the lower case DBMS client name (e.g. 'sqlserver' or 'oracle') of the enterprise geodatabase that
+        contains the given table, or an empty string if the table is not stored in an enterprise geodatabase.
+        """
+        root = _paths.Workspace.get_root(table_path)
+        if not root.lower().endswith(_const.EXT_ESRI_SDE):
+            return _const.CHAR_EMPTY
+        properties = _meta.Describe(root).get('connectionProperties')
+        return str(getattr(properties, 'dbclient', None) or _const.CHAR_EMPTY).replace(_const.CHAR_SPACE, '').lower()
+
+    @staticmethod
+    def _sql_timestamp(value: _dt.datetime, dbms: str) -> str:
+        """ Returns an SQL date literal (to the second) for the given DBMS client name (see :func:`_get_dbms`). """
+        return _SQL_TIMESTAMPS.get(dbms, _SQL_TIMESTAMP).format(value)
+
+    def _read_watermark(self, table_path, where_clause) -> _tp.Any:
+        """
+        Returns the current change tracking state of the source table: the highest edit date or Object ID,
+        or a sorted array of Global ID hashes.
+        """
+        tracking, field = self._tracking
+        if tracking == TRACK_GLOBALID:
+            with _cursors.SearchCursor(table_path, field, where_clause) as rows:
+                return _np.unique(_hash_values([guid.upper() for guid, in rows if guid]))
+        with _cursors.SearchCursor(table_path, field, _and_where(where_clause, f'{field} IS NOT NULL'),
+                                   sql_clause=(None, f'ORDER BY {field} DESC')) as rows:
+            return next((value for value, in rows), None)
+
+    def _changes_where(self, table_path, where_clause) -> _tp.Tuple[_tp.List[str], _tp.Any]:
+        """
+        Returns a list of where clauses that select all rows that changed since the last build or refresh,
+        and the new change tracking state.
+        """
+        tracking, field = self._tracking
+        old_mark = self._watermark
+        if tracking == TRACK_GLOBALID:
+            with _cursors.SearchCursor(table_path, field, where_clause) as rows:
+                guids = [guid for guid, in rows if guid]
+            hashes = _hash_values([guid.upper() for guid in guids])
+            new_guids = [g for g, new in zip(guids, ~_np.isin(hashes, old_mark)) if new]
+            return [_and_where(where_clause, str(_q.Where(field).In(chunk)))
+                    for chunk in _iter.chunked(new_guids, _SQL_IN_LIMIT)], _np.unique(hashes)
+
+        new_mark = self._read_watermark(table_path, where_clause)
+        if old_mark is None:
+            condition = f'{field} IS NOT NULL'
+        elif tracking == TRACK_EDITS:
+            # Edit dates are compared by the second: rows edited in the same second are read again
+            condition = f'{field} >= {self._sql_timestamp(old_mark, self._get_dbms(table_path))}'
+        else:
+            condition = f'{field} > {old_mark}'
+        return [_and_where(where_clause, condition)], new_mark
+
+    def _discard(self, key):
+        """ Removes the given key (and all its values) from the lookup. """
+        self.pop(key, None)
+
+    def _feed_changes(self, rows: _tp.List[tuple], **kwargs):
+        """ Adds the changed rows to the lookup on refresh (after the old values of these rows have been discarded). """
+        self._feed(rows, **kwargs)
+
+    def refresh(self) -> _tp.Dict[str, _tp.Union[int, float]]:
+        """
+        Updates the lookup incrementally, using the *change_tracking* option that was set on initialization.
+        Only the rows that changed since the last build or refresh are read again and keys that no longer exist
+        in the source table (or no longer match the where clause) are removed.
+        For the latter, only the key field(s) of the source table are read.
+
+        This is a lot faster than rebuilding a large lookup, but it assumes that the lookup keys are the actual
+        key field values. Lookups with custom row processor functions that create other keys should be rebuilt.
+
+        Example:
+
+            >>> my_lookup = ValueLookup('C:/Temp/test.gdb/my_table', 'GlobalID', 'Material',
+            >>>                         change_tracking=TRACK_EDITS)
+            >>> # some time later...
+            >>> my_lookup.refresh()
+            {'added': 12, 'updated': 3, 'removed': 1, 'elapsed': 0.8361}
+
+        Returns a ``dict`` with the number of added, updated and removed keys and the elapsed time in seconds.
+
+        :raises ValueError:     If the lookup was created without change tracking.
+        :raises RuntimeError:   When the lookup could not be refreshed.
+        """
+        _vld.pass_if(self._tracking, ValueError, f'{self.__class__.__name__} was created without {_TRACKING_ARG}')
+        start = _time.perf_counter()
+        table_path, fields, where_clause, kwargs = self._source
+        dupekeys = getattr(self, '_dupekeys', False)
+        _vld.raise_if(dupekeys and (self._keylen > 1 or self._hascoordkey), ValueError,
+                      'Lookups with duplicate composite or coordinate keys cannot be refreshed')
+
+        try:
+            where_clauses, watermark = self._changes_where(table_path, where_clause)
+
+            # Count the rows per key that are (still) present in the source table
+            counts = {}
+            with _cursors.SearchCursor(table_path, fields[:self._keylen], where_clause) as rows:
+                for row in rows:
+                    key = self._get_key(row)
+                    counts[key] = counts.get(key, 0) + 1
+
+            changes = []
+            for clause in where_clauses:
+                with _cursors.SearchCursor(table_path, fields, clause) as rows:
+                    changes.extend(tuple(row) for row in rows)
+
+            removed = [k for k in self if k not in counts]
+            for key in removed:
+                self._discard(key)
+
+            changed = dict.fromkeys(k for k in map(self._get_key, changes) if k is not None)
+            if dupekeys:
+                # A key is also affected if one of its rows was removed or got another key
+                changed.update((k, None) for k, v in self.items() if len(v) != counts[k])
+                changes = self._read_keys(table_path, fields, where_clause, list(changed))
+            updated = sum(1 for k in changed if k in self)
+            for key in changed:
+                self._discard(key)
+            self._feed_changes(changes, **kwargs)
+
+        except Exception as e:
+            raise RuntimeError('Failed to refresh {} for {}: {}'.format(self.__class__.__name__,
+                                                                        _tu.to_repr(table_path), e))
+
+        self._watermark = watermark
+        return {
+            'added': len(changed) - updated,
+            'updated': updated,
+            'removed': len(removed),
+            'elapsed': _time.perf_counter() - start
+        }
+
+    def _read_keys(self, table_path, fields, where_clause, keys: _tp.List) -> _tp.List[tuple]:
+        """ Reads all rows for the given keys. Only supported for a single (non-coordinate) key field. """
+        rows = []
+        for chunk in _iter.chunked(keys, _SQL_IN_LIMIT):
+            clause = _and_where(where_clause, str(_q.Where(fields[0]).In(chunk)))
+            with _cursors.SearchCursor(table_path, fields, clause) as cursor:
+                rows.extend(tuple(row) for row in cursor)
+        return rows
+
 
 class ValueLookup(Lookup):
     """
@@ -246,13 +948,14 @@ class ValueLookup(Lookup):
 
         Full source table or feature class path.
 
-    -   **key_field** (str, unicode):
+    -   **key_field** (str, unicode, list, tuple):
 
         The field to use for the ValueLookup dictionary keys.
         If *SHAPE@X[Y[Z]]* is used as the key field, the coordinates are "hashed" using the
         :func:`gpf.lookups.get_nodekey` function.
         This means, that the user should use this function as well in order to
         to create a coordinate key prior to looking up the matching value for it.
+        If multiple key fields are specified, the keys will be tuples of key values (composite keys).
 
     -   **value_field** (str, unicode):
 
@@ -273,6 +976,10 @@ class ValueLookup(Lookup):
         when *duplicate_keys* is ``False`` and duplicates *are* encountered,
         the last existing key-value pair will be overwritten.
 
+    -   **change_tracking** (str):
+
+        Enables incremental updates using the :func:`refresh` method (see :class:`Lookup`).
+
     :raises RuntimeError:       When the lookup cannot be created or populated.
     :raises ValueError:         When a specified lookup field does not exist in the source table,
                                 or when multiple value fields were specified.
@@ -281,37 +988,119 @@ class ValueLookup(Lookup):
                                 the :class:`gpf.lookups.RowLookup` class should be used instead.
     """
 
-    def __init__(self, table_path: str, key_field: str, value_field: str,
+    def __init__(self, table_path: str, key_field: _tp.Union[str, _tp.Sequence[str]], value_field: str,
                  where_clause: _tp.Union[None, str, _q.Where] = None, **kwargs):
         _vld.raise_if(_vld.is_iterable(value_field), ValueError,
                       f'{ValueLookup.__name__} expects a single value field: use {RowLookup.__name__} instead')
         _vld.pass_if(all(_vld.has_value(v) for v in (table_path, key_field, value_field)), ValueError,
                      f'{ValueLookup.__name__} requires valid table_path, key_field and value_field arguments')
 
-        # User cannot override row processor function for this class
-        if _ROWFUNC_ARG in kwargs:
-            del kwargs[_ROWFUNC_ARG]
+        # User cannot override row or batch processor function for this class
+        for arg in (_ROWFUNC_ARG, _BATCHFUNC_ARG):
+            kwargs.pop(arg, None)
 
         self._dupekeys = kwargs.get(_DUPEKEYS_ARG, False)
         super(ValueLookup, self).__init__(table_path, key_field, value_field, where_clause, **kwargs)
 
     def _process_row(self, row, **kwargs):
         """ Row processor function override. """
-        key, value = row
+        key, value = self._get_key(row), row[self._keylen]
         if key is None:
             return
-        if self._hascoordkey:
-            key = get_nodekey(*key)
         if self._dupekeys:
             v = self.setdefault(key, [])
             v.append(value)
         else:
             self[key] = value
 
+    def _process_batch(self, rows, **kwargs):
+        """ Batch processor function override. """
+        if self._dupekeys or self._keylen > 1 or self._hascoordkey:
+            return super()._process_batch(rows, **kwargs)
+        # Fast path for simple key-value pairs
+        self.update((key, value) for key, value in rows if key is not None)
+
+
+class _Column(object):
+    """
+    Typed storage for all values of a single field in a columnar :class:`RowLookup`.
+
+    Depending on the Python types of the values, the data is stored as follows:
+
+    - integers (without ``None``) as an ``int64`` array;
+    - integers and/or floats (with or without ``None``) as a ``float64`` array, where ``None`` is stored as ``NaN``;
+    - strings (with or without ``None``) as an ``int32`` array of codes, referring to a table of unique strings,
+      where ``None`` is stored as code -1;
+    - all other (or mixed) types as an ``object`` array.
+    """
+
+    __slots__ = 'data', 'table'
+
+    def __init__(self, values: _tp.List):
+        self.table = None
+        types = {type(v) for v in values}
+        has_null = type(None) in types
+        types.discard(type(None))
+
+        if types <= {int} and not has_null:
+            try:
+                self.data = _np.array(values, dtype=_np.int64)
+                return
+            except OverflowError:
+                types = {object}
+        if types and types <= {int, float}:
+            self.data = _np.array([_np.nan if v is None else v for v in values], dtype=_np.float64)
+        elif types and types <= {str}:
+            codes = {}
+            self.data = _np.fromiter((-1 if v is None else codes.setdefault(v, len(codes)) for v in values),
+                                     dtype=_np.int32, count=len(values))
+            self.table = tuple(codes)
+        else:
+            self.data = _np.empty(len(values), dtype=object)
+            self.data[:] = values
+
+    def __getitem__(self, index: int) -> _tp.Any:
+        value = self.data[index]
+        if self.table is not None:
+            return None if value < 0 else self.table[value]
+        if self.data.dtype.kind == 'f':
+            return None if _np.isnan(value) else float(value)
+        return value.item() if isinstance(value, _np.generic) else value
+
+    def extend(self, values: _tp.List):
+        """ Appends the given values to the column, changing the data type of the column if required. """
+        if not values:
+            return
+        other = _Column(values)
+        if self.table is not None and other.table is not None:
+            # Merge the string tables and recode the new values
+            codes = {v: i for i, v in enumerate(self.table)}
+            recode = _np.array([codes.setdefault(v, len(codes)) for v in other.table] + [-1], dtype=_np.int32)
+            self.data = _np.concatenate((self.data, recode[other.data]))
+            self.table = tuple(codes)
+        elif self.table is None and other.table is None and self.data.dtype == other.data.dtype:
+            self.data = _np.concatenate((self.data, other.data))
+        elif self.data.dtype.kind in 'if' and other.data.dtype.kind in 'if':
+            self.data = _np.concatenate((self.data, other.data)).astype(_np.float64)
+        elif self.data.dtype == object:
+            extra = _np.empty(len(values), dtype=object)
+            extra[:] = values
+            self.data = _np.concatenate((self.data, extra))
+        else:
+            merged = _Column([self[i] for i in range(len(self.data))] + list(values))
+            self.data, self.table = merged.data, merged.table
+
+    def decoded(self) -> _np.ndarray:
+        """ Returns the data array, where string codes have been replaced by the actual strings. """
+        if self.table is None:
+            return self.data
+        return _np.array(self.table + (None, ), dtype=object)[self.data]
+
 
 class RowLookup(Lookup):
     """
-    RowLookup(table_path, key_field, value_fields, {where_clause}, {duplicate_keys}, {mutable_values})
+    RowLookup(table_path, key_field, value_fields, {where_clause}, {duplicate_keys}, {mutable_values}, {indexes},
+              {storage}, {intern_strings})
 
     Creates a lookup dictionary from a given table or feature class.
     RowLookup inherits from ``dict``, so all the built-in dictionary functions
@@ -325,13 +1114,14 @@ class RowLookup(Lookup):
 
         Full source table or feature class path.
 
-    -   **key_field** (str, unicode):
+    -   **key_field** (str, unicode, list, tuple):
 
         The field to use for the RowLookup dictionary keys.
         If *SHAPE@X[Y[Z]]* is used as the key field, the coordinates are "hashed" using the
         :func:`gpf.tools.lookup.get_nodekey` function.
         This means, that the user should use this function as well in order to
         to create a coordinate key prior to looking up the matching values for it.
+        If multiple key fields are specified, the keys will be tuples of key values (composite keys).
 
     -   **value_field** (str, unicode):
 
@@ -359,43 +1149,200 @@ class RowLookup(Lookup):
         The default is ``False``, which causes the RowLookup values to become ``tuple`` objects.
         These are immutable, which consumes less memory and allows for faster retrieval.
 
+    -   **indexes** (list, tuple, str, unicode):
+
+        One or more value fields for which a secondary index should be built (while the lookup is populated).
+        This allows for fast lookups of keys by value using the :func:`find_by` method.
+
+    -   **storage** (str):
+
+        Specifies how the values are stored. The default is :attr:`STORAGE_ROWS` (``'rows'``), which stores
+        a tuple or list of values for each key. If set to :attr:`STORAGE_COLUMNAR` (``'columnar'``),
+        the values of each field are stored in a single typed (NumPy) array, and text values are stored as codes that
+        refer to a table of unique strings. This consumes a lot less memory when there are many rows and fields.
+        In columnar mode, the dictionary values are **row indices** (or lists of row indices if *duplicate_keys*
+        is ``True``): use :func:`get_row`, :func:`get_value` or :func:`column` to retrieve the actual values.
+        The *mutable_values* option cannot be used in columnar mode.
+
+    -   **intern_strings** (bool, list, tuple, str, unicode):
+
+        If ``True``, equal text values are stored as a single shared string object, instead of a separate string
+        object for each row. This saves a lot of memory for value fields with few distinct values (e.g. codes).
+        Alternatively, the value field(s) to which this should apply can be specified.
+        This option has no effect in columnar mode, because text values are always encoded in that case.
+
+    -   **change_tracking** (str):
+
+        Enables incremental updates using the :func:`refresh` method (see :class:`Lookup`).
+        In columnar mode, the values of updated or removed rows remain in the column arrays.
+
     :raises RuntimeError:       When the lookup cannot be created or populated.
     :raises ValueError:         When a specified lookup field does not exist in the source table,
-                                or when a single value field was specified.
+                                when a single value field was specified,
+                                when an index or intern field is not one of the value fields
+                                or when an invalid storage option was specified.
 
     .. seealso::                When a single field value should be stored in the lookup,
                                 the :class:`gpf.lookups.ValueLookup` class should be used instead.
     """
 
-    def __init__(self, table_path: str, key_field: str, value_fields: _tp.Sequence[str],
+    def __init__(self, table_path: str, key_field: _tp.Union[str, _tp.Sequence[str]], value_fields: _tp.Sequence[str],
                  where_clause: _tp.Union[None, str, _q.Where] = None, **kwargs):
         _vld.raise_if(len(value_fields) <= 1, ValueError,
                       f'{RowLookup.__name__} expects multiple value fields: use {ValueLookup.__name__} instead')
         _vld.pass_if(all(_vld.has_value(v) for v in (table_path, key_field, value_fields[0])), ValueError,
                      f'{RowLookup.__name__} requires valid table_path, key_field and value_fields arguments')
 
-        # User cannot override row processor function for this class
-        if _ROWFUNC_ARG in kwargs:
-            del kwargs[_ROWFUNC_ARG]
+        # User cannot override row or batch processor function for this class
+        for arg in (_ROWFUNC_ARG, _BATCHFUNC_ARG):
+            kwargs.pop(arg, None)
+
+        storage = kwargs.get(_STORAGE_ARG, STORAGE_ROWS)
+        _vld.pass_if(storage in (STORAGE_ROWS, STORAGE_COLUMNAR), ValueError, f'Invalid storage option {storage!r}')
+        _vld.raise_if(storage == STORAGE_COLUMNAR and kwargs.get(_MUTABLE_ARG, False), ValueError,
+                      f'Option {_MUTABLE_ARG!r} cannot be used in combination with {STORAGE_COLUMNAR!r} storage')
 
         self._dupekeys = kwargs.get(_DUPEKEYS_ARG, False)
         self._rowtype = list if kwargs.get(_MUTABLE_ARG, False) else tuple
+        self._fieldmap = {name.lower(): i for i, name in enumerate(value_fields)}
+        self._indexes = self._init_indexes(kwargs.get(_INDEXES_ARG))
+        self._intern = self._init_intern(kwargs.get(_INTERN_ARG), len(value_fields))
+        self._strings = {}
+        self._columns = [[] for _ in value_fields] if storage == STORAGE_COLUMNAR else None
+        self._numrows = 0
         super(RowLookup, self).__init__(table_path, key_field, value_fields, where_clause, **kwargs)
 
-        self._fieldmap = {name.lower(): i for i, name in enumerate(value_fields)}
+        if self._columns is not None:
+            # Convert the collected column values into typed arrays
+            self._columns = [_Column(values) for values in self._columns]
+
+    def _init_indexes(self, index_fields) -> _tp.Dict[int, dict]:
+        """ Returns an empty secondary index dictionary for each specified index field (by value field position). """
+        if not index_fields:
+            return {}
+        indexes = {}
+        for field in (index_fields if _vld.is_iterable(index_fields) else (index_fields, )):
+            _vld.pass_if(field.lower() in self._fieldmap, ValueError,
+                         f'Index field {field!r} is not one of the {RowLookup.__name__} value fields')
+            indexes[self._fieldmap[field.lower()]] = {}
+        return indexes
+
+    def _init_intern(self, intern_fields, num_fields: int) -> _tp.Tuple[int]:
+        """ Returns the value field positions for which text values should be interned. """
+        if not intern_fields:
+            return ()
+        if intern_fields is True:
+            return tuple(range(num_fields))
+        positions = []
+        for field in (intern_fields if _vld.is_iterable(intern_fields) else (intern_fields, )):
+            _vld.pass_if(field.lower() in self._fieldmap, ValueError,
+                         f'Intern field {field!r} is not one of the {RowLookup.__name__} value fields')
+            positions.append(self._fieldmap[field.lower()])
+        return tuple(positions)
 
     def _process_row(self, row, **kwargs):
         """ Row processor function override. """
-        key, values = row[0], self._rowtype(row[1:])
+        key, values = self._get_key(row), self._rowtype(row[self._keylen:])
         if key is None:
             return
-        if self._hascoordkey:
-            key = get_nodekey(*key)
+        if self._intern and self._columns is None:
+            # Replace equal strings by the first occurrence, so that only one string object is kept in memory
+            strings, values = self._strings, list(values)
+            for i in self._intern:
+                v = values[i]
+                if v.__class__ is str:
+                    values[i] = strings.setdefault(v, v)
+            values = self._rowtype(values)
+        stored = values
+        if self._columns is not None:
+            # In columnar mode, the values are appended to the columns and the lookup stores the row index
+            stored = self._numrows
+            self._numrows += 1
+            for column, value in zip(self._columns, values):
+                column.append(value)
         if self._dupekeys:
             v = self.setdefault(key, [])
-            v.append(values)
+            v.append(stored)
         else:
-            self[key] = values
+            self[key] = stored
+        for i, index in self._indexes.items():
+            index.setdefault(values[i], []).append(key)
+
+    def _process_batch(self, rows, **kwargs):
+        """ Batch processor function override. """
+        if self._dupekeys or self._keylen > 1 or self._hascoordkey or self._indexes or self._intern or \
+                self._columns is not None:
+            return super()._process_batch(rows, **kwargs)
+        # Fast path for simple key-row pairs
+        rowtype = self._rowtype
+        self.update((row[0], rowtype(row[1:])) for row in rows if row[0] is not None)
+
+    def _discard(self, key):
+        """ Removes the given key (and all its values) from the lookup and its secondary indexes. """
+        if key not in self:
+            return
+        for pos, index in self._indexes.items():
+            values = self._get_pos(key, pos)
+            for value in (values if self._dupekeys else (values, )):
+                keys = [k for k in index.get(value, ()) if k != key]
+                if keys:
+                    index[value] = keys
+                else:
+                    index.pop(value, None)
+        del self[key]
+
+    def _feed_changes(self, rows: _tp.List[tuple], **kwargs):
+        """ Feed changes function override. """
+        if self._columns is None:
+            return super()._feed_changes(rows, **kwargs)
+        # Collect the values of the changed rows and append them to the column arrays afterwards
+        columns, self._columns = self._columns, [[] for _ in self._columns]
+        try:
+            super()._feed_changes(rows, **kwargs)
+        finally:
+            for column, values in zip(columns, self._columns):
+                column.extend(values)
+            self._columns = columns
+
+    def _get_pos(self, key, pos: int, default=None) -> _tp.Any:
+        """ Returns the value at field position *pos* for the given key (or a list of values for duplicate keys). """
+        stored = self.get(key)
+        if stored is None:
+            return default
+        if self._columns is not None:
+            column = self._columns[pos]
+            return [column[i] for i in stored] if self._dupekeys else column[stored]
+        try:
+            return stored[pos]
+        except LookupError:
+            return default
+
+    def find_by(self, field: str, value: _tp.Any) -> _tp.List[_tp.Hashable]:
+        """
+        Returns a list of keys for which the given value field has the given value.
+        The *field* must be one of the index fields that were specified using the *indexes* option,
+        so that the keys can be found without scanning all lookup values.
+        If no matching keys were found, an empty list is returned.
+
+        Example:
+
+            >>> my_lookup = RowLookup('C:/Temp/test.gdb/my_table', 'GlobalID', ('Material', 'Owner'),
+            >>>                       indexes='Material')
+            >>> for key in my_lookup.find_by('Material', 'PE'):
+            >>>     print(my_lookup.get_value(key, 'Owner'))
+            'Town of Burgdorf'
+
+        :param field:       The (index) field name for which to find the value.
+        :param value:       The value to find.
+        :raises ValueError: If *field* is not an index field.
+        """
+        pos = self._fieldmap.get(field.lower())
+        _vld.pass_if(pos in self._indexes, ValueError, f'Field {field!r} is not an index field')
+        keys = dict.fromkeys(self._indexes[pos].get(value, ()))
+        if self._dupekeys:
+            return list(keys)
+        # If a key occurred multiple times in the input, only the last row was kept: skip outdated index entries
+        return [k for k in keys if self._get_pos(k, pos, _const.OBJ_EMPTY) == value]
 
     def get_value(self, key, field, default=None):
         """
@@ -429,98 +1376,1735 @@ class RowLookup(Lookup):
         :param default: The value to return when the value was not found. Defaults to ``None``.
         """
 
-        row = self.get(key, ())
         try:
-            return row[self._fieldmap[field.lower()]]
+            return self._get_pos(key, self._fieldmap[field.lower()], default)
         except LookupError:
             return default
 
+    def get_row(self, key, default=None) -> _tp.Union[tuple, list, None]:
+        """
+        Returns the values (i.e. row) for the given key, regardless of the storage mode.
+        For the default storage mode, this is the same as calling :func:`get`.
+        If the lookup has duplicate keys, a list of rows is returned.
 
-class NodeSet(set):
-    """
-    Builds a set of unique node keys for coordinates in a feature class.
-    The :func:`get_nodekey` function will be used to generate the coordinate hash.
-    When the feature class is Z aware, the node keys will be 3D as well.
-    Note that in all cases, M will be ignored.
+        :param key:     Key to find in the lookup dictionary.
+        :param default: The value to return when the key was not found. Defaults to ``None``.
+        """
+        stored = self.get(key)
+        if stored is None or self._columns is None:
+            return default if stored is None else stored
+        if self._dupekeys:
+            return [tuple(c[i] for c in self._columns) for i in stored]
+        return tuple(c[stored] for c in self._columns)
 
-    The ``NodeSet`` inherits all methods from the built-in Python ``set``.
+    def column(self, field: str, decode: bool = True) -> _np.ndarray:
+        """
+        Returns the typed NumPy array with all values for the given field in a columnar lookup (in row order).
+        This allows for the calculation of column statistics without having to read Python objects.
 
-    For feature classes with a geometry type other than Point, a NodeSet will be built from the first and last
-    points in a geometry. If this is not desired (i.e. all coordinates should be included), the user should set
-    the *all_vertices* option to ``True``.
-    An exception to this behavior is the Multipoint geometry: for this type, all coordinates will always be included.
+        Numeric fields are returned as ``int64`` or ``float64`` arrays (where ``NaN`` represents ``None``).
+        Text fields are returned as ``object`` arrays, unless *decode* is ``False``: in that case, an ``int32``
+        array of codes is returned, where each code refers to a unique string (and -1 represents ``None``).
 
-    **Params:**
+        .. note::   If keys occurred multiple times in the input (and *duplicate_keys* is ``False``),
+                    the array also contains the values of the overwritten rows.
 
-    -   **fc_path** (str):
+        :param field:       The field name (as used during initialization of the lookup).
+        :param decode:      If ``True`` (default), text field codes are decoded into strings.
+        :raises ValueError: If the lookup does not use columnar storage or if the field does not exist.
+        """
+        _vld.raise_if(self._columns is None, ValueError, f'{self.__class__.__name__} does not use columnar storage')
+        pos = self._fieldmap.get(field.lower())
+        _vld.raise_if(pos is None, ValueError, f'Field {field!r} does not exist')
+        column = self._columns[pos]
+        return column.decoded() if decode else column.data
 
-        The full path to the feature class.
 
-    -   **where_clause** (str, unicode, gpf.tools.queries.Where):
+# noinspection PyProtectedMember
+def enrich(cursor, lookup: _tp.Mapping, key_field: _tp.Union[str, _tp.Sequence[str]],
+           target_fields: _tp.Union[str, _tp.Sequence[str]], value_fields: _tp.Union[None, _tp.Sequence[str]] = None,
+           stats: _tp.Union[dict, None] = None) -> _tp.Generator[list, None, None]:
+    """
+    Generator that joins lookup values onto the rows of a cursor, using the cursor value(s) of *key_field*
+    as lookup key. All field positions are resolved once, so that the rows can be processed in a tight loop.
 
-        An optional where clause to filter the feature class.
+    If *cursor* is a ``SearchCursor``, the values are set on a copy of each row (list).
+    Target fields that are not part of the cursor fields are appended to the row (in the given order).
 
-    -   **all_vertices** (bool):
+    If *cursor* is an ``UpdateCursor``, the values are written back to the table, but only if they changed.
+    In that case, all target fields must be part of the cursor fields.
 
-        Defaults to ``False``. When set to ``True``, all geometry coordinates are included.
-        Otherwise, only the first and/or last points are considered.
+    If a key is not found in the lookup, the row is returned as-is (or with ``None`` values for the appended fields).
 
-    :raises ValueError:     If the input dataset is not a feature class or if the geometry type is MultiPatch.
-    """
+    Example:
 
-    def __init__(self, fc_path: str, where_clause: _tp.Union[None, str, _q.Where] = None, all_vertices: bool = False):
-        super().__init__()
-        self._populate(fc_path, where_clause, all_vertices)
+        >>> materials = RowLookup('C:/Temp/test.gdb/pipes', 'GlobalID', ('Material', 'Diameter'))
+        >>> with UpdateCursor('C:/Temp/test.gdb/valves', ('PipeGUID', 'Material', 'Diameter')) as cursor:
+        >>>     for row in enrich(cursor, materials, 'PipeGUID', ('Material', 'Diameter')):
+        >>>         pass
 
-    @staticmethod
-    def _get_desc(fc_path):
-        # Checks if the input dataset is valid and returns its Describe object
-        desc = _meta.Describe(fc_path)
-        if not desc.shapeType:
-            raise ValueError(f'Input dataset {_tu.to_repr(fc_path)} is not a feature class')
-        if desc.is_multipatchclass:
-            raise ValueError(f'Geometry type of {_tu.to_repr(fc_path)} is not supported')
-        return desc
+    **Params:**
 
-    def _fix_params(self, fc_path, all_vertices):
-        """
-        Returns a tuple of (field, all_vertices) based on the input parameters.
-        The shape type of the feature class sets the field name and may override *oll_vertices*.
-        """
+    -   **cursor**:
 
-        # The fastest way to fetch results is by reading coordinate tuples
-        desc = self._get_desc(fc_path)
-        field = _const.FIELD_XYZ if desc.hasZ else _const.FIELD_XY
-        if not desc.is_pointclass:
-            # However, for geometry types other than Point, we need to read the Shape object
-            field = _const.FIELD_SHAPE
-        if desc.is_multipointclass:
-            # Multipoints will be treated differently (always read all vertices)
-            all_vertices = True
+        A :class:`gpf.cursors.SearchCursor` or :class:`gpf.cursors.UpdateCursor` (or an ArcPy Data Access cursor).
 
-        return field, all_vertices
+    -   **lookup** (dict):
 
-    def _populate(self, fc_path, where_clause, all_vertices):
-        """ Populates the NodeSet with node keys. """
+        Any lookup dictionary (e.g. a :class:`ValueLookup`, :class:`RowLookup` or :class:`FrozenLookup`).
+        The values of a lookup with duplicate keys are lists, which are set as-is.
 
-        field, all_vertices = self._fix_params(fc_path, all_vertices)
+    -   **key_field** (str, unicode, list, tuple):
 
-        # Iterate over all geometries and add keys
-        with _cursors.SearchCursor(fc_path, field, where_clause) as rows:
-            for shape, in rows:
-                # If the geometry is a simple coordinate tuple, immediately add it
-                if field.startswith(_const.FIELD_XY):
-                    self.add(get_nodekey(*shape))
-                    continue
+        The cursor field(s) that contain the lookup key. Multiple fields result in a composite key (tuple).
+        If *SHAPE@X[Y[Z]]* is used as the key field, the key is turned into a node key.
 
-                if all_vertices:
-                    for coord in _geo.get_vertices(shape):
-                        self.add(get_nodekey(*coord))
-                    continue
+    -   **target_fields** (str, unicode, list, tuple):
 
-                # When *all_vertices* is False (or the geometry is not a Multipoint), only get the start/end nodes
-                self.add(get_nodekey(shape.firstPoint))
-                self.add(get_nodekey(shape.lastPoint))
+        The field or fields to set. If a single field is given, the entire lookup value is set.
+        Otherwise, the lookup values must be sequences (rows), of which the values are set in the same order.
+
+    -   **value_fields** (list, tuple):
+
+        If *lookup* is a :class:`RowLookup`, the lookup fields that should be set on the target fields.
+        By default, all lookup values are set in the order in which they are stored.
+
+    -   **stats** (dict):
+
+        An optional dictionary that keeps track of the number of processed rows (*rows*),
+        the number of rows for which the key was found (*matched*) and the number of updated rows (*updated*).
+
+    :raises ValueError: When a key or (update) target field is not part of the cursor fields,
+                        or when *value_fields* were specified for a lookup that is not a :class:`RowLookup`.
+    """
+    fields = [f.upper() for f in cursor.fields]
+    key_fields = list(key_field if _vld.is_iterable(key_field) else (key_field, ))
+    targets = list(target_fields if _vld.is_iterable(target_fields) else (target_fields, ))
+    is_update = hasattr(cursor, 'updateRow')
+
+    for field in key_fields + (targets if is_update else []):
+        _vld.pass_if(field.upper() in fields, ValueError, f'Field {field!r} is not part of the cursor fields')
+    key_pos = [fields.index(f.upper()) for f in key_fields]
+    target_pos = [fields.index(f.upper()) if f.upper() in fields else None for f in targets]
+    num_extra = target_pos.count(None)
+    target_pos = [len(fields) + target_pos[:i].count(None) if p is None else p for i, p in enumerate(target_pos)]
+
+    get = lookup.get_row if isinstance(lookup, RowLookup) else lookup.get
+    value_pos = None
+    if value_fields:
+        _vld.pass_if(isinstance(lookup, RowLookup), ValueError,
+                     f'value_fields can only be used with a {RowLookup.__name__}')
+        value_pos = [lookup._fieldmap[f.lower()] for f in value_fields]
+    single = not _vld.is_iterable(target_fields)
+    is_coord = len(key_pos) == 1 and key_fields[0].upper().startswith(_const.FIELD_X)
+    counts = {} if stats is None else stats
+    counts.update(rows=0, matched=0, updated=0)
+
+    for row in cursor:
+        counts['rows'] += 1
+        if len(key_pos) == 1:
+            key = row[key_pos[0]]
+            if is_coord and key is not None:
+                key = get_nodekey(*key)
+        else:
+            key = tuple(row[p] for p in key_pos)
+        out = list(row)
+        if num_extra and not is_update:
+            out.extend([None] * num_extra)
+
+        values = get(key, _const.OBJ_EMPTY)
+        if values is not _const.OBJ_EMPTY:
+            counts['matched'] += 1
+            if single:
+                values = (values, )
+            elif value_pos:
+                values = [values[p] for p in value_pos]
+            for p, v in zip(target_pos, values):
+                out[p] = v
+            if is_update and any(row[p] != out[p] for p in target_pos):
+                cursor.updateRow(out)
+                counts['updated'] += 1
+        yield out
+
+
+def _keyhash(key_data: bytes) -> int:
+    """ Returns a stable (i.e. process-independent) 64-bit hash for a pickled lookup key. """
+    return int.from_bytes(_hashlib.blake2b(key_data, digest_size=8).digest(), 'little')
+
+
+def _mix64(values: _np.ndarray) -> _np.ndarray:
+    """ Applies the SplitMix64 finalizer to an array of ``uint64`` values (i.e. a fast and stable integer hash). """
+    z = values + _np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> _np.uint64(30))) * _np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> _np.uint64(27))) * _np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> _np.uint64(31))
+
+
+def _hash_values(values: _tp.Sequence) -> _np.ndarray:
+    """
+    Returns an array of stable 64-bit hashes for the given values (in the same order).
+    Numbers are hashed in a vectorized way using their float64 representation,
+    so that equal integers and floats produce the same hash. All other values are hashed by their text.
+    """
+    is_number = _np.fromiter((isinstance(v, (int, float)) and not isinstance(v, bool) for v in values),
+                             dtype=bool, count=len(values))
+    hashes = _np.empty(len(values), dtype=_np.uint64)
+    hashes[is_number] = _mix64(_np.array([v for v, n in zip(values, is_number) if n],
+                                         dtype=_np.float64).view(_np.uint64))
+    others = [v for v, n in zip(values, is_number) if not n]
+    hashes[~is_number] = _np.fromiter((_keyhash(str(v).encode(_const.ENC_UTF8)) for v in others),
+                                      dtype=_np.uint64, count=len(others))
+    return hashes
+
+
+class FrozenLookup(object):
+    """
+    Read-only copy of a lookup (e.g. a :class:`ValueLookup` or :class:`RowLookup`) that is stored in a single
+    shared memory block or memory-mapped file, so that multiple worker processes can use it without copying it.
+
+    A ``FrozenLookup`` is created using :func:`FrozenLookup.from_lookup` and can be attached to by *name*
+    (i.e. the shared memory block name or the file path) using :func:`FrozenLookup.attach`.
+    Attaching does not read or copy any data, which makes it very fast.
+    When a ``FrozenLookup`` is pickled (e.g. when it is passed to a ``multiprocessing.Pool`` worker),
+    only its name is pickled: the worker process will simply attach to the same shared memory or file.
+
+    The keys are stored in a sorted array of stable 64-bit hashes that is searched using a binary search.
+    The values are only unpickled when they are requested.
+    The :func:`get`, :func:`get_value`, ``in`` and ``[]`` operations behave like the ones of the original lookup.
+    For columnar :class:`RowLookup` instances, the values are stored as rows (see :func:`RowLookup.get_row`).
+
+    Example:
+
+        >>> my_lookup = RowLookup('C:/Temp/test.gdb/my_table', 'GlobalID', ('Field1', 'Field2'))
+        >>> with FrozenLookup.from_lookup(my_lookup) as frozen:
+        >>>     with multiprocessing.Pool(12) as pool:
+        >>>         pool.map(my_worker_func, [(frozen, chunk) for chunk in chunks])
+
+    .. note::   Keys are found by the pickled representation of their value. This means that a key must
+                have the same (Python) type as the key in the original lookup: e.g. ``1`` will not match ``1.0``.
+                Shared memory requires Python 3.8 or higher. In older versions, use a file *path* instead.
+                On POSIX systems with Python < 3.13, shared memory blocks are removed when an unrelated process
+                that attached to it exits: use a file *path* if the lookup should be shared with such processes.
+
+    .. warning::    The process that created the ``FrozenLookup`` owns the shared memory or file and should call
+                    :func:`unlink` (or use the ``FrozenLookup`` as a context manager) when it is no longer needed.
+    """
+
+    _MAGIC = b'GPFLKP01'
+    _ALIGN = 8
+
+    __slots__ = '_name', '_owner', '_shm', '_file', '_buf', '_meta', '_hashes', '_offsets', '_fieldmap'
+
+    def __init__(self, name: str, owner: bool = False):
+        self._name = name
+        self._owner = owner
+        self._shm = self._file = None
+        if _os.path.isfile(name):
+            with open(name, 'rb') as f:
+                self._file = _mmap.mmap(f.fileno(), 0, access=_mmap.ACCESS_READ)
+            self._buf = memoryview(self._file)
+        else:
+            self._shm = self._open_shm(name)
+            self._buf = self._shm.buf
+        self._read_index()
+
+    @staticmethod
+    def _open_shm(name: str, size: int = 0):
+        """ Creates (if *size* is set) or attaches to a shared memory block. """
+        from multiprocessing import shared_memory
+        if size:
+            return shared_memory.SharedMemory(name, create=True, size=size)
+        try:
+            # Python 3.13+: attaching processes should not remove the block when they exit (POSIX only)
+            return shared_memory.SharedMemory(name, track=False)
+        except TypeError:
+            return shared_memory.SharedMemory(name)
+
+    def _read_index(self):
+        """ Reads the header and creates (zero-copy) views on the hash and offset arrays. """
+        buf = self._buf
+        _vld.pass_if(bytes(buf[:8]) == self._MAGIC, ValueError, f'{_tu.to_repr(self._name)} is not a FrozenLookup')
+        header_len = int.from_bytes(buf[8:16], 'little')
+        self._meta = _pickle.loads(buf[16:16 + header_len])
+        count = self._meta['count']
+        start = 16 + self._padded(header_len)
+        self._hashes = _np.frombuffer(buf, dtype=_np.uint64, count=count, offset=start)
+        self._offsets = _np.frombuffer(buf, dtype=_np.uint64, count=count + 1, offset=start + count * 8)
+        self._fieldmap = self._meta['fields']
+
+    @classmethod
+    def _padded(cls, size: int) -> int:
+        return -(-size // cls._ALIGN) * cls._ALIGN
+
+    @classmethod
+    def from_lookup(cls, lookup: dict, path: _tp.Union[str, None] = None,
+                    name: _tp.Union[str, None] = None) -> 'FrozenLookup':
+        """
+        Freezes the given lookup into a new shared memory block (default) or a file and returns the
+        (owning) ``FrozenLookup`` for it.
+
+        :param lookup:  The lookup (or any other ``dict``) to freeze. Keys and values must be picklable.
+        :param path:    If specified, the lookup is written to this file path instead of a shared memory block.
+        :param name:    An optional name for the shared memory block. If omitted, a unique name is generated.
+        """
+        is_rowlookup = isinstance(lookup, RowLookup)
+        keys = list(lookup.keys())
+        key_data = [_pickle.dumps(k, _PICKLE_PROTOCOL) for k in keys]
+        hashes = _np.fromiter((_keyhash(k) for k in key_data), dtype=_np.uint64, count=len(keys))
+        order = _np.argsort(hashes, kind='stable')
+        del key_data
+
+        # Write the (key, value) records in hash order and keep track of their offsets
+        blob = _io.BytesIO()
+        offsets = _np.zeros(len(keys) + 1, dtype=_np.uint64)
+        for i, k in enumerate(keys[j] for j in order.tolist()):
+            value = lookup.get_row(k) if is_rowlookup else lookup[k]
+            offsets[i + 1] = offsets[i] + blob.write(_pickle.dumps((k, value), _PICKLE_PROTOCOL))
+
+        header = _pickle.dumps({
+            'type': lookup.__class__.__name__,
+            'count': len(keys),
+            'fields': getattr(lookup, '_fieldmap', None) if is_rowlookup else None,
+            'dupekeys': getattr(lookup, '_dupekeys', False)
+        }, _PICKLE_PROTOCOL)
+        start = 16 + cls._padded(len(header))
+        data_start = start + (2 * len(keys) + 1) * 8
+        size = data_start + blob.tell()
+
+        target = bytearray(size) if path else None
+        shm = None if path else cls._open_shm(name or f'gpf_{_uuid.uuid4().hex[:16]}', size)
+        buf = memoryview(target) if path else shm.buf
+        buf[:8] = cls._MAGIC
+        buf[8:16] = len(header).to_bytes(8, 'little')
+        buf[16:16 + len(header)] = header
+        buf[start:start + len(keys) * 8] = hashes[order].tobytes()
+        buf[start + len(keys) * 8:data_start] = (offsets + data_start).tobytes()
+        buf[data_start:size] = blob.getbuffer()
+        if path:
+            with open(path, 'wb') as f:
+                f.write(target)
+            return cls(path, True)
+        # Keep the creating SharedMemory object open, so that the block is not removed on Windows
+        instance = cls.__new__(cls)
+        instance._name, instance._owner, instance._shm, instance._file = shm.name, True, shm, None
+        instance._buf = shm.buf
+        instance._read_index()
+        return instance
+
+    @classmethod
+    def attach(cls, name: str) -> 'FrozenLookup':
+        """
+        Attaches to an existing ``FrozenLookup`` by its shared memory block name or file path.
+
+        :param name:        The shared memory block name or the file path (see :attr:`name`).
+        :raises ValueError: If the shared memory block or file does not contain a ``FrozenLookup``.
+        """
+        return cls(name)
+
+    def __reduce__(self):
+        # Only pickle the name, so that the receiving process attaches to the same data
+        return self.__class__.attach, (self._name, )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._owner:
+            self.unlink()
+        else:
+            self.close()
+
+    def __len__(self):
+        return self._meta['count']
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self._meta["type"]}, {len(self)} keys, name={self._name!r})'
+
+    def _find(self, key) -> _tp.Tuple[bool, _tp.Any]:
+        """ Returns a tuple of (found, value) for the given key. """
+        key_hash = _np.uint64(_keyhash(_pickle.dumps(key, _PICKLE_PROTOCOL)))
+        lo = int(_np.searchsorted(self._hashes, key_hash, 'left'))
+        hi = int(_np.searchsorted(self._hashes, key_hash, 'right'))
+        for i in range(lo, hi):
+            k, value = _pickle.loads(self._buf[int(self._offsets[i]):int(self._offsets[i + 1])])
+            if k == key:
+                return True, value
+        return False, None
+
+    def __contains__(self, key) -> bool:
+        return self._find(key)[0]
+
+    def __getitem__(self, key):
+        found, value = self._find(key)
+        if not found:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self) -> _tp.Iterator:
+        for i in range(len(self)):
+            yield _pickle.loads(self._buf[int(self._offsets[i]):int(self._offsets[i + 1])])[0]
+
+    @property
+    def name(self) -> str:
+        """ Returns the name of the shared memory block or the file path, which can be used to attach to it. """
+        return self._name
+
+    def get(self, key, default=None) -> _tp.Any:
+        """
+        Returns the value for the given key or *default* if the key was not found.
+
+        :param key:     Key to find in the lookup.
+        :param default: The value to return when the key was not found. Defaults to ``None``.
+        """
+        found, value = self._find(key)
+        return value if found else default
+
+    def get_value(self, key, field: str, default=None) -> _tp.Any:
+        """
+        Looks up a value by key for one specific field. See :func:`RowLookup.get_value`.
+        If the lookup has duplicate keys, a list of values is returned.
+
+        :param key:         Key to find in the lookup.
+        :param field:       The field name (as used during initialization of the original lookup).
+        :param default:     The value to return when the value was not found. Defaults to ``None``.
+        :raises ValueError: If the frozen lookup was not created from a :class:`RowLookup`.
+        """
+        _vld.raise_if(self._fieldmap is None, ValueError,
+                      f'get_value() requires a frozen {RowLookup.__name__}, not a {self._meta["type"]}')
+        found, row = self._find(key)
+        pos = self._fieldmap.get(field.lower())
+        if not found or pos is None:
+            return default
+        return [r[pos] for r in row] if self._meta['dupekeys'] else row[pos]
+
+    def close(self):
+        """ Detaches from the shared memory block or file. The ``FrozenLookup`` cannot be used afterwards. """
+        if self._buf is None:
+            return
+        # All views on the buffer must be released before it can be closed
+        self._hashes = self._offsets = None
+        self._buf.release()
+        self._buf = None
+        if self._shm:
+            self._shm.close()
+        if self._file:
+            self._file.close()
+
+    def unlink(self):
+        """ Closes the ``FrozenLookup`` and removes the shared memory block or file. Should be called by the owner. """
+        self.close()
+        if self._shm:
+            self._shm.unlink()
+        elif _os.path.isfile(self._name):
+            _os.remove(self._name)
+
+
+class RangeLookup(object):
+    """
+    RangeLookup(table_path, from_field, to_field, value_field(s), {where_clause}, {inclusive})
+
+    Creates an interval lookup from a table with a "from" and "to" column, e.g. for linear referencing measures,
+    validity date ranges or address number ranges. For a given value, the lookup returns the value(s) of the
+    range(s) that contain it, using a binary search on a sorted interval index (i.e. without scanning all ranges).
+
+    The range bounds split the value axis into elementary intervals (the bounds themselves and the open intervals
+    in between), for which the matching range is precomputed. This makes each query a single O(log n) binary search,
+    also if ranges overlap or are open-ended. To find *all* ranges that contain a value, a max-tree over the range
+    ends is used, so that only the subtrees that contain matching ranges are visited.
+
+    The range bounds must be numeric or dates (``datetime``). A ``None`` (NULL) bound is considered to be open,
+    i.e. the range starts at minus infinity or ends at plus infinity. Rows where both bounds are ``None`` are skipped.
+
+    Example:
+
+        >>> ranges = RangeLookup('C:/Temp/test.gdb/house_numbers', 'NUM_FROM', 'NUM_TO', 'STREET_ID')
+        >>> ranges.get(17)
+        1234
+        >>> ranges.get_many([17, 4, 99999])
+        [1234, 1234, None]
+
+    **Params:**
+
+    -   **table_path** (str, unicode):
+
+        Full source table or feature class path.
+
+    -   **from_field** (str, unicode):
+
+        The field that contains the start values of the ranges.
+
+    -   **to_field** (str, unicode):
+
+        The field that contains the end values of the ranges.
+
+    -   **value_fields** (list, tuple, str, unicode):
+
+        The field or fields to include as the lookup value(s).
+        If multiple fields are specified, the values are returned as tuples.
+
+    -   **where_clause** (str, unicode, :class:`gpf.tools.queries.Where`):
+
+        An optional where clause to filter the table.
+
+    -   **inclusive** (bool):
+
+        If ``True`` (default), the end value is part of the range (i.e. *from* <= value <= *to*).
+        If ``False``, the range is half-open (i.e. *from* <= value < *to*), which is typical for validity dates.
+
+    :raises RuntimeError:       When the lookup cannot be created or populated.
+    :raises ValueError:         When a specified lookup field does not exist in the source table.
+    """
+
+    __slots__ = '_inclusive', '_isdate', '_bounds', '_first', '_size', '_tree', '_slots', '_values'
+
+    def __init__(self, table_path: str, from_field: str, to_field: str,
+                 value_fields: _tp.Union[str, _tp.Sequence[str]],
+                 where_clause: _tp.Union[None, str, _q.Where] = None, inclusive: bool = True):
+        _vld.pass_if(all(_vld.has_value(v) for v in (table_path, from_field, to_field, value_fields)), ValueError,
+                     f'{RangeLookup.__name__} requires valid table_path, from_field, to_field and value_fields')
+        self._inclusive = inclusive
+        value_fields = tuple(value_fields if _vld.is_iterable(value_fields) else (value_fields, ))
+        fields = (from_field, to_field) + value_fields
+
+        try:
+            Lookup._check_fields(fields, Lookup._get_fields(table_path))
+            bounds, values = [], []
+            with _cursors.SearchCursor(table_path, fields, where_clause) as rows:
+                for row in rows:
+                    if row[0] is None and row[1] is None:
+                        continue
+                    bounds.append((row[0], row[1]))
+                    values.append(row[2:] if len(row) > 3 else row[2])
+        except Exception as e:
+            raise RuntimeError(f'Failed to create {self.__class__.__name__} for {_tu.to_repr(table_path)}: {e}')
+
+        self._build(bounds, values)
+
+    @classmethod
+    def from_ranges(cls, ranges: _tp.Iterable[_tp.Tuple[_tp.Any, _tp.Any, _tp.Any]],
+                    inclusive: bool = True) -> 'RangeLookup':
+        """
+        Creates a ``RangeLookup`` from an iterable of (from, to, value) tuples.
+
+        :param ranges:      An iterable of (from, to, value) tuples.
+        :param inclusive:   If ``True`` (default), the end value is part of the range.
+        """
+        instance = cls.__new__(cls)
+        instance._inclusive = inclusive
+        bounds, values = [], []
+        for lo, hi, value in ranges:
+            if lo is None and hi is None:
+                continue
+            bounds.append((lo, hi))
+            values.append(value)
+        instance._build(bounds, values)
+        return instance
+
+    def _to_array(self, values: _tp.Iterable, fill: _tp.Union[None, bool] = None) -> _np.ndarray:
+        """
+        Converts range bounds or query values into a ``float64`` array or (for dates) an ``int64`` array of
+        microseconds. If *fill* is ``False``, ``None`` is replaced by the minimum value, if ``True``, by the maximum.
+        """
+        if self._isdate:
+            limits = _np.iinfo(_np.int64).min + 1, _np.iinfo(_np.int64).max
+            arr = _np.array(values, dtype='datetime64[us]').view(_np.int64)
+            if fill is not None:
+                arr[arr == _np.iinfo(_np.int64).min] = limits[fill]
+            return arr
+        arr = _np.array(values, dtype=_np.float64)
+        if fill is not None:
+            arr[_np.isnan(arr)] = _np.inf if fill else -_np.inf
+        return arr
+
+    def _build(self, bounds: _tp.List[tuple], values: _tp.List):
+        """
+        Sorts the ranges by their start value and builds the interval index. Each query value maps to a slot:
+        slot 2k + 1 is the k-th unique range bound itself and slot 2k is the open interval just before it.
+        """
+        first = next((v for b in bounds for v in b if v is not None), None)
+        self._isdate = isinstance(first, (_dt.date, _np.datetime64))
+        starts = self._to_array([b[0] for b in bounds], False)
+        ends = self._to_array([b[1] for b in bounds], True)
+        order = _np.argsort(starts, kind='stable')
+        starts, ends = starts[order], ends[order]
+        self._values = [values[i] for i in order.tolist()]
+        self._bounds = _np.unique(_np.concatenate((starts, ends)))
+
+        # First and last slot covered by each range. Because the ranges are sorted by start, so are the first slots.
+        # Ranges that do not cover any slot (i.e. empty half-open ranges) get a last slot of -1.
+        self._first = 2 * _np.searchsorted(self._bounds, starts) + 1
+        last = 2 * _np.searchsorted(self._bounds, ends) + int(self._inclusive)
+        last[last < self._first] = -1
+
+        # Max-tree over the last slots: node j holds the maximum of its children 2j and 2j + 1 (the root is node 1)
+        self._size = 1 << max(len(last) - 1, 0).bit_length()
+        self._tree = _np.full(2 * self._size, -1, dtype=_np.int64)
+        self._tree[self._size:self._size + len(last)] = last
+        for level in reversed(range(self._size.bit_length() - 1)):
+            lo, hi = 1 << level, 2 << level
+            self._tree[lo:hi] = _np.maximum(self._tree[2 * lo:2 * hi:2], self._tree[2 * lo + 1:2 * hi:2])
+
+        # Precompute the matching range (i.e. the one with the largest start) for each slot
+        slots = _np.arange(2 * len(self._bounds) + 1)
+        self._slots = self._find_last(_np.searchsorted(self._first, slots, 'right') - 1, slots)
+
+    def _to_slots(self, x: _np.ndarray) -> _np.ndarray:
+        """ Returns the slot (see :func:`_build`) of each value in *x*. """
+        k = _np.searchsorted(self._bounds, x)
+        exact = k < len(self._bounds)
+        exact[exact] = self._bounds[k[exact]] == x[exact]
+        return 2 * k + exact
+
+    def _find_last(self, last: _np.ndarray, slots: _np.ndarray) -> _np.ndarray:
+        """
+        Returns the index of the last range up to (and including) index *last* that covers the given slot
+        (or -1 if there is none) for all (*last*, *slots*) pairs at once. Since all ranges up to *last* start
+        before the slot, such a range covers the slot if its last slot (i.e. its value in the max-tree) is not smaller.
+        """
+        result = _np.full(len(slots), -1, dtype=_np.int64)
+        active = _np.flatnonzero(last >= 0)
+        nodes = last[active] + self._size
+        slots = slots[active]
+
+        # Move up and to the left, until a (sub)tree is found that contains a covering range
+        climb = self._tree[nodes] < slots
+        while climb.any():
+            # Strip the trailing zero bits (i.e. move up while the node is a left child) and go to the left sibling.
+            # If the node has no left sibling (i.e. it is the leftmost node of its level), there is no covering range.
+            up = nodes[climb]
+            up //= up & -up
+            nodes[climb] = up - 1
+            keep = nodes != 0
+            active, nodes, slots = active[keep], nodes[keep], slots[keep]
+            climb = self._tree[nodes] < slots
+
+        # Move down to the rightmost covering leaf
+        down = nodes < self._size
+        while down.any():
+            right = 2 * nodes[down] + 1
+            nodes[down] = _np.where(self._tree[right] >= slots[down], right, right - 1)
+            down = nodes < self._size
+        result[active] = nodes - self._size
+        return result
+
+    def __len__(self):
+        return len(self._values)
+
+    def __contains__(self, value) -> bool:
+        return self.index(value) >= 0
+
+    def index(self, value) -> int:
+        """
+        Returns the (sorted) index of the range that contains the given value, or -1 if no range was found.
+        If multiple ranges contain the value, the one with the largest start value is returned.
+
+        :param value:   The numeric or date value to find.
+        """
+        return int(self.index_many([value])[0])
+
+    def get(self, value, default=None) -> _tp.Any:
+        """
+        Returns the value(s) of the range that contains the given value.
+        If multiple ranges contain the value, the one with the largest start value is used (see :func:`get_all`).
+
+        :param value:   The numeric or date value to find.
+        :param default: The value to return when no range was found. Defaults to ``None``.
+        """
+        i = self.index(value)
+        return default if i < 0 else self._values[i]
+
+    def get_all(self, value) -> _tp.List:
+        """
+        Returns a list with the value(s) of all ranges that contain the given value, ordered by range start.
+        This takes O(k log n) time, where k is the number of matching ranges.
+
+        :param value:   The numeric or date value to find.
+        """
+        slot = self._to_slots(self._to_array([value]))
+        found = []
+        i = self._slots[slot]
+        while i[0] >= 0:
+            found.append(self._values[i[0]])
+            i = self._find_last(i - 1, slot)
+        return found[::-1]
+
+    def index_many(self, values: _tp.Union[_np.ndarray, _tp.Sequence]) -> _np.ndarray:
+        """
+        Batch version of :func:`index`: returns an array of range indices (or -1) for an array of values.
+        This is a single vectorized binary search, also if ranges overlap.
+
+        :param values:  An array-like of numeric or date values.
+        """
+        return self._slots[self._to_slots(self._to_array(values))]
+
+    def get_many(self, values: _tp.Union[_np.ndarray, _tp.Sequence], default=None) -> _tp.List:
+        """
+        Batch version of :func:`get`: returns a list with the value(s) of the matching range for each given value.
+
+        :param values:  An array-like of numeric or date values.
+        :param default: The value to use when no range was found. Defaults to ``None``.
+        """
+        return [default if i < 0 else self._values[i] for i in self.index_many(values).tolist()]
+
+
+class PointLookup(object):
+    """
+    PointLookup(fc_path, {value_fields}, {where_clause})
+
+    Creates a nearest-neighbour lookup for the points in a point feature class, which can be used to find the
+    nearest point(s) for a coordinate or all points within a certain distance (e.g. to snap field observations to
+    the nearest asset). The points are indexed using a static KD-tree on a NumPy coordinate array,
+    so that a query only has to check a few small groups of points.
+
+    Distances are measured in the XY plane, in the units of the feature class coordinate system.
+    If the feature class is Z-aware, the Z values are stored as well (see :attr:`coords`), but they are ignored
+    by the queries. Features without a geometry are skipped.
+
+    For the ``nearest`` and ``within`` methods, the results are lists of (distance, value) tuples.
+    The batch variants (``nearest_many`` and ``within_many``) return point indices instead, which refer to the
+    :attr:`coords` and :attr:`values` of the lookup.
+
+    Example:
+
+        >>> valves = PointLookup('C:/Temp/test.gdb/valves', 'GlobalID')
+        >>> valves.nearest(2600010.5, 1200020.0)
+        [(0.7071, '{628ee94d-2063-47be-b57f-8c2af6345d4e}')]
+        >>> distances, indices = valves.nearest_many([(2600010.5, 1200020.0), (2600100.0, 1200000.0)], k=2)
+
+    **Params:**
+
+    -   **fc_path** (str, unicode):
+
+        The full path to the point feature class.
+
+    -   **value_fields** (list, tuple, str, unicode):
+
+        The field or fields to include as the lookup value(s). If multiple fields are specified,
+        the values are returned as tuples. If omitted, the Object ID is used as value.
+
+    -   **where_clause** (str, unicode, :class:`gpf.tools.queries.Where`):
+
+        An optional where clause to filter the feature class.
+
+    :raises RuntimeError:       When the lookup cannot be created or populated.
+    :raises ValueError:         When a specified lookup field does not exist in the source table,
+                                or when the source is not a point feature class.
+    """
+
+    __slots__ = '_coords', '_values', '_ranges', '_children', '_bounds'
+
+    # Maximum number of points in a leaf node of the KD-tree
+    _LEAF_SIZE = 16
+
+    # Maximum number of coordinates that the batch queries process at once
+    _BATCH_SIZE = 8192
+
+    def __init__(self, fc_path: str, value_fields: _tp.Union[None, str, _tp.Sequence[str]] = None,
+                 where_clause: _tp.Union[None, str, _q.Where] = None):
+        value_fields = tuple(value_fields if _vld.is_iterable(value_fields) else (value_fields or _const.FIELD_OID, ))
+        desc = NodeSet._get_desc(fc_path)
+        _vld.pass_if(desc.is_pointclass, ValueError, f'{_tu.to_repr(fc_path)} is not a point feature class')
+        fields = (_const.FIELD_XYZ if desc.hasZ else _const.FIELD_XY, ) + value_fields
+
+        try:
+            Lookup._check_fields(fields, Lookup._get_fields(fc_path))
+            coords, values = [], []
+            with _cursors.SearchCursor(fc_path, fields, where_clause) as rows:
+                for row in rows:
+                    if row[0] is None or row[0][0] is None:
+                        continue
+                    coords.append(row[0])
+                    values.append(row[1:] if len(row) > 2 else row[1])
+        except Exception as e:
+            raise RuntimeError(f'Failed to create {self.__class__.__name__} for {_tu.to_repr(fc_path)}: {e}')
+
+        self._build(_np.array(coords, dtype=_np.float64).reshape(len(coords), -1), values)
+
+    @classmethod
+    def from_coords(cls, coords: _tp.Union[_np.ndarray, _tp.Sequence],
+                    values: _tp.Union[None, _tp.Sequence] = None) -> 'PointLookup':
+        """
+        Creates a ``PointLookup`` from an (N, 2) or (N, 3) array (or sequence) of coordinates,
+        e.g. the vertices of a :func:`gpf.tools.geometry.get_vertex_arrays` result.
+
+        :param coords:      The point coordinates.
+        :param values:      The values for each point. If omitted, the (original) point index is used as value.
+        :raises ValueError: If the coordinates have a bad shape or if the number of values does not match.
+        """
+        coords = _np.asarray(coords, dtype=_np.float64)
+        _vld.pass_if(coords.ndim == 2 and coords.shape[1] in (2, 3), ValueError, 'Coordinates must be 2D or 3D')
+        values = list(range(len(coords)) if values is None else values)
+        _vld.pass_if(len(values) == len(coords), ValueError, 'The number of values must match the number of points')
+        instance = cls.__new__(cls)
+        instance._build(coords, values)
+        return instance
+
+    def _build(self, coords: _np.ndarray, values: _tp.List):
+        """ Builds the KD-tree and stores the coordinates and values in tree order. """
+        num_points = len(coords)
+        order = _np.arange(num_points)
+        xy = coords[:, :2]
+        ranges, children = [(0, num_points)], [(-1, -1)]
+        level = [0] if num_points > self._LEAF_SIZE else []
+        while level:
+            # Sort the points of all nodes on this level along the dimension with the largest spread (per node)
+            starts, ends = _np.array([ranges[n] for n in level], dtype=_np.int64).T
+            sizes = ends - starts
+            offsets = _np.cumsum(sizes) - sizes
+            node_ids = _np.repeat(_np.arange(len(level)), sizes)
+            positions = _np.arange(sizes.sum()) - offsets[node_ids] + starts[node_ids]
+            points = xy[order[positions]]
+            lower = _np.minimum.reduceat(points, offsets)
+            spread = _np.maximum.reduceat(points, offsets) - lower
+            dims = spread.argmax(axis=1)
+            # Scale the coordinates to [0, 1) per node and add the node number, so that a single sort suffices
+            scale = 1. / (spread[_np.arange(len(level)), dims] * (1 + 1e-9) + 1e-300)
+            sort_keys = (points[_np.arange(len(points)), dims[node_ids]] - lower[node_ids, dims[node_ids]]) * \
+                scale[node_ids] + node_ids
+            order[positions] = order[positions][_np.argsort(sort_keys)]
+
+            # Split each node at the median
+            next_level = []
+            for node, start, end in zip(level, starts.tolist(), ends.tolist()):
+                mid = start + (end - start) // 2
+                children[node] = (len(ranges), len(ranges) + 1)
+                for child_range in ((start, mid), (mid, end)):
+                    if child_range[1] - child_range[0] > self._LEAF_SIZE:
+                        next_level.append(len(ranges))
+                    ranges.append(child_range)
+                    children.append((-1, -1))
+            level = next_level
+
+        self._coords = coords[order]
+        self._values = [values[i] for i in order.tolist()]
+        self._ranges = _np.array(ranges, dtype=_np.int64)
+        self._children = _np.array(children, dtype=_np.int64)
+
+        # Get the bounding box of each node: reduceat() reduces each (start, end) range if it is used pairwise
+        bounds = _np.full((len(ranges), 4), _np.nan)
+        if num_points:
+            xy = _np.vstack((self._coords[:, :2], _np.zeros((1, 2))))
+            pairs = self._ranges.ravel()
+            bounds[:, :2] = _np.minimum.reduceat(xy, pairs)[::2]
+            bounds[:, 2:] = _np.maximum.reduceat(xy, pairs)[::2]
+        self._bounds = bounds
+
+    def __len__(self):
+        return len(self._coords)
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({len(self)} points)'
+
+    @property
+    def coords(self) -> _np.ndarray:
+        """ Returns a read-only (N, 2) or (N, 3) array of all point coordinates (in tree order). """
+        view = self._coords.view()
+        view.flags.writeable = False
+        return view
+
+    @property
+    def values(self) -> _tp.List:
+        """ Returns the list of values for all points (in the same order as :attr:`coords`). """
+        return self._values
+
+    @staticmethod
+    def _as_coords(coords: _tp.Union[_np.ndarray, _tp.Sequence]) -> _np.ndarray:
+        """ Returns the given query coordinates as a 2D ``float64`` array. """
+        coords = _np.asarray(coords, dtype=_np.float64)
+        return coords.reshape(-1, coords.shape[-1] if coords.ndim > 1 else 2)
+
+    def _box_dist2(self, node: int, x: float, y: float) -> float:
+        """ Returns the squared distance from (x, y) to the bounding box of the given node. """
+        xmin, ymin, xmax, ymax = self._bounds[node].tolist()
+        dx = max(xmin - x, 0., x - xmax)
+        dy = max(ymin - y, 0., y - ymax)
+        return dx * dx + dy * dy
+
+    def _leaf_dist2(self, node: int, x: float, y: float) -> _tp.Tuple[_np.ndarray, _np.ndarray]:
+        """ Returns the point indices of a leaf node and their squared distances to (x, y). """
+        start, end = self._ranges[node].tolist()
+        xy = self._coords[start:end, :2]
+        return _np.arange(start, end), (xy[:, 0] - x) ** 2 + (xy[:, 1] - y) ** 2
+
+    def _nearest(self, x: float, y: float, k: int) -> _tp.Tuple[_np.ndarray, _np.ndarray]:
+        """ Returns the squared distances and indices of the k nearest points (padded with inf and -1). """
+        best_d2 = _np.full(k, _np.inf)
+        best_idx = _np.full(k, -1, dtype=_np.int64)
+        if not len(self):
+            return best_d2, best_idx
+        queue = [(0., 0)]
+        while queue:
+            dist2, node = _heapq.heappop(queue)
+            if dist2 > best_d2[-1]:
+                break
+            left, right = self._children[node].tolist()
+            if left < 0:
+                idx, d2 = self._leaf_dist2(node, x, y)
+                d2 = _np.concatenate((best_d2, d2))
+                keep = _np.argsort(d2, kind='stable')[:k]
+                best_d2, best_idx = d2[keep], _np.concatenate((best_idx, idx))[keep]
+                continue
+            for child in (left, right):
+                child_dist2 = self._box_dist2(child, x, y)
+                if child_dist2 <= best_d2[-1]:
+                    _heapq.heappush(queue, (child_dist2, child))
+        return best_d2, best_idx
+
+    def _within(self, x: float, y: float, radius: float) -> _tp.Tuple[_np.ndarray, _np.ndarray]:
+        """ Returns the squared distances and indices of all points within *radius* of (x, y), sorted by distance. """
+        r2 = radius * radius
+        found_d2, found_idx = [], []
+        stack = [0] if len(self) else []
+        while stack:
+            node = stack.pop()
+            if self._box_dist2(node, x, y) > r2:
+                continue
+            left, right = self._children[node].tolist()
+            if left >= 0:
+                stack.extend((left, right))
+                continue
+            idx, d2 = self._leaf_dist2(node, x, y)
+            hit = d2 <= r2
+            found_d2.append(d2[hit])
+            found_idx.append(idx[hit])
+        if not found_d2:
+            return _np.empty(0), _np.empty(0, dtype=_np.int64)
+        d2, idx = _np.concatenate(found_d2), _np.concatenate(found_idx)
+        order = _np.argsort(d2, kind='stable')
+        return d2[order], idx[order]
+
+    def _box_dist2_many(self, nodes: _np.ndarray, xy: _np.ndarray) -> _np.ndarray:
+        """ Returns the squared distances from each (x, y) row to the bounding box of the corresponding node. """
+        bounds = self._bounds[nodes]
+        delta = _np.maximum(_np.maximum(bounds[:, :2] - xy, xy - bounds[:, 2:]), 0.)
+        return (delta * delta).sum(axis=1)
+
+    def _leaf_dist2_many(self, queries: _np.ndarray, nodes: _np.ndarray,
+                         xy: _np.ndarray) -> _tp.Tuple[_np.ndarray, _np.ndarray, _np.ndarray]:
+        """
+        Returns the query numbers, point indices and squared distances for all points in the given leaf nodes,
+        where each leaf node is paired with the query at the same position in *queries*.
+        """
+        starts, ends = self._ranges[nodes].T
+        sizes = ends - starts
+        pair_ids = _np.repeat(_np.arange(len(nodes)), sizes)
+        idx = _np.arange(sizes.sum()) - (_np.cumsum(sizes) - sizes)[pair_ids] + starts[pair_ids]
+        queries = queries[pair_ids]
+        return queries, idx, ((self._coords[idx, :2] - xy[queries]) ** 2).sum(axis=1)
+
+    def _nearest_batch(self, xy: _np.ndarray, k: int) -> _tp.Tuple[_np.ndarray, _np.ndarray]:
+        """
+        Returns (M, k) arrays with the squared distances and indices of the k nearest points (padded with inf and -1)
+        for an (M, 2) array of coordinates. All coordinates descend the KD-tree together:
+        first straight to their closest leaf (to get an initial search radius), then through all remaining nodes
+        that might still hold a closer point.
+        """
+        num_queries = len(xy)
+        best_d2 = _np.full((num_queries, k), _np.inf)
+        best_idx = _np.full((num_queries, k), -1, dtype=_np.int64)
+        all_queries = _np.arange(num_queries)
+
+        def update(queries, idx, d2):
+            # Merges the candidates with the current best results of the affected queries
+            touched = _np.unique(queries)
+            queries = _np.concatenate((_np.repeat(touched, k), queries))
+            idx = _np.concatenate((best_idx[touched].ravel(), idx))
+            d2 = _np.concatenate((best_d2[touched].ravel(), d2))
+            order = _np.lexsort((d2, queries))
+            queries, idx, d2 = queries[order], idx[order], d2[order]
+            rank = _np.arange(len(queries)) - _np.searchsorted(queries, queries)
+            keep = rank < k
+            best_d2[queries[keep], rank[keep]] = d2[keep]
+            best_idx[queries[keep], rank[keep]] = idx[keep]
+
+        # Descend to the closest leaf for an initial result
+        first_leaf = _np.zeros(num_queries, dtype=_np.int64)
+        inner = self._children[first_leaf, 0] >= 0
+        while inner.any():
+            queries = all_queries[inner]
+            left, right = self._children[first_leaf[queries]].T
+            closer_left = self._box_dist2_many(left, xy[queries]) <= self._box_dist2_many(right, xy[queries])
+            first_leaf[queries] = _np.where(closer_left, left, right)
+            inner[queries] = self._children[first_leaf[queries], 0] >= 0
+        update(*self._leaf_dist2_many(all_queries, first_leaf, xy))
+
+        # Visit all other nodes that are not further away than the current k-th nearest point
+        queries, nodes = all_queries, _np.zeros_like(first_leaf)
+        while len(queries):
+            keep = self._box_dist2_many(nodes, xy[queries]) <= best_d2[queries, -1]
+            queries, nodes = queries[keep], nodes[keep]
+            left, right = self._children[nodes].T
+            leaf = (left < 0) & (nodes != first_leaf[queries])
+            if leaf.any():
+                update(*self._leaf_dist2_many(queries[leaf], nodes[leaf], xy))
+            inner = left >= 0
+            queries = _np.repeat(queries[inner], 2)
+            nodes = _np.column_stack((left[inner], right[inner])).ravel()
+        return best_d2, best_idx
+
+    def _within_batch(self, xy: _np.ndarray, radius: float) -> _tp.List[_np.ndarray]:
+        """
+        Returns a list with the indices of all points within *radius* (sorted by distance)
+        for each coordinate in an (M, 2) array. All coordinates descend the KD-tree together.
+        """
+        r2 = radius * radius
+        found_queries, found_idx, found_d2 = [], [], []
+        queries = _np.arange(len(xy))
+        nodes = _np.zeros(len(xy), dtype=_np.int64)
+        while len(queries) and len(self):
+            keep = self._box_dist2_many(nodes, xy[queries]) <= r2
+            queries, nodes = queries[keep], nodes[keep]
+            left, right = self._children[nodes].T
+            leaf = left < 0
+            hit_queries, idx, d2 = self._leaf_dist2_many(queries[leaf], nodes[leaf], xy)
+            hit = d2 <= r2
+            found_queries.append(hit_queries[hit])
+            found_idx.append(idx[hit])
+            found_d2.append(d2[hit])
+            queries = _np.repeat(queries[~leaf], 2)
+            nodes = _np.column_stack((left[~leaf], right[~leaf])).ravel()
+        if not found_idx:
+            return [_np.empty(0, dtype=_np.int64) for _ in range(len(xy))]
+        queries, idx, d2 = (_np.concatenate(found) for found in (found_queries, found_idx, found_d2))
+        order = _np.lexsort((idx, d2, queries))
+        splits = _np.cumsum(_np.bincount(queries, minlength=len(xy)))[:-1]
+        return _np.split(idx[order], splits)
+
+    def _results(self, d2: _np.ndarray, idx: _np.ndarray) -> _tp.List[_tp.Tuple[float, _tp.Any]]:
+        """ Returns a list of (distance, value) tuples for the given squared distances and point indices. """
+        return [(d, self._values[i]) for d, i in zip(_np.sqrt(d2).tolist(), idx.tolist()) if i >= 0]
+
+    def nearest(self, x: float, y: float, k: int = 1) -> _tp.List[_tp.Tuple[float, _tp.Any]]:
+        """
+        Returns a list of (distance, value) tuples for the *k* nearest points of the given coordinate,
+        sorted by distance. If the lookup has less than *k* points, less tuples are returned.
+
+        :param x:   The X coordinate.
+        :param y:   The Y coordinate.
+        :param k:   The number of points to return. Defaults to 1.
+        """
+        _vld.pass_if(k >= 1, ValueError, 'k must be a positive integer')
+        return self._results(*self._nearest(float(x), float(y), int(k)))
+
+    def within(self, x: float, y: float, radius: float) -> _tp.List[_tp.Tuple[float, _tp.Any]]:
+        """
+        Returns a list of (distance, value) tuples for all points within *radius* of the given coordinate,
+        sorted by distance.
+
+        :param x:       The X coordinate.
+        :param y:       The Y coordinate.
+        :param radius:  The search radius (inclusive).
+        """
+        return self._results(*self._within(float(x), float(y), float(radius)))
+
+    def nearest_many(self, coords: _tp.Union[_np.ndarray, _tp.Sequence],
+                     k: int = 1) -> _tp.Tuple[_np.ndarray, _np.ndarray]:
+        """
+        Finds the *k* nearest points for each of the given coordinates.
+        Returns an (M, k) ``float64`` array of distances and an (M, k) ``int64`` array of point indices
+        (which refer to :attr:`coords` and :attr:`values`). If the lookup has less than *k* points,
+        the missing results have a distance of ``inf`` and an index of -1.
+
+        :param coords:  An (M, 2) or (M, 3) array (or sequence) of coordinates.
+        :param k:       The number of points to find per coordinate. Defaults to 1.
+        """
+        _vld.pass_if(k >= 1, ValueError, 'k must be a positive integer')
+        coords = self._as_coords(coords)[:, :2]
+        distances = _np.empty((len(coords), k))
+        indices = _np.empty((len(coords), k), dtype=_np.int64)
+        for start in range(0, len(coords), self._BATCH_SIZE):
+            end = start + self._BATCH_SIZE
+            distances[start:end], indices[start:end] = self._nearest_batch(coords[start:end], int(k))
+        return _np.sqrt(distances), indices
+
+    def within_many(self, coords: _tp.Union[_np.ndarray, _tp.Sequence], radius: float) -> _tp.List[_np.ndarray]:
+        """
+        Finds all points within *radius* for each of the given coordinates.
+        Returns a list with an ``int64`` array of point indices (sorted by distance) for each coordinate.
+        The indices refer to :attr:`coords` and :attr:`values`.
+
+        :param coords:  An (M, 2) or (M, 3) array (or sequence) of coordinates.
+        :param radius:  The search radius (inclusive).
+        """
+        coords = self._as_coords(coords)[:, :2]
+        return [idx for start in range(0, len(coords), self._BATCH_SIZE)
+                for idx in self._within_batch(coords[start:start + self._BATCH_SIZE], float(radius))]
+
+    def save(self, path: str):
+        """
+        Saves the lookup (including its index) to an (uncompressed) NumPy ``.npz`` file,
+        so that it can be loaded quickly using :func:`load`. The values are stored in pickled form.
+
+        :param path:    The output file path.
+        """
+        values = _np.frombuffer(_pickle.dumps(self._values, _PICKLE_PROTOCOL), dtype=_np.uint8)
+        _np.savez(path, coords=self._coords, values=values, ranges=self._ranges,
+                  children=self._children, bounds=self._bounds)
+
+    @classmethod
+    def load(cls, path: str) -> 'PointLookup':
+        """
+        Loads a lookup that was saved using :func:`save`.
+        Note that the values are unpickled, so only files from a trusted source should be loaded.
+
+        :param path:    The path to the ``.npz`` file.
+        """
+        with _np.load(path, allow_pickle=False) as data:
+            instance = cls.__new__(cls)
+            instance._values = _pickle.loads(data['values'].tobytes())
+            for name in ('coords', 'ranges', 'children', 'bounds'):
+                setattr(instance, f'_{name}', data[name])
+        return instance
+
+
+class NodeSet(set):
+    """
+    Builds a set of unique node keys for coordinates in a feature class.
+    The :func:`get_nodekey` function will be used to generate the coordinate hash.
+    When the feature class is Z aware, the node keys will be 3D as well.
+    Note that in all cases, M will be ignored.
+
+    The ``NodeSet`` inherits all methods from the built-in Python ``set``.
+
+    For feature classes with a geometry type other than Point, a NodeSet will be built from the first and last
+    points in a geometry. If this is not desired (i.e. all coordinates should be included), the user should set
+    the *all_vertices* option to ``True``.
+    An exception to this behavior is the Multipoint geometry: for this type, all coordinates will always be included.
+
+    **Params:**
+
+    -   **fc_path** (str):
+
+        The full path to the feature class.
+
+    -   **where_clause** (str, unicode, gpf.tools.queries.Where):
+
+        An optional where clause to filter the feature class.
+
+    -   **all_vertices** (bool):
+
+        Defaults to ``False``. When set to ``True``, all geometry coordinates are included.
+        Otherwise, only the first and/or last points are considered.
+
+    :raises ValueError:     If the input dataset is not a feature class or if the geometry type is MultiPatch.
+    """
+
+    def __init__(self, fc_path: str, where_clause: _tp.Union[None, str, _q.Where] = None, all_vertices: bool = False):
+        super().__init__()
+        self._populate(fc_path, where_clause, all_vertices)
+
+    @staticmethod
+    def _get_desc(fc_path):
+        # Checks if the input dataset is valid and returns its Describe object
+        desc = _meta.Describe(fc_path)
+        if not desc.shapeType:
+            raise ValueError(f'Input dataset {_tu.to_repr(fc_path)} is not a feature class')
+        if desc.is_multipatchclass:
+            raise ValueError(f'Geometry type of {_tu.to_repr(fc_path)} is not supported')
+        return desc
+
+    def _fix_params(self, fc_path, all_vertices):
+        """
+        Returns a tuple of (field, all_vertices) based on the input parameters.
+        The shape type of the feature class sets the field name and may override *oll_vertices*.
+        """
+
+        # The fastest way to fetch results is by reading coordinate tuples
+        desc = self._get_desc(fc_path)
+        field = _const.FIELD_XYZ if desc.hasZ else _const.FIELD_XY
+        if not desc.is_pointclass:
+            # However, for geometry types other than Point, we need to read the Shape object
+            field = _const.FIELD_SHAPE
+        if desc.is_multipointclass:
+            # Multipoints will be treated differently (always read all vertices)
+            all_vertices = True
+
+        return field, all_vertices
+
+    def _populate(self, fc_path, where_clause, all_vertices):
+        """ Populates the NodeSet with node keys. """
+
+        field, all_vertices = self._fix_params(fc_path, all_vertices)
+
+        if all_vertices:
+            # Let the cursor explode the geometries and convert the coordinates in large vectorized batches
+            coords = (coord for coord in NodeArray._read_coords(fc_path, where_clause, True) if coord[0] is not None)
+            for batch in _iter.chunked(coords, _BATCH_SIZE):
+                self.update(map(tuple, get_nodekeys(batch).tolist()))
+            return
+
+        # Iterate over all geometries and add keys
+        with _cursors.SearchCursor(fc_path, field, where_clause) as rows:
+            for shape, in rows:
+                # If the geometry is a simple coordinate tuple, immediately add it
+                if field.startswith(_const.FIELD_XY):
+                    self.add(get_nodekey(*shape))
+                    continue
+
+                # When *all_vertices* is False (or the geometry is not a Multipoint), only get the start/end nodes
+                self.add(get_nodekey(shape.firstPoint))
+                self.add(get_nodekey(shape.lastPoint))
+
+
+class NodeArray(object):
+    """
+    Array-backed alternative for the :class:`NodeSet`.
+
+    Builds a sorted array of unique node keys for coordinates in a feature class.
+    Instead of a Python ``set`` of tuples, the node keys are stored in a single (N, 2) or (N, 3) ``int64`` NumPy array,
+    which consumes about 16 (2D) or 24 (3D) bytes per node.
+    The same rules as for the :class:`NodeSet` apply: when the feature class is Z aware, the node keys will be 3D,
+    and only the first and last points of a geometry are included, unless *all_vertices* is ``True``.
+
+    A ``NodeArray`` supports vectorized set operations (:func:`union`, :func:`intersection`, :func:`difference`)
+    and membership tests (:func:`contains_many`). The ``|``, ``&`` and ``-`` operators can be used as well.
+    Iterating over a ``NodeArray`` yields node key tuples, which means that ``set(node_array)`` returns
+    the same result as a :class:`NodeSet` would.
+
+    Example:
+
+        >>> mains = NodeArray('C:/Temp/test.gdb/water_mains')
+        >>> services = NodeArray('C:/Temp/test.gdb/service_lines')
+        >>> shared = mains & services
+        >>> len(shared)
+        1234
+        >>> get_nodekey(2600000.1, 1200000.2) in shared
+        False
+
+    **Params:**
+
+    -   **fc_path** (str):
+
+        The full path to the feature class.
+
+    -   **where_clause** (str, unicode, gpf.tools.queries.Where):
+
+        An optional where clause to filter the feature class.
+
+    -   **all_vertices** (bool):
+
+        Defaults to ``False``. When set to ``True``, all geometry coordinates are included.
+        Otherwise, only the first and/or last points are considered.
+
+    :raises ValueError:     If the input dataset is not a feature class or if the geometry type is MultiPatch.
+
+    .. seealso::            Use :func:`NodeArray.from_keys` or :func:`NodeArray.from_coords` to create a
+                            ``NodeArray`` from existing node key or coordinate arrays.
+    """
+
+    __slots__ = '_keys'
+
+    def __init__(self, fc_path: str, where_clause: _tp.Union[None, str, _q.Where] = None, all_vertices: bool = False):
+        self._keys = self._populate(fc_path, where_clause, all_vertices)
+
+    @classmethod
+    def from_keys(cls, node_keys: _tp.Union[_np.ndarray, _tp.Sequence]) -> 'NodeArray':
+        """
+        Creates a new ``NodeArray`` from an (N, 2) or (N, 3) array-like of node keys.
+        The node keys do not need to be sorted or unique.
+
+        :param node_keys:   An (N, 2) or (N, 3) array-like of integer node keys (see :func:`get_nodekeys`).
+        :raises ValueError: If the array does not have the expected shape.
+        """
+        keys = _np.asarray(node_keys, dtype=_np.int64)
+        if keys.size == 0:
+            keys = keys.reshape(0, keys.shape[-1] if keys.ndim == 2 else 2)
+        _vld.pass_if(keys.ndim == 2 and keys.shape[1] in (2, 3), ValueError,
+                     f'Node key array must have shape (N, 2) or (N, 3), got {keys.shape}')
+        instance = cls.__new__(cls)
+        instance._keys = cls._unique(keys)
+        return instance
+
+    @classmethod
+    def from_coords(cls, coords: _tp.Union[_np.ndarray, _tp.Sequence]) -> 'NodeArray':
+        """
+        Creates a new ``NodeArray`` from an (N, 2) or (N, 3) array-like of coordinates.
+
+        :param coords:      An (N, 2) or (N, 3) array-like of floating point coordinates (see :func:`get_nodekeys`).
+        :raises ValueError: If the array does not have the expected shape or contains NaN values.
+        """
+        return cls.from_keys(get_nodekeys(coords))
+
+    @staticmethod
+    def _unique(node_keys: _np.ndarray) -> _np.ndarray:
+        """ Returns a sorted array of unique node keys. """
+        (view, ), to_keys = _keyviews(node_keys)
+        return to_keys(_np.unique(view))
+
+    @staticmethod
+    def _read_coords(fc_path, where_clause, all_vertices) -> _tp.Generator:
+        """ Yields coordinate tuples for the nodes in the feature class. """
+        desc = NodeSet._get_desc(fc_path)
+        has_z = desc.hasZ
+
+        if desc.is_pointclass or desc.is_multipointclass or all_vertices:
+            # Let the cursor explode the geometries, so that no Geometry objects have to be created at all
+            field = _const.FIELD_XYZ if has_z else _const.FIELD_XY
+            with _cursors.SearchCursor(fc_path, field, where_clause, explode_to_points=True) as rows:
+                for coord, in rows:
+                    yield coord
+            return
+
+        # Only get the start/end nodes
+        with _cursors.SearchCursor(fc_path, _const.FIELD_SHAPE, where_clause) as rows:
+            for shape, in rows:
+                for point in (shape.firstPoint, shape.lastPoint):
+                    yield (point.X, point.Y, point.Z) if has_z else (point.X, point.Y)
+
+    def _populate(self, fc_path, where_clause, all_vertices) -> _np.ndarray:
+        """ Reads all coordinates in batches and returns a sorted array of unique node keys. """
+        chunks = []
+        batch = []
+        for coord in self._read_coords(fc_path, where_clause, all_vertices):
+            batch.append(coord)
+            if len(batch) == _BATCH_SIZE:
+                chunks.append(self._unique(get_nodekeys(batch)))
+                batch = []
+        if batch or not chunks:
+            coords = _np.asarray(batch, dtype=_np.float64).reshape(len(batch), -1) if batch else _np.empty((0, 2))
+            chunks.append(self._unique(get_nodekeys(coords)))
+        return chunks[0] if len(chunks) == 1 else self._unique(_np.concatenate(chunks))
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __iter__(self) -> _tp.Iterator[_tp.Tuple[int]]:
+        return map(tuple, self._keys.tolist())
+
+    def __contains__(self, node_key: _tp.Tuple[int]) -> bool:
+        if len(node_key) != self.dims:
+            return False
+        return bool(self.contains_many([node_key])[0])
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({len(self)} nodes, {self.dims}D)'
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, NodeArray):
+            return NotImplemented
+        return self.dims == other.dims and _np.array_equal(self._keys, other._keys)
+
+    def __or__(self, other: 'NodeArray') -> 'NodeArray':
+        return self.union(other)
+
+    def __and__(self, other: 'NodeArray') -> 'NodeArray':
+        return self.intersection(other)
+
+    def __sub__(self, other: 'NodeArray') -> 'NodeArray':
+        return self.difference(other)
+
+    @property
+    def dims(self) -> int:
+        """ Returns the number of dimensions (2 or 3) of the node keys. """
+        return self._keys.shape[1]
+
+    @property
+    def keys(self) -> _np.ndarray:
+        """ Returns a read-only view of the sorted (N, 2) or (N, 3) node key array. """
+        view = self._keys.view()
+        view.flags.writeable = False
+        return view
+
+    @property
+    def nbytes(self) -> int:
+        """ Returns the number of bytes consumed by the node key array. """
+        return self._keys.nbytes
+
+    def _new(self, node_keys: _np.ndarray) -> 'NodeArray':
+        """ Returns a new NodeArray for node keys that are known to be sorted and unique. """
+        instance = self.__class__.__new__(self.__class__)
+        instance._keys = node_keys
+        return instance
+
+    def union(self, other: 'NodeArray') -> 'NodeArray':
+        """
+        Returns a new ``NodeArray`` with the node keys that are in this ``NodeArray`` or in *other*.
+
+        :param other:       Another ``NodeArray`` with the same number of dimensions.
+        :raises ValueError: If the dimensions of both arrays do not match.
+        """
+        (a, b), to_keys = _keyviews(self._keys, other._keys)
+        return self._new(to_keys(_np.union1d(a, b)))
+
+    def intersection(self, other: 'NodeArray') -> 'NodeArray':
+        """
+        Returns a new ``NodeArray`` with the node keys that are in both this ``NodeArray`` and *other*.
+
+        :param other:       Another ``NodeArray`` with the same number of dimensions.
+        :raises ValueError: If the dimensions of both arrays do not match.
+        """
+        (a, b), to_keys = _keyviews(self._keys, other._keys)
+        return self._new(to_keys(_np.intersect1d(a, b, assume_unique=True)))
+
+    def difference(self, other: 'NodeArray') -> 'NodeArray':
+        """
+        Returns a new ``NodeArray`` with the node keys that are in this ``NodeArray`` but not in *other*.
+
+        :param other:       Another ``NodeArray`` with the same number of dimensions.
+        :raises ValueError: If the dimensions of both arrays do not match.
+        """
+        (a, b), to_keys = _keyviews(self._keys, other._keys)
+        return self._new(to_keys(_np.setdiff1d(a, b, assume_unique=True)))
+
+    def contains_many(self, node_keys: _tp.Union[_np.ndarray, _tp.Sequence]) -> _np.ndarray:
+        """
+        Returns a boolean array that indicates for each given node key whether it is present in the ``NodeArray``.
+
+        :param node_keys:   An (N, 2) or (N, 3) array-like of node keys (see :func:`get_nodekeys`).
+        :raises ValueError: If the dimensions of the node keys do not match.
+        """
+        query = _np.atleast_2d(_np.asarray(node_keys, dtype=_np.int64))
+        (a, q), _ = _keyviews(self._keys, query)
+        if not len(a):
+            return _np.zeros(len(q), dtype=bool)
+        # The node keys are sorted, so a binary search suffices
+        idx = _np.searchsorted(a, q).clip(max=len(a) - 1)
+        return a[idx] == q
+
+
+class ConnectivityGraph(object):
+    """
+    Builds an endpoint connectivity graph for one or more line feature classes.
+
+    Each feature (edge) is connected to the node keys (see :func:`get_nodekey`) of its first and last point.
+    The graph is built in a single cursor pass per feature class and stored in NumPy arrays: the node keys,
+    the (from, to) node index pair of each edge and a CSR (compressed sparse row) adjacency structure that lists
+    the incident edges of each node. This allows for fast network tracing, connected component labeling and
+    dangle detection, without having to query a :class:`NodeSet` for every feature.
+
+    Node keys are always 2D (Z and M values are ignored), since connectivity is typically determined in plan view.
+    Features with an empty geometry are skipped.
+
+    Edges are identified by their index in the graph. Use :func:`edge_index` to find the edge for a feature
+    and :func:`get_feature` (or the :attr:`sources` and :attr:`oids` arrays) to find the feature for an edge.
+
+    Example:
+
+        >>> graph = ConnectivityGraph(['C:/Temp/test.gdb/mains', 'C:/Temp/test.gdb/services'])
+        >>> edges = graph.trace(get_nodekey(2600000.0, 1200000.0))
+        >>> [graph.get_feature(e) for e in edges]
+        [('C:/Temp/test.gdb/mains', 12), ('C:/Temp/test.gdb/services', 874)]
+        >>> graph.save('C:/Temp/network.npz')
+        >>> graph = ConnectivityGraph.load('C:/Temp/network.npz')
+
+    **Params:**
+
+    -   **fc_paths** (str, list, tuple):
+
+        The full path to a line feature class or a sequence of multiple line feature class paths.
+
+    -   **where_clause** (str, unicode, gpf.tools.queries.Where):
+
+        An optional where clause to filter the feature classes.
+
+    :raises ValueError:     If one of the input datasets is not a Polyline feature class.
+    """
+
+    __slots__ = '_paths', '_sources', '_oids', '_nodes', '_edges', '_indptr', '_indices'
+
+    def __init__(self, fc_paths: _tp.Union[str, _tp.Sequence[str]],
+                 where_clause: _tp.Union[None, str, _q.Where] = None):
+        paths = tuple(fc_paths if _vld.is_iterable(fc_paths) else (fc_paths, ))
+        sources, oids, coords = [], [], []
+        for i, fc_path in enumerate(paths):
+            fc_oids, fc_coords = self._read_endpoints(fc_path, where_clause)
+            sources.append(_np.full(len(fc_oids), i, dtype=_np.int32))
+            oids.append(_np.asarray(fc_oids, dtype=_np.int64))
+            coords.append(_np.asarray(fc_coords, dtype=_np.float64).reshape(-1, 4))
+        self._build(paths, _np.concatenate(sources), _np.concatenate(oids), _np.concatenate(coords))
+
+    @classmethod
+    def from_coords(cls, from_coords: _tp.Union[_np.ndarray, _tp.Sequence],
+                    to_coords: _tp.Union[_np.ndarray, _tp.Sequence],
+                    oids: _tp.Union[_np.ndarray, _tp.Sequence, None] = None, source: str = '') -> 'ConnectivityGraph':
+        """
+        Creates a ``ConnectivityGraph`` from arrays of start and end coordinates (one row per edge).
+
+        :param from_coords: An (N, 2) array-like of start point coordinates.
+        :param to_coords:   An (N, 2) array-like of end point coordinates.
+        :param oids:        An optional array-like of N feature IDs. Defaults to the edge indices.
+        :param source:      An optional name (e.g. a feature class path) for the source of the edges.
+        :raises ValueError: If the coordinate arrays do not have the same shape.
+        """
+        from_coords = _np.asarray(from_coords, dtype=_np.float64)[:, :2]
+        to_coords = _np.asarray(to_coords, dtype=_np.float64)[:, :2]
+        _vld.pass_if(from_coords.shape == to_coords.shape, ValueError, 'Coordinate arrays must have the same shape')
+        num_edges = len(from_coords)
+        oids = _np.arange(num_edges, dtype=_np.int64) if oids is None else _np.asarray(oids, dtype=_np.int64)
+        instance = cls.__new__(cls)
+        instance._build((source, ), _np.zeros(num_edges, dtype=_np.int32), oids,
+                        _np.hstack((from_coords, to_coords)))
+        return instance
+
+    @staticmethod
+    def _read_endpoints(fc_path, where_clause) -> _tp.Tuple[list, list]:
+        """ Returns a list of ObjectIDs and a flat list of (from X, from Y, to X, to Y) coordinates. """
+        desc = NodeSet._get_desc(fc_path)
+        _vld.pass_if(desc.is_polylineclass, ValueError, f'Input dataset {_tu.to_repr(fc_path)} is not a line class')
+
+        oids, coords = [], []
+        with _cursors.SearchCursor(fc_path, (_const.FIELD_OID, _const.FIELD_SHAPE), where_clause) as rows:
+            for oid, shape in rows:
+                if not shape:
+                    continue
+                first, last = shape.firstPoint, shape.lastPoint
+                oids.append(oid)
+                coords.extend((first.X, first.Y, last.X, last.Y))
+        return oids, coords
+
+    def _build(self, paths, sources, oids, coords):
+        """ Sets up the node key and edge arrays and builds the CSR adjacency structure. """
+        num_edges = len(oids)
+        keys = get_nodekeys(coords.reshape(-1, 2))
+        (view, ), to_keys = _keyviews(keys)
+        unique, inverse = _np.unique(view, return_inverse=True)
+
+        self._paths = paths
+        self._sources = sources
+        self._oids = oids
+        self._nodes = to_keys(unique)
+        self._edges = inverse.reshape(num_edges, 2).astype(_np.int64)
+
+        # For each node, list the edges that start or end there
+        ends = self._edges.ravel()
+        order = _np.argsort(ends, kind='stable')
+        self._indices = _np.repeat(_np.arange(num_edges, dtype=_np.int64), 2)[order]
+        self._indptr = _np.zeros(len(self._nodes) + 1, dtype=_np.int64)
+        _np.cumsum(_np.bincount(ends, minlength=len(self._nodes)), out=self._indptr[1:])
+
+    @property
+    def sources(self) -> _np.ndarray:
+        """ Returns an array with the source (feature class) index for each edge (see :attr:`source_paths`). """
+        return self._sources
+
+    @property
+    def source_paths(self) -> _tp.Tuple[str]:
+        """ Returns the paths of the feature classes that were used to build the graph. """
+        return self._paths
+
+    @property
+    def oids(self) -> _np.ndarray:
+        """ Returns an array with the ObjectID of each edge. """
+        return self._oids
+
+    @property
+    def nodes(self) -> _np.ndarray:
+        """ Returns the sorted (N, 2) node key array. The index of a node key is its node index. """
+        return self._nodes
+
+    @property
+    def edges(self) -> _np.ndarray:
+        """ Returns an (E, 2) array with the (from, to) node indices of each edge. """
+        return self._edges
+
+    @property
+    def num_nodes(self) -> int:
+        """ Returns the number of nodes in the graph. """
+        return len(self._nodes)
+
+    @property
+    def num_edges(self) -> int:
+        """ Returns the number of edges (features) in the graph. """
+        return len(self._edges)
+
+    @property
+    def degree(self) -> _np.ndarray:
+        """ Returns an array with the number of edge ends (i.e. the degree) for each node. """
+        return _np.diff(self._indptr)
+
+    def node_index(self, node_keys: _tp.Union[_tp.Tuple[int], _np.ndarray, _tp.Sequence]) -> _np.ndarray:
+        """
+        Returns an array of node indices for the given node key(s). If a node key was not found, its index is -1.
+
+        :param node_keys:   A single 2D node key or an (N, 2) array-like of node keys.
+        """
+        query = _np.atleast_2d(_np.asarray(node_keys, dtype=_np.int64))
+        (nodes, q), _ = _keyviews(self._nodes, query)
+        if not len(nodes):
+            return _np.full(len(q), -1, dtype=_np.int64)
+        idx = _np.searchsorted(nodes, q).clip(max=len(nodes) - 1)
+        return _np.where(nodes[idx] == q, idx, -1)
+
+    def edge_index(self, fc_path: str, oid: int) -> int:
+        """
+        Returns the edge index for the feature with the given ObjectID in the given feature class.
+
+        :param fc_path:     The feature class path (as used to build the graph).
+        :param oid:         The ObjectID of the feature.
+        :raises KeyError:   If the feature is not part of the graph.
+        """
+        try:
+            source = self._paths.index(fc_path)
+        except ValueError:
+            raise KeyError(f'{_tu.to_repr(fc_path)} is not part of the {self.__class__.__name__}')
+        match = _np.flatnonzero((self._sources == source) & (self._oids == oid))
+        _vld.pass_if(match.size, KeyError, f'Feature {oid} of {_tu.to_repr(fc_path)} was not found')
+        return int(match[0])
+
+    def get_feature(self, edge: int) -> _tp.Tuple[str, int]:
+        """
+        Returns a tuple of (feature class path, ObjectID) for the given edge index.
+
+        :param edge:    The edge index.
+        """
+        return self._paths[self._sources[edge]], int(self._oids[edge])
+
+    def incident_edges(self, nodes: _tp.Union[int, _np.ndarray, _tp.Sequence]) -> _np.ndarray:
+        """
+        Returns an array with the indices of all edges that start or end at the given node index/indices.
+        Edges that touch multiple of the given nodes (or are closed) are returned multiple times.
+
+        :param nodes:   A single node index or an array-like of node indices.
+        """
+        nodes = _np.atleast_1d(_np.asarray(nodes, dtype=_np.int64))
+        starts = self._indptr[nodes]
+        counts = self._indptr[nodes + 1] - starts
+        # Gather the CSR ranges of all nodes at once
+        offsets = _np.repeat(starts - _np.cumsum(counts) + counts, counts) + _np.arange(counts.sum())
+        return self._indices[offsets]
+
+    def _trace(self, start_nodes, barriers, max_depth):
+        """ Performs a level-wise (breadth-first) trace from the given node indices. """
+        visited_nodes = _np.zeros(self.num_nodes, dtype=bool)
+        visited_edges = _np.zeros(self.num_edges, dtype=bool)
+        blocked = _np.zeros(self.num_nodes, dtype=bool)
+        blocked[barriers] = True
+
+        frontier = _np.unique(start_nodes)
+        visited_nodes[frontier] = True
+        depth = 0
+        while frontier.size and (max_depth is None or depth < max_depth):
+            # Start nodes are always expanded, barrier nodes are only reached
+            expand = frontier if depth == 0 else frontier[~blocked[frontier]]
+            edges = self.incident_edges(expand)
+            edges = _np.unique(edges[~visited_edges[edges]])
+            visited_edges[edges] = True
+            reached = self._edges[edges].ravel()
+            frontier = _np.unique(reached[~visited_nodes[reached]])
+            visited_nodes[frontier] = True
+            depth += 1
+        return _np.flatnonzero(visited_edges)
+
+    def trace(self, node_keys: _tp.Union[_tp.Tuple[int], _np.ndarray, _tp.Sequence],
+              barriers: _tp.Union[_np.ndarray, _tp.Sequence, None] = None,
+              max_depth: _tp.Union[int, None] = None) -> _np.ndarray:
+        """
+        Traces the network from the given start node key(s) and returns a sorted array of all reached edge indices.
+        The trace is performed breadth-first, one level (i.e. edge hop) at a time, using vectorized operations.
+
+        :param node_keys:   A single 2D node key or an (N, 2) array-like of node keys to start the trace from.
+        :param barriers:    An optional (N, 2) array-like of node keys where the trace should stop (e.g. valves).
+                            Edges that touch a barrier are included, but the trace does not continue beyond it.
+        :param max_depth:   An optional maximum number of edge hops from the start node(s).
+        :raises KeyError:   If none of the start node keys are part of the graph.
+        """
+        start = self.node_index(node_keys)
+        start = start[start >= 0]
+        _vld.pass_if(start.size, KeyError, 'Start node(s) not found in graph')
+        stop = _np.empty(0, dtype=_np.int64)
+        if barriers is not None and len(barriers):
+            stop = self.node_index(barriers)
+            stop = stop[stop >= 0]
+        return self._trace(start, stop, max_depth)
+
+    def trace_edge(self, edge: int, barriers: _tp.Union[_np.ndarray, _tp.Sequence, None] = None,
+                   max_depth: _tp.Union[int, None] = None) -> _np.ndarray:
+        """
+        Traces the network from both ends of the given edge. See :func:`trace` for more information.
+
+        :param edge:        The edge index to start the trace from (see :func:`edge_index`).
+        :param barriers:    An optional (N, 2) array-like of node keys where the trace should stop.
+        :param max_depth:   An optional maximum number of edge hops from the start edge.
+        """
+        return self.trace(self._nodes[self._edges[edge]], barriers, max_depth)
+
+    def iter_dfs(self, node_key: _tp.Tuple[int]) -> _tp.Generator:
+        """
+        Yields the edge indices that can be reached from the given start node key in depth-first order.
+        As opposed to :func:`trace`, this is a (lazy) Python loop, which is useful when the traversal order matters
+        or when the trace needs to be stopped early.
+
+        :param node_key:    The 2D node key to start the trace from.
+        :raises KeyError:   If the node key is not part of the graph.
+        """
+        start = int(self.node_index(node_key)[0])
+        _vld.raise_if(start < 0, KeyError, f'Start node {node_key} not found in graph')
+        visited_nodes = _np.zeros(self.num_nodes, dtype=bool)
+        visited_edges = _np.zeros(self.num_edges, dtype=bool)
+        indptr, indices, edges = self._indptr, self._indices, self._edges
+
+        visited_nodes[start] = True
+        stack = [start]
+        while stack:
+            node = stack.pop()
+            for edge in indices[indptr[node]:indptr[node + 1]].tolist():
+                if visited_edges[edge]:
+                    continue
+                visited_edges[edge] = True
+                yield edge
+                from_node, to_node = edges[edge].tolist()
+                other = to_node if from_node == node else from_node
+                if not visited_nodes[other]:
+                    visited_nodes[other] = True
+                    stack.append(other)
+
+    def components(self) -> _np.ndarray:
+        """
+        Returns an array with a connected component label (0, 1, 2, ...) for each edge.
+        Edges that share the same label are (directly or indirectly) connected to each other.
+        """
+        labels = _np.arange(self.num_nodes, dtype=_np.int64)
+        from_nodes, to_nodes = self._edges[:, 0], self._edges[:, 1]
+        while True:
+            lf, lt = labels[from_nodes], labels[to_nodes]
+            changed = lf != lt
+            if not changed.any():
+                break
+            # Hook the root label of each edge end onto the smallest one...
+            low = _np.minimum(lf, lt)[changed]
+            _np.minimum.at(labels, lf[changed], low)
+            _np.minimum.at(labels, lt[changed], low)
+            # ...and compress the label paths, so that each node points to its root
+            while True:
+                compressed = labels[labels]
+                if _np.array_equal(compressed, labels):
+                    break
+                labels = compressed
+        return _np.unique(labels[from_nodes], return_inverse=True)[1].ravel()
+
+    def dangles(self) -> _np.ndarray:
+        """
+        Returns an (N, 2) array with the node keys of all dangling nodes, i.e. nodes that only touch a single edge end.
+        The indices of the dangling edges can be found using :func:`incident_edges` on :func:`node_index`.
+        """
+        return self._nodes[self.degree == 1]
+
+    def save(self, path: str):
+        """
+        Saves the graph to an (uncompressed) NumPy ``.npz`` file, so that it can be loaded quickly using :func:`load`.
+
+        :param path:    The output file path.
+        """
+        _np.savez(path, paths=_np.array(self._paths, dtype=str), sources=self._sources, oids=self._oids,
+                  nodes=self._nodes, edges=self._edges, indptr=self._indptr, indices=self._indices,
+                  resolution=_np.float64(XYZ_RESOLUTION))
+
+    @classmethod
+    def load(cls, path: str) -> 'ConnectivityGraph':
+        """
+        Loads a graph that was saved using :func:`save`.
+
+        :param path:        The path to the ``.npz`` file.
+        :raises ValueError: If the graph was saved using a different :attr:`XYZ_RESOLUTION`.
+        """
+        with _np.load(path, allow_pickle=False) as data:
+            _vld.pass_if(float(data['resolution']) == XYZ_RESOLUTION, ValueError,
+                         f'{cls.__name__} was saved with a different XYZ_RESOLUTION')
+            instance = cls.__new__(cls)
+            instance._paths = tuple(data['paths'].tolist())
+            for name in ('sources', 'oids', 'nodes', 'edges', 'indptr', 'indices'):
+                setattr(instance, f'_{name}', data[name])
+        return instance
 
 
 class ValueSet(frozenset):
@@ -528,6 +3112,10 @@ class ValueSet(frozenset):
     Builds a set of unique values for a single column in a feature class or table.
     This class inherits all methods from the built-in Python ``frozenset``.
 
+    If the data source is a geodatabase, a ``DISTINCT`` clause is passed to the cursor by default,
+    so that the database only returns the unique values instead of all rows.
+    If the data source does not support this (e.g. shapefiles), all rows are read instead.
+
     **Params:**
 
     -   **table_path** (str):
@@ -541,14 +3129,455 @@ class ValueSet(frozenset):
     -   **where_clause** (str, gpf.tools.queries.Where):
 
         An optional where clause to filter the feature class.
+
+    -   **distinct** (bool):
+
+        If ``True`` (default), the ``DISTINCT`` clause is pushed down to the data source (if supported).
+        Set this to ``False`` to always read all rows.
+
+    .. seealso::    To estimate the number of unique values for very large columns in constant memory,
+                    use the :class:`ValueSketch` class.
     """
 
-    def __new__(cls, table_path: str, field, where_clause: _tp.Union[None, str, _q.Where] = None):
+    def __new__(cls, table_path: str, field, where_clause: _tp.Union[None, str, _q.Where] = None,
+                distinct: bool = True):
+        if distinct and _paths.is_gdbpath(table_path):
+            try:
+                # Only let the database return the unique values
+                with _cursors.SearchCursor(table_path, field, where_clause, sql_clause=_SQL_DISTINCT) as rows:
+                    return super(ValueSet, cls).__new__(cls, (value for value, in rows))
+            except RuntimeError:
+                # The data source does not support DISTINCT: fall back to reading all rows
+                pass
+
         # Populate the frozenset
         with _cursors.SearchCursor(table_path, field, where_clause) as rows:
             return super(ValueSet, cls).__new__(cls, (value for value, in rows))
 
     # noinspection PyMissingConstructor, PyUnusedLocal
-    def __init__(self, table_path, field, where_clause=None):
+    def __init__(self, table_path, field, where_clause=None, distinct=True):
         # This override is only required for type hint purposes and to match __new__'s signature
         pass
+
+
+class ValueSketch(object):
+    """
+    Estimates the number of unique values (i.e. the cardinality) for a single column in a feature class or table,
+    using the HyperLogLog algorithm. As opposed to the :class:`ValueSet`, a ``ValueSketch`` does not store the
+    values themselves: it uses a fixed amount of memory (2^*precision* bytes), regardless of the number of values.
+
+    The standard error of the estimate is about 1.04 / sqrt(2^*precision*), i.e. 0.8% for the default precision.
+    ``None`` (NULL) values are not counted. Sketches with the same precision can be combined using :func:`merge`,
+    for example to count the unique values in multiple tables (or partitions of a table processed in parallel).
+    Because stable hashes are used, sketches can be merged across processes.
+
+    Example:
+
+        >>> sketch = ValueSketch('C:/Temp/test.gdb/my_table', 'GlobalID')
+        >>> sketch.estimate()
+        49873112
+
+    **Params:**
+
+    -   **table_path** (str):
+
+        The full path to the table or feature class.
+
+    -   **field** (str):
+
+        The field name for which to estimate the number of unique values.
+
+    -   **where_clause** (str, gpf.tools.queries.Where):
+
+        An optional where clause to filter the feature class.
+
+    -   **precision** (int):
+
+        The number of bits (4-18) used to address the HyperLogLog registers. Defaults to 14.
+
+    :raises ValueError: If the precision is out of range.
+    """
+
+    __slots__ = '_precision', '_registers'
+
+    def __init__(self, table_path: _tp.Union[str, None], field: _tp.Union[str, None] = None,
+                 where_clause: _tp.Union[None, str, _q.Where] = None, precision: int = 14):
+        _vld.pass_if(isinstance(precision, int) and 4 <= precision <= 18, ValueError,
+                     'Precision must be an integer between 4 and 18')
+        self._precision = precision
+        self._registers = _np.zeros(1 << precision, dtype=_np.uint8)
+        if table_path is None:
+            return
+
+        batch = []
+        with _cursors.SearchCursor(table_path, field, where_clause) as rows:
+            for value, in rows:
+                batch.append(value)
+                if len(batch) == _BATCH_SIZE:
+                    self.add(batch)
+                    batch = []
+        self.add(batch)
+
+    @classmethod
+    def from_values(cls, values: _tp.Iterable, precision: int = 14) -> 'ValueSketch':
+        """
+        Creates a ``ValueSketch`` for the given values (instead of a table column).
+
+        :param values:      An iterable of values.
+        :param precision:   The number of bits (4-18) used to address the HyperLogLog registers. Defaults to 14.
+        """
+        sketch = cls(None, precision=precision)
+        sketch.add(values)
+        return sketch
+
+    def add(self, values: _tp.Iterable):
+        """
+        Adds the given values to the sketch.
+
+        :param values:  An iterable of values.
+        """
+        hashes = _hash_values([v for v in values if v is not None])
+        if not hashes.size:
+            return
+        p = _np.uint64(self._precision)
+        index = (hashes >> (_np.uint64(64) - p)).astype(_np.intp)
+        # Count the leading zeros of the remaining bits (the sentinel bit limits the rank)
+        bits = (hashes << p) | (_np.uint64(1) << (p - _np.uint64(1)))
+        rank = _np.ones(len(bits), dtype=_np.uint8)
+        for shift in (32, 16, 8, 4, 2, 1):
+            zeros = (bits >> _np.uint64(64 - shift)) == 0
+            rank += (zeros * shift).astype(_np.uint8)
+            bits = _np.where(zeros, bits << _np.uint64(shift), bits)
+        _np.maximum.at(self._registers, index, rank)
+
+    def merge(self, other: 'ValueSketch') -> 'ValueSketch':
+        """
+        Merges another ``ValueSketch`` into this one (in place) and returns itself.
+
+        :param other:       Another ``ValueSketch`` with the same precision.
+        :raises ValueError: If the precision of both sketches does not match.
+        """
+        _vld.pass_if(self._precision == other._precision, ValueError, 'Cannot merge sketches with different precision')
+        _np.maximum(self._registers, other._registers, out=self._registers)
+        return self
+
+    def estimate(self) -> int:
+        """ Returns the estimated number of unique values. """
+        m = len(self._registers)
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+        estimate = alpha * m * m / _np.sum(_np.ldexp(1.0, -self._registers.astype(_np.int64)))
+        zeros = int(_np.count_nonzero(self._registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Use linear counting for small cardinalities
+            estimate = m * _np.log(m / zeros)
+        return int(round(estimate))
+
+    @property
+    def precision(self) -> int:
+        """ Returns the precision (number of register address bits) of the sketch. """
+        return self._precision
+
+    def to_bytes(self) -> bytes:
+        """ Returns the sketch as bytes (e.g. to store it or to send it to another process). """
+        return bytes((self._precision, )) + self._registers.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'ValueSketch':
+        """
+        Restores a ``ValueSketch`` from the bytes returned by :func:`to_bytes`.
+
+        :param data:    The sketch bytes.
+        """
+        sketch = cls(None, precision=data[0])
+        sketch._registers[:] = _np.frombuffer(data, dtype=_np.uint8, offset=1)
+        return sketch
+
+
+class KeyFilter(object):
+    """
+    Builds a Bloom filter for the values of a key field (e.g. a GlobalID field) in a feature class or table.
+
+    A ``KeyFilter`` can tell whether a key is **certainly not** present in the table, or whether it
+    **might** be present: the probability of a false positive is set by the *fp_rate* option.
+    This is useful to rule out keys before an expensive join, lookup or upsert,
+    while consuming only a fraction of the memory of a :class:`ValueSet`
+    (about 1.2 bytes per key for a false positive rate of 1%).
+    ``None`` (NULL) values are not added to the filter.
+
+    Example:
+
+        >>> existing = KeyFilter('C:/Temp/test.gdb/my_table', 'GlobalID', fp_rate=0.001)
+        >>> candidates = existing.might_contain(new_ids)
+        >>> # Only the candidate keys have to be verified
+        >>> new_ids = [k for k, maybe in zip(new_ids, candidates) if not maybe]
+
+    **Params:**
+
+    -   **table_path** (str):
+
+        The full path to the table or feature class.
+
+    -   **key_field** (str):
+
+        The field name for which to build the filter.
+
+    -   **where_clause** (str, gpf.tools.queries.Where):
+
+        An optional where clause to filter the table.
+
+    -   **fp_rate** (float):
+
+        The desired false positive rate (between 0 and 1). Defaults to 0.01 (1%).
+
+    -   **capacity** (int):
+
+        The expected (maximum) number of keys. If omitted, all key hashes are collected first (8 bytes per key),
+        so that the filter can be sized exactly. If specified, keys are added to the filter while they are read.
+        Note that the false positive rate increases if more keys than *capacity* are added.
+
+    :raises ValueError: If *fp_rate* or *capacity* is out of range.
+    """
+
+    _HEADER = _struct.Struct('<QQQ')
+
+    __slots__ = '_numbits', '_numhashes', '_count', '_bits'
+
+    def __init__(self, table_path: _tp.Union[str, None], key_field: _tp.Union[str, None] = None,
+                 where_clause: _tp.Union[None, str, _q.Where] = None, fp_rate: float = 0.01,
+                 capacity: _tp.Union[int, None] = None):
+        _vld.pass_if(0 < fp_rate < 1, ValueError, 'False positive rate must be between 0 and 1')
+        _vld.raise_if(capacity is not None and capacity < 1, ValueError, 'Capacity must be a positive integer')
+        self._count = 0
+        if table_path is None:
+            self._setup(capacity or 1, fp_rate)
+            return
+
+        if capacity:
+            self._setup(capacity, fp_rate)
+        chunks, batch = [], []
+        with _cursors.SearchCursor(table_path, key_field, where_clause) as rows:
+            for key, in rows:
+                if key is None:
+                    continue
+                batch.append(key)
+                if len(batch) == _BATCH_SIZE:
+                    chunks.append(self._add_or_collect(batch, capacity))
+                    batch = []
+        chunks.append(self._add_or_collect(batch, capacity))
+
+        if not capacity:
+            hashes = _np.concatenate(chunks)
+            self._setup(len(hashes), fp_rate)
+            self._insert(hashes)
+
+    @classmethod
+    def from_keys(cls, keys: _tp.Sequence, fp_rate: float = 0.01) -> 'KeyFilter':
+        """
+        Creates a ``KeyFilter`` for the given keys (instead of a table column).
+
+        :param keys:        A sequence of keys.
+        :param fp_rate:     The desired false positive rate (between 0 and 1). Defaults to 0.01 (1%).
+        """
+        keys = [k for k in keys if k is not None]
+        instance = cls(None, fp_rate=fp_rate, capacity=max(len(keys), 1))
+        instance.add(keys)
+        return instance
+
+    def _setup(self, capacity: int, fp_rate: float):
+        """ Calculates the optimal number of bits and hash functions and allocates the bit array. """
+        self._numbits = max(64, int(_math.ceil(-capacity * _math.log(fp_rate) / _math.log(2) ** 2)))
+        self._numhashes = max(1, int(round(self._numbits / capacity * _math.log(2))))
+        self._bits = _np.zeros((self._numbits + 7) // 8, dtype=_np.uint8)
+
+    def _add_or_collect(self, keys: _tp.Sequence, capacity: _tp.Union[int, None]) -> _np.ndarray:
+        """ Adds the keys to the filter if the capacity is known, or returns their hashes otherwise. """
+        if capacity:
+            self.add(keys)
+            return _np.empty(0, dtype=_np.uint64)
+        return _hash_values(keys)
+
+    def _positions(self, hashes: _np.ndarray) -> _tp.Generator:
+        """ Yields the bit positions for each of the hash functions (using double hashing). """
+        numbits = _np.uint64(self._numbits)
+        h1, h2 = hashes, _mix64(hashes) | _np.uint64(1)
+        for i in range(self._numhashes):
+            yield (h1 + _np.uint64(i) * h2) % numbits
+
+    def _insert(self, hashes: _np.ndarray):
+        for pos in self._positions(hashes):
+            _np.bitwise_or.at(self._bits, (pos >> _np.uint64(3)).astype(_np.intp),
+                              (_np.uint8(1) << (pos & _np.uint64(7)).astype(_np.uint8)))
+        self._count += len(hashes)
+
+    def add(self, keys: _tp.Sequence):
+        """
+        Adds the given keys to the filter.
+
+        :param keys:    A sequence of keys.
+        """
+        self._insert(_hash_values([k for k in keys if k is not None]))
+
+    def might_contain(self, keys: _tp.Sequence) -> _np.ndarray:
+        """
+        Returns a boolean array that indicates for each key whether it might be present in the filter.
+        If the value is ``False``, the key is certainly not present.
+
+        :param keys:    A sequence of keys.
+        """
+        keys = list(keys)
+        result = _np.fromiter((k is not None for k in keys), dtype=bool, count=len(keys))
+        hashes = _hash_values(keys)
+        for pos in self._positions(hashes):
+            bits = self._bits[(pos >> _np.uint64(3)).astype(_np.intp)] >> (pos & _np.uint64(7)).astype(_np.uint8)
+            result &= (bits & 1).astype(bool)
+        return result
+
+    def __contains__(self, key) -> bool:
+        return bool(self.might_contain([key])[0])
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def fp_rate(self) -> float:
+        """ Returns the expected false positive rate for the current number of keys. """
+        return (1 - _math.exp(-self._numhashes * self._count / self._numbits)) ** self._numhashes
+
+    @property
+    def nbytes(self) -> int:
+        """ Returns the size of the bit array in bytes. """
+        return self._bits.nbytes
+
+    def to_bytes(self) -> bytes:
+        """ Returns the filter as bytes (e.g. to store it or to send it to another process). """
+        return self._HEADER.pack(self._numbits, self._numhashes, self._count) + self._bits.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'KeyFilter':
+        """
+        Restores a ``KeyFilter`` from the bytes returned by :func:`to_bytes`.
+
+        :param data:    The filter bytes.
+        """
+        instance = cls.__new__(cls)
+        instance._numbits, instance._numhashes, instance._count = cls._HEADER.unpack_from(data)
+        instance._bits = _np.frombuffer(data, dtype=_np.uint8, offset=cls._HEADER.size).copy()
+        return instance
+
+
+def _sizeof(obj: _tp.Any, sample_size: int, seen: _tp.Set[int]) -> float:
+    """
+    Returns the (estimated) deep memory size of *obj* in bytes.
+    Objects that were seen before are not counted again. For large containers, only *sample_size* (evenly spread)
+    elements are measured and the result is extrapolated.
+    """
+    if id(obj) in seen or callable(obj):
+        return 0
+    seen.add(id(obj))
+    size = _sys.getsizeof(obj)
+    if isinstance(obj, memoryview):
+        return size + obj.nbytes
+    if isinstance(obj, (str, bytes, bytearray, int, float, _dt.date, _mmap.mmap)):
+        return size
+
+    if isinstance(obj, dict):
+        elements, length = obj.items(), len(obj)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        elements, length = obj, len(obj)
+    elif isinstance(obj, _np.ndarray):
+        elements, length = (obj.ravel(), obj.size) if obj.dtype == object else ((), 0)
+    else:
+        elements, length = (), 0
+
+    step = max(1, length // sample_size) if sample_size else 1
+    sample = list(_islice(elements, 0, None, step))
+    if sample:
+        measured = _iter.flatten(sample) if isinstance(obj, dict) else sample
+        size += sum(_sizeof(v, sample_size, seen) for v in measured) * length / len(sample)
+
+    # Include instance attributes (slots and __dict__)
+    attrs = [getattr(obj, name) for cls in type(obj).__mro__ for name in cls.__dict__.get('__slots__', ())
+             if hasattr(obj, name)] + list(getattr(obj, '__dict__', {}).values())
+    return size + sum(_sizeof(v, sample_size, seen) for v in attrs)
+
+
+def _type_counts(values: _tp.Iterable) -> _tp.Dict[str, int]:
+    """ Returns a histogram (dict) of the type names of the given values, sorted by count. """
+    return {t.__name__: n for t, n in _Counter(map(type, values)).most_common()}
+
+
+def get_report(lookup: _tp.Any, sample_size: int = 10000) -> _tp.Dict[str, _tp.Any]:
+    """
+    Returns a report ``dict`` with statistics about the given lookup, which can be used to size (worker) machines.
+    The report may contain the following items:
+
+    - *type*: the class name of the lookup;
+    - *length*: the number of elements (keys, nodes, ranges etc.) in the lookup;
+    - *memory*: the (estimated) deep memory size of the lookup in bytes;
+    - *shared*: ``True`` if the memory is shared between processes (i.e. for a :class:`FrozenLookup`);
+    - *key_types* and *value_types*: histograms (``dict``) of the type names of the keys and values;
+      for a :class:`RowLookup` with columnar storage, *value_types* maps each value field to its storage type;
+    - *duplicate_keys* and *duplicate_rows*: the number of keys with more than one value and
+      the number of values that share a key with another value (only if *duplicate_keys* was set);
+    - *build_time*, *fetch_time* and *process_time*: the time in seconds it took to build the lookup,
+      of which the time spent by the cursor and the time spent by the row (or batch) processor function.
+      For row processor functions, the latter is estimated from a sample of the rows.
+
+    Example:
+
+        >>> my_lookup = ValueLookup('C:/Temp/test.gdb/my_table', 'GlobalID', 'Material')
+        >>> get_report(my_lookup)
+        {'type': 'ValueLookup', 'length': 1000, 'memory': 212904, 'key_types': {'str': 1000}, ... }
+
+    :param lookup:      Any lookup of the :mod:`gpf.lookups` module (or any other object).
+    :param sample_size: The number of elements per container that is used to estimate the memory size.
+                        The size of the remaining elements is extrapolated. If set to 0, all elements are measured,
+                        which is more accurate but takes more time.
+    """
+    report = {'type': type(lookup).__name__}
+    if hasattr(lookup, '__len__'):
+        report['length'] = len(lookup)
+    report['memory'] = int(_sizeof(lookup, sample_size, set()))
+    if isinstance(lookup, FrozenLookup):
+        report['shared'] = True
+
+    if isinstance(lookup, dict):
+        values = lookup.values()
+        report['key_types'] = _type_counts(lookup)
+        if getattr(lookup, '_dupekeys', False):
+            report['duplicate_keys'] = sum(1 for v in values if len(v) > 1)
+            report['duplicate_rows'] = sum(map(len, values)) - sum(1 for v in values if v)
+            values = _iter.flatten(values)
+        columns = getattr(lookup, '_columns', None)
+        if columns is not None:
+            # Columnar lookups store row indices: report the storage type of each column instead
+            report['value_types'] = {name: 'str' if columns[i].table is not None else columns[i].data.dtype.name
+                                     for name, i in lookup._fieldmap.items()}
+        else:
+            report['value_types'] = _type_counts(values)
+
+    report.update(getattr(lookup, '_timings', None) or {})
+    return report
+
+
+def log_report(lookup: _tp.Any, logger: _log.Logger, sample_size: int = 10000):
+    """
+    Writes the report of :func:`get_report` for the given lookup to a :class:`gpf.loggers.Logger`.
+
+    :param lookup:      Any lookup of the :mod:`gpf.lookups` module (or any other object).
+    :param logger:      The logger to write to.
+    :param sample_size: The number of elements per container that is used to estimate the memory size.
+    """
+    report = get_report(lookup, sample_size)
+    lines = [f"{report['type']}: {report.get('length', '?')} elements, "
+             f"{report['memory'] / 1024 ** 2:.1f} MB{' (shared)' if report.get('shared') else ''}"]
+    for name in ('key_types', 'value_types'):
+        if name in report:
+            types = _const.TEXT_COMMASPACE.join(f'{t} ({n})' for t, n in report[name].items())
+            lines.append(f"{name.replace('_', ' ').capitalize()}: {types or '-'}")
+    if 'duplicate_keys' in report:
+        lines.append(f"Duplicate keys: {report['duplicate_keys']} ({report['duplicate_rows']} duplicate rows)")
+    if 'build_time' in report:
+        lines.append(f"Build time: {report['build_time']:.3f} s (fetch: {report['fetch_time']:.3f} s, "
+                     f"processing: {report['process_time']:.3f} s)")
+    logger.info('\n'.join(lines))
@@ -0,0 +1,363 @@
+# coding: utf-8
+#
+# Copyright 2019 Geocom Informatik AG / VertiGIS
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+The *geocodec* module contains functions that read and write WKB, EWKB (PostGIS) and EsriJSON geometries directly
+from and to NumPy vertex arrays, without creating any ``arcpy`` geometry objects.
+
+The vertex arrays have the same layout as the ones returned by :func:`gpf.tools.geometry.get_vertex_array`
+(a coordinate array, a part offset array and a ring offset array), so that cursor output of the ``SHAPE@WKB`` or
+``SHAPE@JSON`` tokens can be processed by e.g. the :mod:`gpf.tools.geomkernel` functions right away:
+
+    >>> with SearchCursor('C:/Temp/test.gdb/parcels', 'SHAPE@WKB') as rows:
+    >>>     coords, geometry_offsets, part_offsets, ring_offsets = read_wkb_many(wkb for wkb, in rows)
+
+WKB is read from any object that supports the buffer protocol (e.g. ``bytes``, ``bytearray`` or ``memoryview``).
+Headers are unpacked in place and the coordinates are wrapped by NumPy arrays without copying the buffer.
+
+.. note::   M values are skipped when reading and are never written.
+            Curves are not supported by WKB: use the ``densify()`` method of a geometry to approximate them first.
+"""
+
+import json as _json
+import struct as _struct
+import typing as _tp
+
+import numpy as _np
+
+import gpf.common.validate as _vld
+import gpf.tools.geometry as _geo
+
+# WKB geometry type codes
+_WKB_POINT = 1
+_WKB_LINESTRING = 2
+_WKB_POLYGON = 3
+_WKB_MULTIPOINT = 4
+_WKB_MULTILINESTRING = 5
+_WKB_MULTIPOLYGON = 6
+
+# EWKB (PostGIS) type flags
+_EWKB_Z = 0x80000000
+_EWKB_M = 0x40000000
+_EWKB_SRID = 0x20000000
+_EWKB_FLAGS = _EWKB_Z | _EWKB_M | _EWKB_SRID
+
+# ISO WKB type code offset for Z geometries (e.g. 1001 for a PointZ)
+_ISO_Z = 1000
+
+_SHAPE_TYPES = {
+    _WKB_POINT: 'Point',
+    _WKB_LINESTRING: 'Polyline',
+    _WKB_POLYGON: 'Polygon',
+    _WKB_MULTIPOINT: 'Multipoint',
+    _WKB_MULTILINESTRING: 'Polyline',
+    _WKB_MULTIPOLYGON: 'Polygon'
+}
+
+_Buffer = _tp.Union[bytes, bytearray, memoryview]
+
+
+def _read_header(view: memoryview, offset: int) -> _tp.Tuple[str, int, bool, bool, _tp.Optional[int], int]:
+    """
+    Reads a (E)WKB geometry header at the given offset. Returns the byte order ('<' or '>'), the base geometry type,
+    the Z and M flags, the SRID (or ``None``) and the offset of the geometry body.
+    """
+    order = '<' if view[offset] else '>'
+    code, = _struct.unpack_from(order + 'I', view, offset + 1)
+    offset += 5
+    srid = None
+    if code & _EWKB_SRID:
+        srid, = _struct.unpack_from(order + 'i', view, offset)
+        offset += 4
+    has_z, has_m = bool(code & _EWKB_Z), bool(code & _EWKB_M)
+    code &= ~_EWKB_FLAGS & 0xFFFFFFFF
+    iso, base = divmod(code, _ISO_Z)
+    _vld.pass_if(base in _SHAPE_TYPES and iso <= 3, ValueError, f'Unsupported WKB geometry type {code}')
+    return order, base, has_z or iso in (1, 3), has_m or iso in (2, 3), srid, offset
+
+
+def _read_body(view: memoryview, offset: int, order: str, base: int, dims: int,
+               rings: _tp.List[_np.ndarray], parts: _tp.List[int]) -> int:
+    """
+    Reads the body of a WKB geometry of the given type and dimension at the given offset.
+    Appends the coordinate array (a view on the buffer) of each ring to *rings* and the number of rings of
+    each part to *parts*. Returns the offset of the next geometry.
+    """
+    dtype = _np.dtype(order + 'f8')
+    if base == _WKB_POINT:
+        point = _np.frombuffer(view, dtype, dims, offset)
+        if not _np.isnan(point[:2]).all():
+            # Empty points are written as NaN coordinates
+            rings.append(point.reshape(1, dims))
+            parts.append(1)
+        return offset + 8 * dims
+
+    if base in (_WKB_LINESTRING, _WKB_POLYGON):
+        num_rings = 1
+        if base == _WKB_POLYGON:
+            num_rings, = _struct.unpack_from(order + 'I', view, offset)
+            offset += 4
+        for _ in range(num_rings):
+            num_points, = _struct.unpack_from(order + 'I', view, offset)
+            rings.append(_np.frombuffer(view, dtype, num_points * dims, offset + 4).reshape(num_points, dims))
+            offset += 4 + 8 * num_points * dims
+        if num_rings and len(rings[-1]):
+            parts.append(num_rings)
+        elif num_rings:
+            del rings[-num_rings:]
+        return offset
+
+    num_geometries, = _struct.unpack_from(order + 'I', view, offset)
+    offset += 4
+    for _ in range(num_geometries):
+        order, sub_base, has_z, has_m, _, offset = _read_header(view, offset)
+        offset = _read_body(view, offset, order, sub_base, 2 + has_z + has_m, rings, parts)
+    return offset
+
+
+def _as_view(data: _Buffer) -> memoryview:
+    """ Returns a byte (unsigned char) memoryview for an object that supports the buffer protocol. """
+    view = data if isinstance(data, memoryview) else memoryview(data)
+    return view if view.format == 'B' and view.ndim == 1 else view.cast('B')
+
+
+def read_wkb_header(data: _Buffer) -> _tp.Tuple[str, bool, _tp.Optional[int]]:
+    """
+    Returns the Esri shape type ('Point', 'Multipoint', 'Polyline' or 'Polygon'), a boolean that is ``True`` if the
+    geometry has Z values, and the SRID (for EWKB, otherwise ``None``) of a WKB or EWKB geometry.
+
+    :param data:        A buffer (e.g. ``bytes``, ``bytearray`` or ``memoryview``) that contains the (E)WKB.
+    :rtype:             tuple
+    :raises ValueError: If the geometry type is not supported.
+    """
+    _, base, has_z, _, srid, _ = _read_header(_as_view(data), 0)
+    return _SHAPE_TYPES[base], has_z, srid
+
+
+def read_wkb(data: _Buffer) -> _tp.Tuple[_np.ndarray, _np.ndarray, _np.ndarray]:
+    """
+    Reads a WKB (ISO or OGC) or EWKB geometry into a coordinate array, a part offset array and a ring offset array,
+    using the same layout as :func:`gpf.tools.geometry.get_vertex_array`. Use :func:`read_wkb_header` to obtain the
+    shape type, Z awareness and SRID of the geometry.
+
+    The coordinate array has 3 columns if the geometry has Z values. If the geometry consists of a single ring
+    (or path) in little-endian byte order without M values, the coordinate array is a read-only view on the buffer.
+    Otherwise, the coordinates are copied into a new array exactly once.
+    The ring orientation is not changed, so the exterior rings of OGC polygons are usually counter-clockwise
+    (see :func:`write_esrijson`).
+
+    :param data:        A buffer (e.g. ``bytes``, ``bytearray`` or ``memoryview``) that contains the (E)WKB.
+    :returns:           A tuple of (coordinate array, part offset array, ring offset array).
+    :raises ValueError: If the geometry type is not supported or if the WKB is invalid.
+    """
+    view = _as_view(data)
+    rings, parts = [], []
+    try:
+        order, base, has_z, has_m, _, offset = _read_header(view, 0)
+        _read_body(view, offset, order, base, 2 + has_z + has_m, rings, parts)
+    except (_struct.error, IndexError) as e:
+        raise ValueError(f'Invalid WKB: {e}')
+
+    dims = 2 + has_z
+    if base == _WKB_MULTIPOINT and rings:
+        # Store the points of a multipoint as a single ring (like get_vertex_array() does)
+        rings, parts = [_np.concatenate(rings)], [1]
+    if len(rings) == 1 and rings[0].dtype == _np.float64 and not has_m:
+        coords = rings[0]
+    elif rings:
+        coords = _np.concatenate([r[:, :dims] for r in rings]).astype(_np.float64, copy=False)
+    else:
+        coords = _np.empty((0, dims))
+
+    ring_offsets = _np.zeros(len(rings) + 1, dtype=_np.int64)
+    _np.cumsum([len(r) for r in rings], out=ring_offsets[1:])
+    part_offsets = _np.zeros(len(parts) + 1, dtype=_np.int64)
+    _np.cumsum(parts, out=part_offsets[1:])
+    return coords[:, :dims], part_offsets, ring_offsets
+
+
+def read_wkb_many(buffers: _tp.Iterable[_tp.Optional[_Buffer]]) \
+        -> _tp.Tuple[_np.ndarray, _np.ndarray, _np.ndarray, _np.ndarray]:
+    """
+    Batch version of :func:`read_wkb`, which returns the vertices of multiple (E)WKB geometries in the same layout
+    as :func:`gpf.tools.geometry.get_vertex_arrays`. ``None`` values result in geometries without parts.
+
+    :param buffers:     An iterable of (E)WKB buffers (or ``None``).
+    :returns:           A tuple of (coordinate array, geometry offset array, part offset array, ring offset array).
+    :raises ValueError: If a geometry type is not supported or if a WKB is invalid.
+    """
+    return _geo.concat_vertex_arrays(None if b is None else read_wkb(b) for b in buffers)
+
+
+def _wkb_type(base: int, has_z: bool, srid: _tp.Optional[int], extended: bool) -> bytes:
+    """ Returns a little-endian (E)WKB geometry header. """
+    if not extended:
+        return _struct.pack('<BI', 1, base + _ISO_Z * has_z)
+    code = base | (_EWKB_Z if has_z else 0) | (_EWKB_SRID if srid is not None else 0)
+    return _struct.pack('<BI', 1, code) + (_struct.pack('<i', srid) if srid is not None else b'')
+
+
+def write_wkb(coords: _np.ndarray, part_offsets: _np.ndarray, ring_offsets: _np.ndarray, shape_type: str,
+              srid: _tp.Optional[int] = None, extended: _tp.Optional[bool] = None) -> bytes:
+    """
+    Writes the vertex arrays of a single geometry (see :func:`gpf.tools.geometry.get_vertex_array`) as
+    little-endian WKB. Single-part polylines and polygons are written as LineString and Polygon,
+    multi-part ones as MultiLineString and MultiPolygon.
+
+    By default, ISO WKB is written (i.e. a Z-aware point has type code 1001). If a *srid* is specified or
+    *extended* is ``True``, EWKB (PostGIS) is written instead.
+
+    The polygon rings are written in the orientation in which they are given, which means that the exterior rings
+    of Esri vertex arrays are clockwise. Consumers that require OGC (counter-clockwise) exterior rings should
+    normalize the orientation (e.g. using ``ST_ForcePolygonCCW`` in PostGIS).
+
+    :param coords:          An (N, 2) or (N, 3) coordinate array. Z values are written if it has 3 columns.
+    :param part_offsets:    The offsets of the rings for each part (in *ring_offsets*).
+    :param ring_offsets:    The offsets of the vertices for each ring (or path) (in *coords*).
+    :param shape_type:      The Esri shape type: 'Point', 'Multipoint', 'Polyline' or 'Polygon'.
+    :param srid:            An optional spatial reference ID (e.g. 2056), which is written to the EWKB header.
+    :param extended:        If ``True``, EWKB is written. Defaults to ``True`` if *srid* is set.
+    :rtype:                 bytes
+    :raises ValueError:     If the shape type is not supported.
+    """
+    coords = _np.asarray(coords, dtype=_np.float64)
+    _vld.pass_if(coords.ndim == 2 and coords.shape[1] in (2, 3), ValueError, 'Coordinates must be 2D or 3D')
+    part_offsets = _np.asarray(part_offsets, dtype=_np.int64).tolist()
+    ring_offsets = _np.asarray(ring_offsets, dtype=_np.int64).tolist()
+    extended = srid is not None if extended is None else extended
+    has_z = coords.shape[1] == 3
+    values = _np.ascontiguousarray(coords, dtype='<f8')
+
+    def header(base, top=False):
+        return _wkb_type(base, has_z, srid if top else None, extended)
+
+    def ring(r):
+        start, end = ring_offsets[r], ring_offsets[r + 1]
+        return _struct.pack('<I', end - start) + values[start:end].tobytes()
+
+    def polygon(p, top=False):
+        first, last = part_offsets[p], part_offsets[p + 1]
+        return b''.join([header(_WKB_POLYGON, top), _struct.pack('<I', last - first)] +
+                        [ring(r) for r in range(first, last)])
+
+    num_parts = len(part_offsets) - 1
+    if shape_type == 'Point':
+        point = values[ring_offsets[0]] if len(values) else _np.full(coords.shape[1], _np.nan, dtype='<f8')
+        return header(_WKB_POINT, True) + point.tobytes()
+    if shape_type == 'Multipoint':
+        start, end = (ring_offsets[0], ring_offsets[-1]) if ring_offsets else (0, 0)
+        point = header(_WKB_POINT)
+        return b''.join([header(_WKB_MULTIPOINT, True), _struct.pack('<I', end - start)] +
+                        [point + values[i].tobytes() for i in range(start, end)])
+    if shape_type == 'Polyline':
+        paths = [r for p in range(num_parts) for r in range(part_offsets[p], part_offsets[p + 1])]
+        if len(paths) == 1:
+            return header(_WKB_LINESTRING, True) + ring(paths[0])
+        return b''.join([header(_WKB_MULTILINESTRING, True), _struct.pack('<I', len(paths))] +
+                        [header(_WKB_LINESTRING) + ring(r) for r in paths])
+    if shape_type == 'Polygon':
+        if num_parts == 1:
+            return polygon(0, True)
+        return b''.join([header(_WKB_MULTIPOLYGON, True), _struct.pack('<I', num_parts)] +
+                        [polygon(p) for p in range(num_parts)])
+    raise ValueError(f'Unsupported shape type {shape_type!r}')
+
+
+def write_wkb_many(coords: _np.ndarray, geometry_offsets: _np.ndarray, part_offsets: _np.ndarray,
+                   ring_offsets: _np.ndarray, shape_type: str, srid: _tp.Optional[int] = None,
+                   extended: _tp.Optional[bool] = None) -> _tp.Generator:
+    """
+    Generator that writes each geometry in a set of vertex arrays (see :func:`gpf.tools.geometry.get_vertex_arrays`)
+    as WKB (see :func:`write_wkb`). For geometries without parts, ``None`` is yielded.
+
+    :param coords:              An (N, 2) or (N, 3) coordinate array.
+    :param geometry_offsets:    The offsets of the parts for each geometry (in *part_offsets*).
+    :param part_offsets:        The offsets of the rings for each part (in *ring_offsets*).
+    :param ring_offsets:        The offsets of the vertices for each ring (or path) (in *coords*).
+    :param shape_type:          The Esri shape type: 'Point', 'Multipoint', 'Polyline' or 'Polygon'.
+    :param srid:                An optional spatial reference ID, which is written to the EWKB header.
+    :param extended:            If ``True``, EWKB is written. Defaults to ``True`` if *srid* is set.
+    """
+    part_offsets = _np.asarray(part_offsets, dtype=_np.int64)
+    ring_offsets = _np.asarray(ring_offsets, dtype=_np.int64)
+    geometry_offsets = _np.asarray(geometry_offsets, dtype=_np.int64).tolist()
+    for first, last in zip(geometry_offsets[:-1], geometry_offsets[1:]):
+        if first == last:
+            yield None
+            continue
+        parts = part_offsets[first:last + 1]
+        yield write_wkb(coords, parts - parts[0], ring_offsets[parts[0]:parts[-1] + 1], shape_type, srid, extended)
+
+
+def _orient_rings(coords: _np.ndarray, part_offsets: _np.ndarray, ring_offsets: _np.ndarray) -> _np.ndarray:
+    """
+    Returns the polygon coordinates with the rings in Esri orientation: the first (exterior) ring of each part
+    clockwise and all other (interior) rings counter-clockwise. Rings that are oriented correctly are not changed.
+    """
+    coords = _np.asarray(coords, dtype=_np.float64)
+    part_offsets = _np.asarray(part_offsets, dtype=_np.int64)
+    ring_offsets = _np.asarray(ring_offsets, dtype=_np.int64)
+    if len(ring_offsets) < 2:
+        return coords
+    is_exterior = _np.zeros(len(ring_offsets) - 1, dtype=bool)
+    is_exterior[part_offsets[:-1]] = True
+    areas = _geo._signed_areas(coords, ring_offsets)
+    flip = _np.where(is_exterior, areas > 0, areas < 0)
+    if not flip.any():
+        return coords
+    # Reverse the vertex order of the flipped rings
+    starts, ends = ring_offsets[:-1], ring_offsets[1:]
+    ring_ids = _np.repeat(_np.arange(len(starts)), ends - starts)
+    order = _np.arange(len(coords))
+    flipped = flip[ring_ids]
+    order[flipped] = (starts + ends - 1)[ring_ids[flipped]] - order[flipped]
+    return coords[order]
+
+
+def read_esrijson(data: _tp.Union[str, _Buffer, dict]) -> _tp.Tuple[_np.ndarray, _np.ndarray, _np.ndarray]:
+    """
+    Reads an EsriJSON geometry (e.g. from the ``SHAPE@JSON`` cursor token) into a coordinate array, a part offset
+    array and a ring offset array. This is equivalent to :func:`gpf.tools.geometry.get_vertex_array`,
+    but it also accepts (UTF-8 encoded) buffers.
+
+    :param data:        An EsriJSON string, buffer or dictionary.
+    :returns:           A tuple of (coordinate array, part offset array, ring offset array).
+    :raises ValueError: If the geometry is not supported.
+    """
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        data = _json.loads(_as_view(data).tobytes() if isinstance(data, memoryview) else data)
+    return _geo.get_vertex_array(data)
+
+
+def write_esrijson(coords: _np.ndarray, part_offsets: _np.ndarray, ring_offsets: _np.ndarray, shape_type: str,
+                   spatial_reference: _tp.Union[int, str, None] = None) -> str:
+    """
+    Writes the vertex arrays of a single geometry as an EsriJSON string (see :func:`gpf.tools.geometry.get_esri_json`).
+    Note that EsriJSON does not store the part structure of polygons explicitly (it is derived from the ring
+    orientation). Therefore, the rings of a polygon are written clockwise if they are the first ring of a part
+    (exterior ring) and counter-clockwise otherwise (interior ring), so that e.g. the counter-clockwise exterior rings
+    of OGC WKB (as read by :func:`read_wkb`) are written correctly.
+
+    :param coords:              An (N, 2) or (N, 3) coordinate array. The geometry is Z aware if it has 3 columns.
+    :param part_offsets:        The offsets of the rings for each part (in *ring_offsets*).
+    :param ring_offsets:        The offsets of the vertices for each ring (or path) (in *coords*).
+    :param shape_type:          The Esri shape type: 'Point', 'Multipoint', 'Polyline' or 'Polygon'.
+    :param spatial_reference:   An optional spatial reference WKID (or name).
+    :rtype:                     str
+    """
+    if shape_type == 'Polygon':
+        coords = _orient_rings(coords, part_offsets, ring_offsets)
+    return _json.dumps(_geo.get_esri_json(coords, ring_offsets, shape_type, spatial_reference))
@@ -18,15 +18,34 @@
 The *geometry* module contains functions that help working with Esri geometries.
 """
 
+import json as _json
 import typing as _tp
+from itertools import chain as _chain
 
 import more_itertools as _iter
+import numpy as _np
 
+import gpf.common.const as _const
 import gpf.common.textutils as _tu
 import gpf.common.validate as _vld
+import gpf.cursors as _cursors
+import gpf.tools.metadata as _meta
+import gpf.tools.queries as _q
 from gpf import arcpy as _arcpy
 
 
+# Shape types (as returned by the Describe object), which are used to create geometries from coordinate arrays
+_SHAPE_POINT = 'Point'
+_SHAPE_MULTIPOINT = 'Multipoint'
+_SHAPE_POLYLINE = 'Polyline'
+_SHAPE_POLYGON = 'Polygon'
+
+#: Douglas-Peucker simplification method (see :func:`simplify_vertices`)
+SIMPLIFY_DOUGLAS_PEUCKER = 'douglas-peucker'
+#: Visvalingam-Whyatt simplification method (see :func:`simplify_vertices`)
+SIMPLIFY_VISVALINGAM = 'visvalingam'
+
+
 class GeometryError(ValueError):
     """ If the :class:`ShapeBuilder` cannot create the desired output geometry, a GeometryError is raised. """
     pass
@@ -67,23 +86,67 @@ class ShapeBuilder:
         <Point (1.50012207031, 2.33345540365, #, #)>
     """
 
-    __slots__ = '_arr', '_num_coords'
+    __slots__ = '_arr', '_num_coords', '_coords', '_offsets'
 
     def __init__(self, *args):
         # Because Array is an ArcObject, we cannot inherit from it the way we'd like to (raises RuntimeError).
         # We'll instantiate a new Array and store it in its own variable instead...
         self._arr = _arcpy.Array()
         self._num_coords = 0
+        self._coords = self._offsets = None
         if args:
             try:
                 self.extend(_iter.first(args))
             except ValueError:
                 self.append(*args)
 
+    @classmethod
+    def from_array(cls, coords: _tp.Union[_np.ndarray, _tp.Sequence],
+                   part_offsets: _tp.Union[_np.ndarray, _tp.Sequence, None] = None) -> 'ShapeBuilder':
+        """
+        Creates a ``ShapeBuilder`` from an (N, 2) or (N, 3) coordinate array (e.g. from :func:`get_vertex_array`).
+        No ArcPy ``Point`` objects are created: the output geometry is created from EsriJSON in a single call.
+
+        Example:
+
+            >>> coords = numpy.array([(1.0, 2.0), (1.5, 3.0), (4.0, 5.0), (6.0, 7.0)])
+            >>> ShapeBuilder.from_array(coords, [0, 2, 4]).as_polyline()  # polyline with 2 parts
+            <Polyline object at 0x6a9bb70[0x6fe2540]>
+
+        :param coords:          The coordinate array. Z values are only used if the output geometry is Z aware.
+                                Note that M values are not supported.
+        :param part_offsets:    The start index of each part (path or ring) in *coords*,
+                                optionally followed by the number of coordinates. Defaults to a single part.
+        :raises ValueError:     If the coordinate array or the part offsets are invalid.
+        """
+        coords = _np.asarray(coords, dtype=_np.float64)
+        _vld.pass_if(coords.ndim == 2 and coords.shape[1] in (2, 3), ValueError, 'Coordinates must be 2D or 3D')
+        offsets = _np.asarray([0] if part_offsets is None else part_offsets, dtype=_np.int64)
+        if not len(offsets) or offsets[-1] != len(coords):
+            offsets = _np.append(offsets, len(coords))
+        _vld.pass_if(offsets[0] == 0 and (_np.diff(offsets) >= 0).all(), ValueError, 'Invalid part offsets')
+
+        instance = cls()
+        instance._coords = coords
+        instance._offsets = offsets
+        instance._num_coords = len(coords)
+        return instance
+
+    def _materialize(self):
+        """ Converts the coordinate array of a ``ShapeBuilder`` created by :func:`from_array` into an Array. """
+        if self._coords is None:
+            return
+        parts = [_arcpy.Array([_arcpy.Point(*c) for c in part])
+                 for part in _split(self._coords.tolist(), self._offsets)]
+        self._arr = parts[0] if len(parts) == 1 else _arcpy.Array(parts)
+        self._coords = self._offsets = None
+
     def __iter__(self):
+        self._materialize()
         return iter(self._arr)
 
     def __len__(self):
+        self._materialize()
         return len(self._arr)
 
     def append(self, *args):
@@ -98,6 +161,7 @@ class ShapeBuilder:
 
         .. seealso::    https://desktop.arcgis.com/en/arcmap/latest/analyze/arcpy-classes/point.htm
         """
+        self._materialize()
         value = tuple(_iter.collapse(args, levels=1))
         try:
             if len(value) == 1:
@@ -138,6 +202,13 @@ class ShapeBuilder:
         except Exception as e:
             raise GeometryError(e)
 
+    def _output_json(self, shape_type: str, spatial_reference, has_z: bool):
+        """ Outputs the stored coordinate array (see :func:`from_array`) as the specified type. """
+        try:
+            return _arcpy.AsShape(_esri_json(shape_type, self._coords, self._offsets, spatial_reference, has_z), True)
+        except Exception as e:
+            raise GeometryError(e)
+
     @property
     def num_coords(self) -> int:
         """
@@ -160,6 +231,10 @@ class ShapeBuilder:
         :raises GeometryError:      If there is less than 1 coordinate.
         """
         _vld.pass_if(self.num_coords >= 1, GeometryError, 'PointGeometry must have at least 1 coordinate')
+        if self._coords is not None:
+            shape_type = _SHAPE_POINT if self.num_coords == 1 else _SHAPE_MULTIPOINT
+            geometry = self._output_json(shape_type, spatial_reference, has_z)
+            return geometry if self.num_coords == 1 else geometry.centroid
         if self.num_coords == 1:
             return self._output(_arcpy.PointGeometry, self._arr[0], spatial_reference, has_z, has_m)
         else:
@@ -177,6 +252,8 @@ class ShapeBuilder:
         :raises GeometryError:      If there are less than 2 coordinates.
         """
         _vld.pass_if(self.num_coords >= 2, GeometryError, 'Multipoint must have at least 2 coordinates')
+        if self._coords is not None:
+            return self._output_json(_SHAPE_MULTIPOINT, spatial_reference, has_z)
         return self._output(_arcpy.Multipoint, self._arr, spatial_reference, has_z, has_m)
 
     def as_polyline(self, spatial_reference: _tp.Union[str, int, _arcpy.SpatialReference, None] = None,
@@ -191,6 +268,8 @@ class ShapeBuilder:
         :raises GeometryError:      If there are less than 2 coordinates.
         """
         _vld.pass_if(self.num_coords >= 2, GeometryError, 'Polyline must have at least 2 coordinates')
+        if self._coords is not None:
+            return self._output_json(_SHAPE_POLYLINE, spatial_reference, has_z)
         return self._output(_arcpy.Polyline, self._arr, spatial_reference, has_z, has_m)
 
     def as_polygon(self, spatial_reference: _tp.Union[str, int, _arcpy.SpatialReference, None] = None,
@@ -206,6 +285,8 @@ class ShapeBuilder:
         :raises ValueError:         If there are less than 3 coordinates.
         """
         _vld.pass_if(self.num_coords >= 3, GeometryError, 'Polygon must have at least 3 coordinates')
+        if self._coords is not None:
+            return self._output_json(_SHAPE_POLYGON, spatial_reference, has_z)
         coords = self._arr
         if self.num_coords == 3:
             # Use a copy of the current array and append the first point to close the polygon
@@ -230,6 +311,37 @@ def _fix_coord(*args, **kwargs) -> _tp.Generator:
             yield None
 
 
+def _xyz_from_dict(a: dict) -> _tp.Tuple:
+    """ Returns the X, Y and Z values of an EsriJSON(-like) point dictionary. """
+    if 'x' in a and 'y' in a:
+        p_args = (a['x'], a['y'], a['z']) if 'z' in a else (a['x'], a['y'])
+    else:
+        # Read x, y and z keys in any case
+        p_args = tuple(v for k, v in sorted(a.items()) if k.lower() in ('x', 'y', 'z'))
+    # Validate values (floats are by far the most common, so they skip the full check)
+    for v in p_args:
+        if type(v) is not float:
+            _vld.pass_if(_vld.is_number(v), ValueError, 'Failed to parse coordinate from JSON')
+    return p_args
+
+
+def _xyz_from_point(a) -> _tp.Tuple:
+    """ Returns the X, Y and Z values of an ArcPy Point or PointGeometry (or any object with X and Y attributes). """
+    # Unfortunately, we can't really rely on isinstance() to check if it's a PointGeometry or Point.
+    # However, if it's a PointGeometry, it must have a pointCount attribute with a value of 1.
+    if getattr(a, 'pointCount', 0) == 1:
+        # Get first Point from PointGeometry...
+        a = a.firstPoint
+    try:
+        return a.X, a.Y, a.Z
+    except AttributeError:
+        raise ValueError('Input is not a Point, PointGeometry, JSON dictionary or iterable of float')
+
+
+# Cache of the coordinate getter function for each input type that was passed to get_xyz() as a single argument
+_XYZ_GETTERS = {dict: _xyz_from_dict}
+
+
 def get_xyz(*args) -> _tp.Tuple[float]:
     """
     Returns a floating point coordinate XYZ tuple for a given coordinate.
@@ -240,30 +352,60 @@ def get_xyz(*args) -> _tp.Tuple[float]:
 
     .. note::       For Point geometries, M and ID values are ignored.
     """
-    p_args = args
-
-    if len(args) == 1:
-        a = _iter.first(args)
-
-        # Unfortunately, we can't really rely on isinstance() to check if it's a PointGeometry or Point.
-        # However, if it's a PointGeometry, it must have a pointCount attribute with a value of 1.
-        if getattr(a, 'pointCount', 0) == 1:
-            # Get first Point from PointGeometry...
-            a = a.firstPoint
-
-        if hasattr(a, 'X') and hasattr(a, 'Y'):
-            # Get X, Y and Z properties from Point
-            p_args = a.X, a.Y, a.Z
-        elif isinstance(a, dict):
-            # Assume argument is JSON(-like) input: read x, y and z keys
-            p_args = tuple(v for k, v in sorted(a.items()) if k.lower() in ('x', 'y', 'z'))
-            # Validate values
-            for a in p_args:
-                _vld.pass_if(_vld.is_number(a), ValueError, 'Failed to parse coordinate from JSON'.format(args))
-        else:
-            raise ValueError('Input is not a Point, PointGeometry, JSON dictionary or iterable of float')
+    num_args = len(args)
+    if num_args == 2:
+        return args[0], args[1], None
+    if num_args > 2:
+        return args[0], args[1], args[2]
+    if not num_args:
+        return None, None, None
 
-    return tuple(_fix_coord(*p_args, dim=3))
+    # Dispatch on the type of the single argument (the type check is only done once per type)
+    a = args[0]
+    getter = _XYZ_GETTERS.get(type(a))
+    if getter is None:
+        getter = _xyz_from_dict if isinstance(a, dict) else _xyz_from_point
+        _XYZ_GETTERS[type(a)] = getter
+    p_args = getter(a)
+    return p_args if len(p_args) == 3 else tuple(_fix_coord(*p_args, dim=3))
+
+
+def get_xyz_many(points: _tp.Iterable) -> _np.ndarray:
+    """
+    Batch version of :func:`get_xyz`, which returns the coordinates of a sequence of points as an (N, 3)
+    ``float64`` array. Missing Z values are set to ``NaN``.
+
+    Sequences (or arrays) of numeric coordinate tuples are converted in a single NumPy operation.
+    Other input (e.g. EsriJSON dictionaries, ArcPy Point or PointGeometry instances) is converted per point.
+
+    Example:
+
+        >>> get_xyz_many([(1.0, 2.0), {'x': 3.0, 'y': 4.0, 'z': 5.0}])
+        array([[ 1.,  2., nan],
+               [ 3.,  4.,  5.]])
+
+    :param points:      An iterable of coordinate tuples, EsriJSON dictionaries, ArcPy Points or PointGeometries.
+    :raises ValueError: If a point could not be converted.
+    """
+    if isinstance(points, _np.ndarray):
+        arr = points.astype(_np.float64, copy=False)
+    else:
+        points = list(points)
+        arr = None
+        if points and isinstance(points[0], (tuple, list)):
+            try:
+                arr = _np.array(points, dtype=_np.float64)
+            except (TypeError, ValueError):
+                # Mixed 2D and 3D coordinates (or other input)
+                pass
+        if arr is None or arr.ndim != 2:
+            arr = _np.array([get_xyz(*p) if isinstance(p, (tuple, list)) else get_xyz(p) for p in points],
+                            dtype=_np.float64).reshape(-1, 3)
+    if not arr.size:
+        return _np.empty((0, 3))
+    _vld.pass_if(arr.ndim == 2 and arr.shape[1] in (2, 3), ValueError,
+                 f'Coordinate array must have shape (N, 2) or (N, 3), got {arr.shape}')
+    return arr if arr.shape[1] == 3 else _np.column_stack((arr, _np.full(len(arr), _np.nan)))
 
 
 def get_vertices(geometry) -> _tp.Generator:
@@ -281,4 +423,758 @@ def get_vertices(geometry) -> _tp.Generator:
             for v in get_vertices(g):
                 yield v
     else:
-        yield tuple(v for v in get_xyz(geometry) if v)
+        yield tuple(v for v in get_xyz(geometry) if v is not None)
+
+
+def _get_json(geometry) -> dict:
+    """ Returns the EsriJSON dictionary for an Esri Geometry, an EsriJSON string or an EsriJSON dictionary. """
+    if isinstance(geometry, dict):
+        return geometry
+    if isinstance(geometry, str):
+        return _json.loads(geometry)
+    _vld.pass_if(hasattr(geometry, 'JSON'), ValueError, 'Input is not an Esri Geometry or EsriJSON')
+    return _json.loads(geometry.JSON)
+
+
+def _get_rings(data: dict) -> _tp.Tuple[_tp.List[list], bool]:
+    """
+    Returns a list of rings (or paths) of vertex lists from an EsriJSON dictionary and a boolean that is ``True``
+    if the geometry is a polygon. Curve segments are replaced by their end points.
+    """
+    if 'x' in data:
+        if data['x'] is None:
+            return [], False
+        return [[[data['x'], data['y'], data.get('z')]]], False
+    if 'points' in data:
+        return ([data['points']] if data['points'] else []), False
+    for key, curve_key, is_polygon in (('paths', 'curvePaths', False), ('rings', 'curveRings', True)):
+        if curve_key in data:
+            return [[_iter.first(v.values())[0] if isinstance(v, dict) else v for v in ring]
+                    for ring in data[curve_key]], is_polygon
+        if key in data:
+            return data[key], is_polygon
+    raise ValueError('Unsupported EsriJSON geometry')
+
+
+def _signed_areas(coords: _np.ndarray, ring_offsets: _np.ndarray) -> _np.ndarray:
+    """ Returns the signed (shoelace) area of each closed ring. Clockwise rings have a negative area. """
+    x, y = coords[:, 0], coords[:, 1]
+    terms = _np.append(x[:-1] * y[1:] - x[1:] * y[:-1], 0.)
+    # Remove the terms that connect the last vertex of a ring to the first vertex of the next ring
+    terms[ring_offsets[1:] - 1] = 0.
+    return _np.add.reduceat(terms, ring_offsets[:-1]) / 2 if len(terms) else _np.zeros(0)
+
+
+def get_vertex_array(geometry) -> _tp.Tuple[_np.ndarray, _np.ndarray, _np.ndarray]:
+    """
+    Returns all vertices of an Esri Geometry as a contiguous (N, 2) or (N, 3) ``float64`` array,
+    along with a part offset array and a ring offset array. The vertices are read from the EsriJSON representation,
+    so that no ArcPy ``Point`` object has to be created for each vertex.
+
+    The coordinates have 3 columns if the geometry is Z aware. Missing Z values are set to ``NaN``.
+    M values are ignored. Note that curve segments (e.g. arcs) are represented by their end points only:
+    use the ``densify()`` method of the geometry first if the curves should be approximated.
+
+    The vertices of ring (or path) *r* are ``coords[ring_offsets[r]:ring_offsets[r + 1]]``,
+    and the rings of part *p* are ``ring_offsets[part_offsets[p]:part_offsets[p + 1] + 1]``.
+    For polygons, each part consists of an exterior (clockwise) ring followed by its interior rings (holes).
+    For polylines, each part consists of a single path. The points of a multipoint are stored as a single ring.
+
+    Example:
+
+        >>> coords, part_offsets, ring_offsets = get_vertex_array(polygon)
+        >>> for r in range(len(ring_offsets) - 1):
+        >>>     ring = coords[ring_offsets[r]:ring_offsets[r + 1]]
+
+    :param geometry:    An Esri Geometry, an EsriJSON string or an EsriJSON dictionary.
+    :returns:           A tuple of (coordinate array, part offset array, ring offset array).
+    :raises ValueError: If the geometry is not supported.
+    """
+    data = _get_json(geometry)
+    rings, is_polygon = _get_rings(data)
+    dims = 3 if data.get('hasZ') or data.get('z') is not None else 2
+
+    vertices = list(_chain.from_iterable(rings))
+    coords = _np.array(vertices, dtype=_np.float64)[:, :dims] if vertices else _np.empty((0, dims))
+    if coords.shape[1] < dims:
+        coords = _np.column_stack((coords, _np.full(len(coords), _np.nan)))
+    ring_offsets = _np.zeros(len(rings) + 1, dtype=_np.int64)
+    _np.cumsum([len(ring) for ring in rings], out=ring_offsets[1:])
+
+    if is_polygon and rings:
+        # Each exterior (clockwise) ring starts a new part
+        starts = _np.flatnonzero(_signed_areas(coords, ring_offsets) < 0)
+        if not len(starts) or starts[0] != 0:
+            starts = _np.insert(starts, 0, 0)
+        part_offsets = _np.append(starts, len(rings)).astype(_np.int64)
+    else:
+        part_offsets = _np.arange(len(rings) + 1, dtype=_np.int64)
+    return coords, part_offsets, ring_offsets
+
+
+def get_vertex_arrays(geometries: _tp.Iterable) -> _tp.Tuple[_np.ndarray, _np.ndarray, _np.ndarray, _np.ndarray]:
+    """
+    Batch version of :func:`get_vertex_array`, which returns the vertices of multiple geometries as a single
+    contiguous (N, 2) or (N, 3) ``float64`` array, along with geometry, part and ring offset arrays.
+    If at least one geometry is Z aware, the coordinate array has 3 columns (and ``NaN`` Z values for the others).
+    Empty geometries and ``None`` values result in geometries without parts.
+
+    The parts of geometry *g* are ``part_offsets[geometry_offsets[g]:geometry_offsets[g + 1] + 1]``.
+    The rings and vertices can then be found in the same way as described for :func:`get_vertex_array`.
+
+    Example:
+
+        >>> with SearchCursor('C:/Temp/test.gdb/pipes', 'SHAPE@') as rows:
+        >>>     coords, geometry_offsets, part_offsets, ring_offsets = get_vertex_arrays(shape for shape, in rows)
+
+    :param geometries:  An iterable of Esri Geometries, EsriJSON strings or EsriJSON dictionaries (or ``None``).
+    :returns:           A tuple of (coordinate array, geometry offset array, part offset array, ring offset array).
+    :raises ValueError: If a geometry is not supported.
+    """
+    return concat_vertex_arrays(None if g is None else get_vertex_array(g) for g in geometries)
+
+
+def concat_vertex_arrays(arrays: _tp.Iterable[_tp.Optional[_tp.Tuple[_np.ndarray, _np.ndarray, _np.ndarray]]]) \
+        -> _tp.Tuple[_np.ndarray, _np.ndarray, _np.ndarray, _np.ndarray]:
+    """
+    Combines the vertex arrays of multiple geometries (i.e. (coordinate array, part offset array, ring offset array)
+    tuples as returned by :func:`get_vertex_array`) into the batch layout that :func:`get_vertex_arrays` returns.
+    ``None`` values result in geometries without parts.
+
+    :param arrays:  An iterable of vertex array tuples (or ``None``).
+    :returns:       A tuple of (coordinate array, geometry offset array, part offset array, ring offset array).
+    """
+    results = list(arrays)
+    dims = max((r[0].shape[1] for r in results if r), default=2)
+
+    coords, geometry_offsets, part_offsets, ring_offsets = [], [0], [_np.zeros(1, dtype=_np.int64)], \
+        [_np.zeros(1, dtype=_np.int64)]
+    num_parts = num_rings = num_coords = 0
+    for result in results:
+        if result is not None:
+            vertices, parts, rings = result
+            if vertices.shape[1] < dims:
+                vertices = _np.column_stack((vertices, _np.full(len(vertices), _np.nan)))
+            coords.append(vertices)
+            part_offsets.append(parts[1:] + num_rings)
+            ring_offsets.append(rings[1:] + num_coords)
+            num_parts += len(parts) - 1
+            num_rings += len(rings) - 1
+            num_coords += len(vertices)
+        geometry_offsets.append(num_parts)
+
+    return (_np.concatenate(coords) if coords else _np.empty((0, dims)), _np.array(geometry_offsets, dtype=_np.int64),
+            _np.concatenate(part_offsets), _np.concatenate(ring_offsets))
+
+
+def _split(values: list, offsets: _np.ndarray) -> _tp.List[list]:
+    """ Splits a list of values into sub-lists, using an array of start offsets (followed by the end offset). """
+    bounds = offsets.tolist()
+    return [values[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+def _sr_json(spatial_reference: _tp.Union[str, int, _arcpy.SpatialReference, None]) -> _tp.Union[dict, None]:
+    """ Returns the EsriJSON spatial reference dictionary for a SpatialReference, WKID or (name, WKT) string. """
+    if spatial_reference is None:
+        return None
+    if isinstance(spatial_reference, int):
+        return {'wkid': spatial_reference}
+    if isinstance(spatial_reference, str):
+        spatial_reference = _arcpy.SpatialReference(spatial_reference)
+    if spatial_reference.factoryCode:
+        return {'wkid': spatial_reference.factoryCode}
+    return {'wkt': spatial_reference.exportToString()}
+
+
+def _esri_json(shape_type: str, coords: _np.ndarray, offsets: _np.ndarray,
+               spatial_reference: _tp.Union[str, int, _arcpy.SpatialReference, None] = None,
+               has_z: bool = False) -> dict:
+    """
+    Returns an EsriJSON dictionary for a geometry of the given shape type, using a coordinate array and
+    an array of part (path or ring) offsets. Open polygon rings are closed.
+    If *has_z* is ``True`` and the coordinates are 2D, the Z values are set to 0.
+    """
+    if has_z:
+        if coords.shape[1] < 3:
+            coords = _np.column_stack((coords, _np.zeros(len(coords))))
+        values = [[x, y, None if z != z else z] for x, y, z in coords.tolist()]
+    else:
+        values = coords[:, :2].tolist()
+
+    if shape_type == _SHAPE_POINT:
+        data = dict(zip('xyz', values[0]))
+    elif shape_type == _SHAPE_MULTIPOINT:
+        data = {'points': values}
+    elif shape_type == _SHAPE_POLYLINE:
+        data = {'paths': [part for part in _split(values, offsets) if part]}
+    elif shape_type == _SHAPE_POLYGON:
+        rings = [ring for ring in _split(values, offsets) if ring]
+        data = {'rings': [ring if ring[0] == ring[-1] else ring + ring[:1] for ring in rings]}
+    else:
+        raise GeometryError(f'Unsupported shape type {shape_type!r}')
+
+    if has_z:
+        data['hasZ'] = True
+    sr = _sr_json(spatial_reference)
+    if sr:
+        data['spatialReference'] = sr
+    return data
+
+
+def get_esri_json(coords: _np.ndarray, ring_offsets: _np.ndarray, shape_type: str,
+                  spatial_reference: _tp.Union[str, int, _arcpy.SpatialReference, None] = None,
+                  has_z: _tp.Union[bool, None] = None) -> dict:
+    """
+    Returns an EsriJSON dictionary for the vertex arrays of a single geometry (see :func:`get_vertex_array`).
+    Open polygon rings are closed.
+
+    :param coords:              An (N, 2) or (N, 3) coordinate array.
+    :param ring_offsets:        The offsets of the vertices for each ring (or path) (in *coords*), followed by N.
+    :param shape_type:          The shape type: 'Point', 'Multipoint', 'Polyline' or 'Polygon'.
+    :param spatial_reference:   An optional spatial reference (SpatialReference object, name or WKID).
+    :param has_z:               If ``True``, the geometry is Z aware. By default, this is the case if
+                                *coords* has 3 columns.
+    :raises GeometryError:      If the shape type is not supported.
+    """
+    coords = _np.asarray(coords, dtype=_np.float64)
+    ring_offsets = _np.asarray(ring_offsets, dtype=_np.int64)
+    has_z = coords.shape[1] > 2 if has_z is None else has_z
+    return _esri_json(shape_type, coords[ring_offsets[0]:ring_offsets[-1]], ring_offsets - ring_offsets[0],
+                      spatial_reference, has_z)
+
+
+def from_vertex_arrays(coords: _np.ndarray, geometry_offsets: _np.ndarray, part_offsets: _np.ndarray,
+                       ring_offsets: _np.ndarray, shape_type: str,
+                       spatial_reference: _tp.Union[str, int, _arcpy.SpatialReference, None] = None,
+                       has_z: _tp.Union[bool, None] = None) -> _tp.Generator:
+    """
+    Generator that creates an Esri Geometry for each geometry in a set of vertex arrays, i.e. the inverse of
+    :func:`get_vertex_arrays`. Each geometry is created from EsriJSON in a single ArcPy call,
+    so that no ArcPy ``Point`` or ``Array`` objects have to be created.
+    For geometries without parts (e.g. ``None`` values that were passed to :func:`get_vertex_arrays`),
+    ``None`` is yielded.
+
+    Example:
+
+        >>> coords, geometry_offsets, part_offsets, ring_offsets = get_vertex_arrays(shapes)
+        >>> coords[:, :2] += (2000000, 1000000)  # shift LV03 coordinates to LV95
+        >>> for shape in from_vertex_arrays(coords, geometry_offsets, part_offsets, ring_offsets, 'Polyline', 2056):
+        >>>     print(shape.length)
+
+    :param coords:              An (N, 2) or (N, 3) coordinate array.
+    :param geometry_offsets:    The offsets of the parts for each geometry (in *part_offsets*).
+    :param part_offsets:        The offsets of the rings for each part (in *ring_offsets*).
+    :param ring_offsets:        The offsets of the vertices for each ring (or path) (in *coords*).
+    :param shape_type:          The output shape type: 'Point', 'Multipoint', 'Polyline' or 'Polygon'.
+    :param spatial_reference:   An optional spatial reference (SpatialReference object, name or WKID).
+    :param has_z:               If ``True``, the geometries are Z aware. By default, this is the case if
+                                *coords* has 3 columns.
+    :raises GeometryError:      If a geometry could not be created.
+    """
+    coords = _np.asarray(coords, dtype=_np.float64)
+    has_z = coords.shape[1] > 2 if has_z is None else has_z
+    sr = _sr_json(spatial_reference)
+    ring_offsets = _np.asarray(ring_offsets, dtype=_np.int64)
+    part_bounds = _np.asarray(part_offsets)[_np.asarray(geometry_offsets)].tolist()
+    for first_ring, last_ring in zip(part_bounds[:-1], part_bounds[1:]):
+        if first_ring == last_ring:
+            yield None
+            continue
+        yield _as_shape(shape_type, coords, ring_offsets[first_ring:last_ring + 1], sr, has_z)
+
+
+def _as_shape(shape_type: str, coords: _np.ndarray, offsets: _np.ndarray, sr: _tp.Union[dict, None],
+              has_z: bool) -> _arcpy.Geometry:
+    """
+    Creates an Esri Geometry from the vertices ``coords[offsets[0]:offsets[-1]]``, where *offsets* are the ring
+    (or path) offsets of the geometry and *sr* is an EsriJSON spatial reference dictionary (or ``None``).
+    """
+    data = _esri_json(shape_type, coords[offsets[0]:offsets[-1]], offsets - offsets[0], None, has_z)
+    if sr:
+        data['spatialReference'] = sr
+    try:
+        return _arcpy.AsShape(data, True)
+    except Exception as e:
+        raise GeometryError(e)
+
+
+class VertexSnapper(object):
+    """
+    VertexSnapper(reference, tolerance)
+
+    Snaps vertices to the nearest point of a reference point set (e.g. the nodes of a network),
+    if that point lies within the given tolerance.
+
+    The reference points are hashed into a uniform grid (similar to the :func:`gpf.lookups.get_nodekey` grid),
+    of which the cell size equals (at least) the tolerance. To snap a vertex, only the reference points in its own cell
+    and in the 8 neighbouring cells have to be checked. All vertices are processed in NumPy operations at once.
+
+    Because a ``VertexSnapper`` does not hold any ArcPy objects, it can be pickled and sent to a process pool,
+    so that large datasets can be snapped per tile (e.g. using a spatial where clause or a tile-specific reference set)
+    in parallel.
+
+    Example:
+
+        >>> nodes = get_coordtuples(list(NodeSet('C:/Temp/test.gdb/hydrants')))
+        >>> snapper = VertexSnapper(nodes, 0.05)
+        >>> for fc in ('C:/Temp/test.gdb/pipes', 'C:/Temp/test.gdb/valves'):
+        >>>     snapper.snap_features(fc)
+
+    **Params:**
+
+    -   **reference** (numpy.ndarray, list, tuple):
+
+        An (M, 2) or (M, 3) array (or sequence) of reference point coordinates. Z values are ignored.
+
+    -   **tolerance** (float):
+
+        The snapping tolerance (maximum XY distance) in the units of the reference coordinates.
+
+    :raises ValueError:     When the reference points or tolerance are invalid.
+    """
+
+    __slots__ = '_tolerance', '_coords', '_keys', '_starts', '_origin', '_cell_size', '_shape'
+
+    # Maximum number of grid cells per axis (so that the cell keys fit in an int64)
+    _MAX_CELLS = 2 ** 30
+
+    def __init__(self, reference: _tp.Union[_np.ndarray, _tp.Sequence], tolerance: float):
+        coords = _np.asarray(reference, dtype=_np.float64)
+        coords = coords.reshape(-1, 2) if not coords.size else coords
+        _vld.pass_if(coords.ndim == 2 and coords.shape[1] in (2, 3), ValueError, 'Coordinates must be 2D or 3D')
+        _vld.pass_if(_vld.is_number(tolerance) and tolerance > 0, ValueError, 'Tolerance must be a positive number')
+        coords = coords[:, :2]
+        _vld.raise_if(_np.isnan(coords).any(), ValueError, 'Reference coordinates must not contain NaN values')
+
+        self._tolerance = float(tolerance)
+        self._origin = coords.min(axis=0) if len(coords) else _np.zeros(2)
+        span = (coords.max(axis=0) - self._origin).max() if len(coords) else 0.
+        # The cell size may be larger than the tolerance (for very large extents): the 3x3 probe is still sufficient
+        self._cell_size = max(self._tolerance, span / (self._MAX_CELLS - 1))
+        cells = self._get_cells(coords)
+        self._shape = cells.max(axis=0) + 1 if len(cells) else _np.ones(2, dtype=_np.int64)
+
+        # Sort the reference points by cell key and store the start index of each occupied cell,
+        # so that the points in a cell can be found using a binary search
+        keys = self._get_keys(cells)
+        order = _np.argsort(keys, kind='stable')
+        self._keys, starts = _np.unique(keys[order], return_index=True)
+        self._starts = _np.append(starts, len(keys))
+        self._coords = coords[order]
+
+    def _get_cells(self, xy: _np.ndarray) -> _np.ndarray:
+        """ Returns the (column, row) grid cell indices for an (N, 2) coordinate array. """
+        return _np.floor((xy - self._origin) / self._cell_size).astype(_np.int64)
+
+    def _get_keys(self, cells: _np.ndarray) -> _np.ndarray:
+        """ Returns the (sortable) cell keys for an (N, 2) array of grid cell indices. """
+        return cells[:, 0] * self._shape[1] + cells[:, 1]
+
+    @property
+    def tolerance(self) -> float:
+        """ Returns the snapping tolerance. """
+        return self._tolerance
+
+    @property
+    def reference(self) -> _np.ndarray:
+        """ Returns the (M, 2) reference coordinate array (in grid order). """
+        return self._coords
+
+    def nearest(self, coords: _tp.Union[_np.ndarray, _tp.Sequence]) -> _tp.Tuple[_np.ndarray, _np.ndarray]:
+        """
+        Returns the index of the nearest reference point within the tolerance for each coordinate (or -1 if there
+        is none), and the distance to that point (or ``inf``). The indices refer to :attr:`reference`.
+
+        :param coords:  An (N, 2) or (N, 3) array (or sequence) of coordinates. Z values are ignored.
+        :rtype:         tuple
+        """
+        xy = _np.asarray(coords, dtype=_np.float64)
+        _vld.pass_if(xy.ndim == 2 and xy.shape[1] in (2, 3), ValueError, 'Coordinates must be 2D or 3D')
+        xy = xy[:, :2]
+        best_index = _np.full(len(xy), -1, dtype=_np.int64)
+        best_dist = _np.full(len(xy), _np.inf)
+        if not len(self._keys) or not len(xy):
+            return best_index, best_dist
+
+        # Coordinates that are NaN (or too far away) are moved to a cell outside the grid
+        outside = ~(_np.abs(xy - self._origin) < self._cell_size * self._MAX_CELLS).all(axis=1)
+        cells = self._get_cells(_np.where(outside[:, None], self._origin - 2 * self._cell_size, xy))
+
+        # Process the coordinates in cell key order: the probe keys (key + offset) are then sorted as well,
+        # which makes the binary searches much faster
+        order = _np.argsort(self._get_keys(cells))
+        xy, cells = xy[order], cells[order]
+        nearest_index, nearest_dist = best_index.copy(), best_dist.copy()
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                probe = cells + (dx, dy)
+                valid = _np.nonzero(((probe >= 0) & (probe < self._shape)).all(axis=1))[0]
+                keys = self._get_keys(probe[valid])
+                slots = _np.minimum(_np.searchsorted(self._keys, keys), len(self._keys) - 1)
+                occupied = self._keys[slots] == keys
+                valid, slots = valid[occupied], slots[occupied]
+                if not len(valid):
+                    continue
+
+                # Expand to (vertex, reference point) candidates and keep the nearest candidate per vertex
+                lower = self._starts[slots]
+                counts = self._starts[slots + 1] - lower
+                vertices = _np.repeat(valid, counts)
+                points = _np.repeat(lower - (_np.cumsum(counts) - counts), counts) + _np.arange(counts.sum())
+                dist = _np.hypot(*(xy[vertices] - self._coords[points]).T)
+                candidates = _np.lexsort((dist, vertices))
+                vertices, points, dist = vertices[candidates], points[candidates], dist[candidates]
+                first = _np.concatenate(([True], vertices[1:] != vertices[:-1]))
+                vertices, points, dist = vertices[first], points[first], dist[first]
+                better = (dist <= self._tolerance) & (dist < nearest_dist[vertices])
+                nearest_index[vertices[better]] = points[better]
+                nearest_dist[vertices[better]] = dist[better]
+
+        best_index[order] = nearest_index
+        best_dist[order] = nearest_dist
+        return best_index, best_dist
+
+    def snap(self, coords: _tp.Union[_np.ndarray, _tp.Sequence]) -> _tp.Tuple[_np.ndarray, _np.ndarray]:
+        """
+        Snaps an (N, 2) or (N, 3) coordinate array (e.g. from :func:`get_vertex_arrays`) to the reference points.
+        Returns a snapped copy of the coordinates and a boolean array that is ``True`` for each vertex that moved.
+        Only the X and Y values are changed: Z values (if any) are preserved.
+
+        :param coords:  The coordinate array to snap.
+        :rtype:         tuple
+        """
+        snapped = _np.array(coords, dtype=_np.float64)
+        index, _ = self.nearest(snapped)
+        found = _np.nonzero(index >= 0)[0]
+        snapped[found, :2] = self._coords[index[found]]
+        moved = _np.zeros(len(snapped), dtype=bool)
+        moved[found] = (snapped[found, :2] != _np.asarray(coords, dtype=_np.float64)[found, :2]).any(axis=1)
+        return snapped, moved
+
+    def snap_features(self, fc_path: str, where_clause: _tp.Union[None, str, _q.Where] = None,
+                      batch_size: int = 10000) -> int:
+        """
+        Snaps the vertices of all features in a feature class (optionally filtered by a where clause) and writes
+        the changed geometries back in a single ``UpdateCursor`` pass. Returns the number of updated features.
+
+        The vertices are read in batches of *batch_size* features (as EsriJSON, so that no ArcPy ``Point``
+        objects are created) and each batch is snapped at once.
+        Note that curve segments of updated features are replaced by straight segments (see :func:`get_vertex_array`).
+
+        :param fc_path:         The full path to the feature class that should be snapped.
+        :param where_clause:    An optional where clause to filter the features (e.g. a tile extent).
+        :param batch_size:      The number of features that are snapped at once (default = 10000).
+        :raises GeometryError:  If a snapped geometry could not be created.
+        """
+        desc = _meta.Describe(fc_path)
+        shape_type, has_z = desc.shapeType, desc.hasZ
+        sr = _sr_json(desc.spatialReference)
+
+        updates = {}
+        with _cursors.SearchCursor(fc_path, (_const.FIELD_OID, _const.FIELD_ESRIJSON), where_clause) as rows:
+            for batch in _iter.chunked(rows, batch_size):
+                oids, shapes = zip(*batch)
+                coords, geometry_offsets, part_offsets, ring_offsets = get_vertex_arrays(shapes)
+                snapped, moved = self.snap(coords)
+                bounds = ring_offsets[part_offsets[geometry_offsets]]
+                counts = _np.concatenate(([0], _np.cumsum(moved)))
+                for g in _np.nonzero(counts[bounds[1:]] > counts[bounds[:-1]])[0].tolist():
+                    offsets = ring_offsets[part_offsets[geometry_offsets[g]]:part_offsets[geometry_offsets[g + 1]] + 1]
+                    updates[oids[g]] = _as_shape(shape_type, snapped, offsets, sr, has_z)
+
+        if updates:
+            with _cursors.UpdateCursor(fc_path, (_const.FIELD_OID, _const.FIELD_SHAPE), where_clause) as rows:
+                for row in rows:
+                    shape = updates.get(row[0])
+                    if shape is not None:
+                        rows.updateRow((row[0], shape))
+        return len(updates)
+
+
+def _segment_distances(points: _np.ndarray, starts: _np.ndarray, ends: _np.ndarray) -> _np.ndarray:
+    """ Returns the XY distances of an (N, 2) array of points to the segments between *starts* and *ends*. """
+    seg = ends - starts
+    sq_len = (seg ** 2).sum(axis=1)
+    t = _np.divide(((points - starts) * seg).sum(axis=1), sq_len, out=_np.zeros(len(points)), where=sq_len > 0)
+    return _np.hypot(*(points - starts - _np.clip(t, 0., 1.)[:, None] * seg).T)
+
+
+def _douglas_peucker(xy: _np.ndarray, anchors: _np.ndarray, tolerance: float) -> _np.ndarray:
+    """
+    Returns a keep mask for the Douglas-Peucker simplification of all chains between consecutive anchor vertices.
+    All chains are split simultaneously, so that each iteration is a single pass over the remaining vertices.
+    """
+    keep = anchors.copy()
+    bounds = _np.flatnonzero(anchors)
+    starts, ends = bounds[:-1], bounds[1:]
+    while True:
+        mask = ends - starts > 1
+        starts, ends = starts[mask], ends[mask]
+        if not len(starts):
+            return keep
+
+        # Find the vertex with the largest distance to the chord (start, end) for each chain
+        counts = ends - starts - 1
+        offsets = _np.cumsum(counts) - counts
+        chains = _np.repeat(_np.arange(len(starts)), counts)
+        positions = _np.repeat(starts + 1 - offsets, counts) + _np.arange(counts.sum())
+        dist = _segment_distances(xy[positions], xy[starts[chains]], xy[ends[chains]])
+        max_dist = _np.maximum.reduceat(dist, offsets)
+        hits = _np.flatnonzero(dist == max_dist[chains])
+        first = _np.concatenate(([True], chains[hits[1:]] != chains[hits[:-1]]))
+        split = max_dist > tolerance
+        mids = positions[hits[first]][split]
+        keep[mids] = True
+        starts, ends = _np.concatenate((starts[split], mids)), _np.concatenate((mids, ends[split]))
+
+
+def _visvalingam(xy: _np.ndarray, anchors: _np.ndarray, tolerance: float) -> _np.ndarray:
+    """
+    Returns a keep mask for the Visvalingam-Whyatt simplification, where *tolerance* is the minimum triangle area.
+    Instead of removing one vertex at a time, all vertices of which the area is below the tolerance and smaller than
+    the areas of both neighbours are removed at once, after which only the areas of their neighbours are updated.
+    """
+    num_vertices = len(xy)
+    keep = _np.ones(num_vertices, dtype=bool)
+    prev, nxt = _np.arange(-1, num_vertices - 1), _np.arange(1, num_vertices + 1)
+    areas = _np.full(num_vertices, _np.inf)
+    active = _np.flatnonzero(~anchors)
+    while len(active):
+        p, n = prev[active], nxt[active]
+        a, b = xy[p] - xy[active], xy[n] - xy[active]
+        areas[active] = _np.abs(a[:, 0] * b[:, 1] - a[:, 1] * b[:, 0]) / 2.
+        candidates = active[areas[active] < tolerance]
+        if not len(candidates):
+            break
+
+        # Remove the local minima (ties are broken by position, so that adjacent vertices are never removed together)
+        current = areas[candidates]
+        removed = candidates[(current < areas[prev[candidates]]) & (current <= areas[nxt[candidates]])]
+        keep[removed] = False
+        areas[removed] = _np.inf
+        nxt[prev[removed]] = nxt[removed]
+        prev[nxt[removed]] = prev[removed]
+        neighbours = _np.concatenate((prev[removed], nxt[removed]))
+        active = _np.sort(_np.concatenate((candidates[keep[candidates]], neighbours[~anchors[neighbours]])))
+        active = active[_np.concatenate(([True], active[1:] != active[:-1]))] if len(active) else active
+    return keep
+
+
+def find_junctions(coords: _np.ndarray, ring_offsets: _np.ndarray) -> _np.ndarray:
+    """
+    Returns a boolean array that is ``True`` for each vertex that is a junction (or an end point) of the boundaries
+    in a set of vertex arrays, i.e. a vertex of which the number of distinct neighbour vertices is not 2.
+    Vertices are considered equal if their X and Y values are exactly equal.
+
+    Interior vertices of boundaries that are shared by multiple geometries (e.g. adjacent parcels) are *not*
+    junctions. If these junctions are kept fixed during simplification (see :func:`simplify_arrays`),
+    the shared boundaries are simplified in the same way for each geometry.
+
+    :param coords:          An (N, 2) or (N, 3) coordinate array.
+    :param ring_offsets:    The start index of each ring (or path) in *coords*, followed by N.
+    :rtype:                 numpy.ndarray
+    """
+    coords, ring_offsets = _np.asarray(coords, dtype=_np.float64), _np.asarray(ring_offsets, dtype=_np.int64)
+    if not len(coords):
+        return _np.zeros(0, dtype=bool)
+    _, ids = _np.unique(coords[:, :2], axis=0, return_inverse=True)
+    ids = ids.ravel()
+
+    # Collect the unique undirected edges between distinct vertices (excluding the edges between rings)
+    connected = _np.ones(len(coords) - 1, dtype=bool)
+    connected[ring_offsets[1:-1][ring_offsets[1:-1] > 0] - 1] = False
+    a, b = ids[:-1][connected], ids[1:][connected]
+    edges = _np.unique(_np.column_stack((_np.minimum(a, b), _np.maximum(a, b)))[a != b], axis=0)
+    degree = _np.bincount(edges.ravel(), minlength=ids.max() + 1)
+    return degree[ids] != 2
+
+
+def _closed_rings(coords: _np.ndarray, ring_offsets: _np.ndarray) -> _np.ndarray:
+    """ Returns a boolean array that is ``True`` for each ring with at least 4 vertices of which the ends are equal. """
+    starts, ends = ring_offsets[:-1], ring_offsets[1:]
+    closed = ends - starts >= 4
+    closed[closed] = (coords[starts[closed], :2] == coords[ends[closed] - 1, :2]).all(axis=1)
+    return closed
+
+
+def _rotate_rings(coords: _np.ndarray, ring_offsets: _np.ndarray,
+                  fixed: _np.ndarray) -> _tp.Tuple[_np.ndarray, _np.ndarray]:
+    """
+    Rotates all closed rings, so that they start at their first fixed vertex, or at their (lexicographically)
+    smallest vertex if they do not have fixed vertices. Returns the rotated coordinates and fixed vertex mask.
+    """
+    starts, sizes = ring_offsets[:-1], _np.diff(ring_offsets)
+    closed = _closed_rings(coords, ring_offsets)
+    if not closed.any():
+        return coords, fixed
+
+    # Find the first fixed vertex of each ring (ignoring the closing vertex)
+    ends = starts + sizes - 1
+    fixed_index = _np.flatnonzero(fixed)
+    first = fixed_index[_np.minimum(_np.searchsorted(fixed_index, starts), max(len(fixed_index) - 1, 0))] \
+        if len(fixed_index) else _np.full(len(starts), -1)
+    has_fixed = (first >= starts) & (first < ends)
+
+    # Otherwise, use the smallest vertex (so that rings that are shared by multiple geometries start at the same vertex)
+    order = _np.lexsort((coords[:, 1], coords[:, 0]))
+    ranks = _np.empty(len(coords), dtype=_np.int64)
+    ranks[order] = _np.arange(len(coords))
+    ranks[ends[sizes > 0]] = len(coords)
+    smallest = order[_np.minimum(_np.minimum.reduceat(ranks, _np.minimum(starts, len(coords) - 1)), len(coords) - 1)]
+    rotation = _np.where(closed, _np.where(has_fixed, first, smallest) - starts, 0)
+
+    rings = _np.repeat(_np.arange(len(starts)), sizes)
+    local = _np.arange(len(coords)) - starts[rings]
+    length = _np.maximum(sizes - 1, 1)[rings]
+    shift = rotation[rings]
+    index = starts[rings] + _np.where(local < length, (local + shift) % length, shift)
+    fixed = fixed[index]
+    fixed[starts[closed]] = True
+    return coords[index], fixed
+
+
+def simplify_vertices(coords: _np.ndarray, ring_offsets: _np.ndarray, tolerance: float,
+                      method: str = SIMPLIFY_DOUGLAS_PEUCKER, fixed: _tp.Optional[_np.ndarray] = None) -> _np.ndarray:
+    """
+    Simplifies all rings (or paths) in a set of vertex arrays at once and returns a boolean array that is ``True``
+    for each vertex that should be kept. The first and last vertex of each ring are always kept.
+    Closed rings that would be reduced to less than 4 vertices are not simplified.
+
+    Two methods are supported:
+
+    - :attr:`SIMPLIFY_DOUGLAS_PEUCKER` (default): keeps the vertices that deviate more than *tolerance*
+      (a distance) from the simplified line.
+    - :attr:`SIMPLIFY_VISVALINGAM`: removes the vertices of which the effective triangle area (i.e. the area of the
+      triangle that a vertex forms with its remaining neighbours) is smaller than *tolerance* (an area).
+
+    Only the X and Y values are taken into account. Note that the simplified polygons may be self-intersecting.
+
+    Example:
+
+        >>> keep = simplify_vertices(coords, ring_offsets, 0.5)
+        >>> coords, ring_offsets = coords[keep], numpy.cumsum(numpy.append(0, keep))[ring_offsets]
+
+    :param coords:          An (N, 2) or (N, 3) coordinate array.
+    :param ring_offsets:    The start index of each ring (or path) in *coords*, followed by N.
+    :param tolerance:       The simplification tolerance (see above).
+    :param method:          The simplification method (default = :attr:`SIMPLIFY_DOUGLAS_PEUCKER`).
+    :param fixed:           An optional boolean array that is ``True`` for each vertex that must be kept
+                            (e.g. the output of :func:`find_junctions`).
+    :rtype:                 numpy.ndarray
+    :raises ValueError:     If the method or tolerance is invalid.
+    """
+    _vld.pass_if(method in (SIMPLIFY_DOUGLAS_PEUCKER, SIMPLIFY_VISVALINGAM), ValueError,
+                 f'Simplification method must be {SIMPLIFY_DOUGLAS_PEUCKER!r} or {SIMPLIFY_VISVALINGAM!r}')
+    _vld.pass_if(_vld.is_number(tolerance) and tolerance >= 0, ValueError, 'Tolerance must be a non-negative number')
+    coords, ring_offsets = _np.asarray(coords, dtype=_np.float64), _np.asarray(ring_offsets, dtype=_np.int64)
+    anchors = _np.zeros(len(coords), dtype=bool) if fixed is None else _np.array(fixed, dtype=bool)
+    sizes = _np.diff(ring_offsets)
+    anchors[ring_offsets[:-1][sizes > 0]] = True
+    anchors[ring_offsets[1:][sizes > 0] - 1] = True
+
+    simplify = _douglas_peucker if method == SIMPLIFY_DOUGLAS_PEUCKER else _visvalingam
+    keep = simplify(coords[:, :2], anchors, tolerance)
+
+    # Restore the closed rings that collapsed
+    kept = _np.diff(_np.concatenate(([0], _np.cumsum(keep)))[ring_offsets])
+    collapsed = _np.repeat(_closed_rings(coords, ring_offsets) & (kept < 4), sizes)
+    keep[collapsed] = True
+    return keep
+
+
+def simplify_arrays(coords: _np.ndarray, geometry_offsets: _np.ndarray, part_offsets: _np.ndarray,
+                    ring_offsets: _np.ndarray, tolerance: float, method: str = SIMPLIFY_DOUGLAS_PEUCKER,
+                    preserve_topology: bool = False) -> _tp.Tuple[_np.ndarray, _np.ndarray, _np.ndarray, _np.ndarray]:
+    """
+    Simplifies the geometries in a set of vertex arrays (see :func:`get_vertex_arrays`) and returns new
+    vertex arrays (the geometry and part offsets remain the same). See :func:`simplify_vertices` for the
+    *tolerance* and *method* parameters.
+
+    If *preserve_topology* is ``True``, all junctions (see :func:`find_junctions`) are kept and closed rings are
+    rotated to start at a junction (or at their smallest vertex), so that boundaries that are shared by multiple
+    geometries in the vertex arrays are simplified identically (and no gaps or overlaps are introduced between them).
+
+    :param coords:              An (N, 2) or (N, 3) coordinate array.
+    :param geometry_offsets:    The offsets of the parts for each geometry (in *part_offsets*).
+    :param part_offsets:        The offsets of the rings for each part (in *ring_offsets*).
+    :param ring_offsets:        The offsets of the vertices for each ring (or path) (in *coords*).
+    :param tolerance:           The simplification tolerance.
+    :param method:              The simplification method (default = :attr:`SIMPLIFY_DOUGLAS_PEUCKER`).
+    :param preserve_topology:   If ``True`` (default = ``False``), shared boundaries are simplified identically.
+    :returns:                   A tuple of (coordinate array, geometry offset array, part offset array,
+                                ring offset array).
+    """
+    coords, ring_offsets = _np.asarray(coords, dtype=_np.float64), _np.asarray(ring_offsets, dtype=_np.int64)
+    fixed = None
+    if preserve_topology:
+        coords, fixed = _rotate_rings(coords, ring_offsets, find_junctions(coords, ring_offsets))
+    keep = simplify_vertices(coords, ring_offsets, tolerance, method, fixed)
+    return coords[keep], geometry_offsets, part_offsets, _np.concatenate(([0], _np.cumsum(keep)))[ring_offsets]
+
+
+def _shape_type(data: dict) -> str:
+    """ Returns the shape type of an EsriJSON geometry dictionary. """
+    if 'x' in data:
+        return _SHAPE_POINT
+    if 'points' in data:
+        return _SHAPE_MULTIPOINT
+    return _SHAPE_POLYGON if 'rings' in data or 'curveRings' in data else _SHAPE_POLYLINE
+
+
+def get_shape_type(geometry) -> str:
+    """
+    Returns the shape type ('Point', 'Multipoint', 'Polyline' or 'Polygon') of an Esri Geometry,
+    which can be passed to e.g. :func:`from_vertex_arrays`.
+
+    :param geometry:    An Esri Geometry, an EsriJSON string or an EsriJSON dictionary.
+    :rtype:             str
+    :raises ValueError: If the input is not an Esri Geometry or EsriJSON.
+    """
+    return _shape_type(_get_json(geometry))
+
+
+def simplify_rows(rows: _tp.Iterable[_tp.Sequence], tolerance: float, method: str = SIMPLIFY_DOUGLAS_PEUCKER,
+                  preserve_topology: bool = False, shape_index: int = 0, batch_size: int = 1000) -> _tp.Generator:
+    """
+    Generator that simplifies the (polyline or polygon) geometries in a stream of rows, e.g. from a ``SearchCursor``,
+    and yields each row as a list in which the geometry has been replaced by its simplified version.
+    This allows for a streaming simplification between a ``SearchCursor`` and an ``InsertCursor``, without writing
+    intermediate datasets to disk. Rows are processed in batches of *batch_size* rows, so that each batch
+    is simplified in a few NumPy operations. See :func:`simplify_arrays` for the other parameters.
+
+    Geometries that do not change, ``None`` values, points and multipoints are passed through as-is.
+    Note that topology is only preserved within a batch: if shared boundaries must be preserved for a complete
+    dataset, the batch size should cover that dataset (or a partition of it, e.g. by OID range or tile).
+
+    Example:
+
+        >>> with SearchCursor(src_fc, ('SHAPE@', 'NAME')) as rows, InsertCursor(dst_fc, ('SHAPE@', 'NAME')) as out:
+        >>>     for row in simplify_rows(rows, 2.5):
+        >>>         out.insertRow(row)
+
+    :param rows:                An iterable of rows (sequences) that contain an Esri Geometry or EsriJSON.
+    :param tolerance:           The simplification tolerance.
+    :param method:              The simplification method (default = :attr:`SIMPLIFY_DOUGLAS_PEUCKER`).
+    :param preserve_topology:   If ``True`` (default = ``False``), shared boundaries are simplified identically.
+    :param shape_index:         The index of the geometry in each row (default = 0).
+    :param batch_size:          The number of rows that are simplified at once (default = 1000).
+    :raises GeometryError:      If a simplified geometry could not be created.
+    """
+    for batch in _iter.chunked(rows, batch_size):
+        batch = [list(row) for row in batch]
+        data = [None if row[shape_index] is None else _get_json(row[shape_index]) for row in batch]
+        coords, geometry_offsets, part_offsets, ring_offsets = get_vertex_arrays(data)
+        simplified, _, _, new_offsets = simplify_arrays(coords, geometry_offsets, part_offsets, ring_offsets,
+                                                        tolerance, method, preserve_topology)
+
+        ring_bounds = part_offsets[geometry_offsets]
+        for g, row in enumerate(batch):
+            geometry = data[g]
+            first, last = ring_bounds[g], ring_bounds[g + 1]
+            if geometry is not None and first < last and _shape_type(geometry) in (_SHAPE_POLYLINE, _SHAPE_POLYGON):
+                offsets = new_offsets[first:last + 1]
+                if offsets[-1] - offsets[0] < ring_offsets[last] - ring_offsets[first]:
+                    row[shape_index] = _as_shape(_shape_type(geometry), simplified, offsets,
+                                                 geometry.get('spatialReference'),
+                                                 bool(geometry.get('hasZ')))
+            yield row
@@ -0,0 +1,333 @@
+# coding: utf-8
+#
+# Copyright 2019 Geocom Informatik AG / VertiGIS
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+The *geomkernel* module contains vectorized functions that compute common geometric measures
+(length, area, extent, centroid, point-in-polygon and segment intersection) directly on coordinate arrays,
+without calling any ``arcpy`` geometry method.
+
+All functions work on the array layout returned by :func:`gpf.tools.geometry.get_vertex_array` and
+:func:`gpf.tools.geometry.get_vertex_arrays`: an (N, 2) or (N, 3) coordinate array and a *ring_offsets* array,
+where the vertices of ring (or path) *r* are ``coords[ring_offsets[r]:ring_offsets[r + 1]]``.
+By default, the measures are returned per ring. If *group_offsets* are given, the ring measures are combined
+per group of rings instead, where group *g* consists of the rings ``group_offsets[g]:group_offsets[g + 1]``.
+Use :func:`geometry_rings` to obtain the group offsets for each geometry in a batch.
+
+Example:
+
+    >>> coords, geometry_offsets, part_offsets, ring_offsets = get_vertex_arrays(polygons)
+    >>> areas(coords, ring_offsets, geometry_rings(geometry_offsets, part_offsets))
+    array([ 12.5,  4. , 100. ])
+
+.. note::   The measures are *planar* (2D Cartesian) and therefore only comparable to the ``arcpy`` measures
+            of geometries in a projected coordinate system (e.g. ``length``, ``area``, ``extent`` and
+            ``trueCentroid``). For such geometries, the results match the ``arcpy`` measures within
+            :attr:`TOLERANCE` (relative), as long as the geometries do not contain curve segments.
+            Note that ``arcpy`` snaps all coordinates to the XY resolution of the spatial reference,
+            so any differences are typically far below that resolution.
+"""
+
+import typing as _tp
+
+import numpy as _np
+
+import gpf.common.validate as _vld
+
+#: Relative tolerance within which the planar measures of this module match the ``arcpy`` measures.
+TOLERANCE = 1e-9
+
+# Maximum number of (point, edge) combinations that are evaluated at once in the point-in-polygon test
+_PIP_CHUNK = 2 ** 22
+
+_ArrayLike = _tp.Union[_np.ndarray, _tp.Sequence]
+
+
+def geometry_rings(geometry_offsets: _ArrayLike, part_offsets: _ArrayLike) -> _np.ndarray:
+    """
+    Returns the ring offsets for each geometry, i.e. the *group_offsets* that should be used to obtain the measures
+    per geometry from the output of :func:`gpf.tools.geometry.get_vertex_arrays`.
+
+    :param geometry_offsets:    The geometry offsets (start index of each geometry in *part_offsets*).
+    :param part_offsets:        The part offsets (start index of each part in *ring_offsets*).
+    :rtype:                     numpy.ndarray
+    """
+    return _np.asarray(part_offsets, dtype=_np.int64)[_np.asarray(geometry_offsets, dtype=_np.int64)]
+
+
+def _reduce(ufunc: _np.ufunc, values: _np.ndarray, offsets: _ArrayLike, empty: float = 0.) -> _np.ndarray:
+    """
+    Reduces the *values* for each range ``offsets[i]:offsets[i + 1]`` using the given NumPy *ufunc*.
+    Empty ranges are set to *empty*.
+    """
+    offsets = _np.asarray(offsets, dtype=_np.int64)
+    starts, ends = offsets[:-1], offsets[1:]
+    out = _np.full((len(starts),) + values.shape[1:], empty, dtype=_np.float64)
+    mask = starts < ends
+    if mask.any():
+        # Reduce (start, end) pairs and keep every other result, so that the ranges may be non-contiguous
+        padded = _np.concatenate((values, _np.zeros((1,) + values.shape[1:], dtype=values.dtype)))
+        out[mask] = ufunc.reduceat(padded, _np.column_stack((starts[mask], ends[mask])).ravel())[::2]
+    return out
+
+
+def _group(values: _np.ndarray, group_offsets: _tp.Optional[_ArrayLike]) -> _np.ndarray:
+    """ Sums the ring *values* per group, or returns them as-is if *group_offsets* is ``None``. """
+    return values if group_offsets is None else _reduce(_np.add, values, group_offsets)
+
+
+def _prepare(coords: _ArrayLike, ring_offsets: _ArrayLike) -> _tp.Tuple[_np.ndarray, _np.ndarray]:
+    """ Validates and returns the coordinate array and ring offsets as NumPy arrays. """
+    coords = _np.asarray(coords, dtype=_np.float64)
+    ring_offsets = _np.asarray(ring_offsets, dtype=_np.int64)
+    _vld.pass_if(coords.ndim == 2 and coords.shape[1] in (2, 3), ValueError, 'Coordinates must be 2D or 3D')
+    _vld.pass_if(len(ring_offsets) and ring_offsets[0] == 0 and ring_offsets[-1] == len(coords) and
+                 (_np.diff(ring_offsets) >= 0).all(), ValueError, 'Invalid ring offsets')
+    return coords, ring_offsets
+
+
+def _ring_ids(ring_offsets: _np.ndarray) -> _np.ndarray:
+    """ Returns the ring index of each vertex. """
+    return _np.repeat(_np.arange(len(ring_offsets) - 1), _np.diff(ring_offsets))
+
+
+def _next_vertex(ring_offsets: _np.ndarray) -> _np.ndarray:
+    """
+    Returns the index of the next vertex for each vertex, where the last vertex of a ring is connected to the first one.
+    For closed rings, this results in a zero-length closing segment.
+    """
+    index = _np.arange(1, ring_offsets[-1] + 1)
+    nonempty = ring_offsets[:-1] < ring_offsets[1:]
+    index[ring_offsets[1:][nonempty] - 1] = ring_offsets[:-1][nonempty]
+    return index
+
+
+def _path_deltas(coords: _np.ndarray, ring_offsets: _np.ndarray) -> _np.ndarray:
+    """ Returns the segment vectors of each vertex to the next vertex in the same path (0 for the last vertex). """
+    deltas = _np.zeros_like(coords)
+    deltas[:-1] = coords[1:] - coords[:-1]
+    deltas[ring_offsets[1:][ring_offsets[1:] > 0] - 1] = 0.
+    return deltas
+
+
+def _area_terms(coords: _np.ndarray, ring_offsets: _np.ndarray) -> _tp.Tuple[_np.ndarray, _np.ndarray, _np.ndarray]:
+    """
+    Returns the shoelace cross products for each (closing) ring segment, the segment coordinate sums and
+    the ring origins. The coordinates are shifted to the first vertex of each ring to avoid loss of precision.
+    """
+    starts = ring_offsets[:-1]
+    origins = coords[_np.minimum(starts, max(len(coords) - 1, 0)), :2] if len(coords) else _np.zeros((len(starts), 2))
+    local = coords[:, :2] - origins[_ring_ids(ring_offsets)]
+    nxt = local[_next_vertex(ring_offsets)]
+    cross = local[:, 0] * nxt[:, 1] - nxt[:, 0] * local[:, 1]
+    return cross, local + nxt, origins
+
+
+def lengths(coords: _ArrayLike, ring_offsets: _ArrayLike, group_offsets: _tp.Optional[_ArrayLike] = None,
+            use_z: bool = False) -> _np.ndarray:
+    """
+    Returns the planar length of each path (or ring), or the total length per group if *group_offsets* are given.
+    For polygons, this equals the perimeter (``length`` in ``arcpy``), provided that the rings are closed.
+
+    :param coords:          An (N, 2) or (N, 3) coordinate array.
+    :param ring_offsets:    The start index of each ring (or path) in *coords*, followed by N.
+    :param group_offsets:   Optional start index of each group in the rings, followed by the number of rings.
+    :param use_z:           If ``True`` (default = ``False``), the 3D length is returned (``length3D`` in ``arcpy``).
+                            Missing Z values are treated as 0.
+    :rtype:                 numpy.ndarray
+    :raises ValueError:     If the coordinates or ring offsets are invalid.
+    """
+    coords, ring_offsets = _prepare(coords, ring_offsets)
+    dims = 3 if use_z and coords.shape[1] == 3 else 2
+    deltas = _np.nan_to_num(_path_deltas(coords[:, :dims], ring_offsets))
+    segments = _np.sqrt((deltas ** 2).sum(axis=1))
+    return _group(_reduce(_np.add, segments, ring_offsets), group_offsets)
+
+
+def areas(coords: _ArrayLike, ring_offsets: _ArrayLike, group_offsets: _tp.Optional[_ArrayLike] = None) -> _np.ndarray:
+    """
+    Returns the signed planar area of each ring, or the area per group (e.g. polygon) if *group_offsets* are given.
+
+    Following the Esri convention, exterior (clockwise) rings have a positive area and interior (counter-clockwise)
+    rings have a negative area, so that the area of a polygon is the sum of the areas of its rings.
+    Rings do not have to be closed explicitly.
+
+    :param coords:          An (N, 2) or (N, 3) coordinate array.
+    :param ring_offsets:    The start index of each ring in *coords*, followed by N.
+    :param group_offsets:   Optional start index of each group in the rings, followed by the number of rings.
+    :rtype:                 numpy.ndarray
+    :raises ValueError:     If the coordinates or ring offsets are invalid.
+    """
+    coords, ring_offsets = _prepare(coords, ring_offsets)
+    cross = _area_terms(coords, ring_offsets)[0]
+    return _group(_reduce(_np.add, cross, ring_offsets) / -2., group_offsets)
+
+
+def extents(coords: _ArrayLike, ring_offsets: _ArrayLike,
+            group_offsets: _tp.Optional[_ArrayLike] = None) -> _np.ndarray:
+    """
+    Returns the bounding box of each ring, or of each group if *group_offsets* are given,
+    as an (M, 4) array of (XMin, YMin, XMax, YMax) rows. Empty rings or groups have a ``NaN`` extent.
+
+    :param coords:          An (N, 2) or (N, 3) coordinate array.
+    :param ring_offsets:    The start index of each ring (or path) in *coords*, followed by N.
+    :param group_offsets:   Optional start index of each group in the rings, followed by the number of rings.
+    :rtype:                 numpy.ndarray
+    :raises ValueError:     If the coordinates or ring offsets are invalid.
+    """
+    coords, ring_offsets = _prepare(coords, ring_offsets)
+    if group_offsets is not None:
+        # Vertex offsets per group (rings are contiguous, so this is a simple lookup)
+        ring_offsets = ring_offsets[_np.asarray(group_offsets, dtype=_np.int64)]
+    xy = coords[:, :2]
+    return _np.hstack((_reduce(_np.minimum, xy, ring_offsets, _np.nan),
+                       _reduce(_np.maximum, xy, ring_offsets, _np.nan)))
+
+
+def centroids(coords: _ArrayLike, ring_offsets: _ArrayLike, group_offsets: _tp.Optional[_ArrayLike] = None,
+              polygon: bool = True) -> _np.ndarray:
+    """
+    Returns the center of gravity (``trueCentroid`` in ``arcpy``) of each ring, or of each group if
+    *group_offsets* are given, as an (M, 2) array. Empty rings or groups have a ``NaN`` centroid.
+
+    If *polygon* is ``True`` (default), the area-weighted centroid is returned, where holes (negative rings) are
+    subtracted. Otherwise (or if the area is 0), the length-weighted centroid of the segments is returned, which is
+    what ``arcpy`` returns for polylines. If the length is 0 as well (e.g. for points), the mean of
+    the vertices is returned. Note that the points of a multipoint must be passed as separate rings
+    (i.e. ``numpy.arange(len(coords) + 1)`` as *ring_offsets*) to obtain their mean.
+
+    :param coords:          An (N, 2) or (N, 3) coordinate array.
+    :param ring_offsets:    The start index of each ring (or path) in *coords*, followed by N.
+    :param group_offsets:   Optional start index of each group in the rings, followed by the number of rings.
+    :param polygon:         Set to ``False`` if the rings are paths (i.e. polyline parts).
+    :rtype:                 numpy.ndarray
+    :raises ValueError:     If the coordinates or ring offsets are invalid.
+    """
+    coords, ring_offsets = _prepare(coords, ring_offsets)
+    xy = coords[:, :2]
+
+    # Vertex mean (fallback)
+    counts = _group(_np.diff(ring_offsets).astype(_np.float64), group_offsets)
+    with _np.errstate(invalid='ignore', divide='ignore'):
+        result = _group(_reduce(_np.add, xy, ring_offsets), group_offsets) / counts[:, None]
+
+    # Length-weighted segment midpoints
+    deltas = _path_deltas(xy, ring_offsets)
+    seg_lengths = _np.sqrt((deltas ** 2).sum(axis=1))
+    length = _group(_reduce(_np.add, seg_lengths, ring_offsets), group_offsets)
+    moments = _group(_reduce(_np.add, (xy + deltas / 2) * seg_lengths[:, None], ring_offsets), group_offsets)
+    mask = length > 0
+    result[mask] = moments[mask] / length[mask, None]
+
+    if polygon:
+        # Area-weighted centroid: ring moments are computed in local coordinates and shifted back to the origin
+        cross, sums, origins = _area_terms(coords, ring_offsets)
+        ring_areas = _reduce(_np.add, cross, ring_offsets) / 2.
+        ring_moments = _reduce(_np.add, sums * cross[:, None], ring_offsets) / 6. + origins * ring_areas[:, None]
+        area = _group(ring_areas, group_offsets)
+        moments = _group(ring_moments, group_offsets)
+        total = _group(_np.abs(ring_areas), group_offsets)
+        mask = _np.abs(area) > total * TOLERANCE
+        result[mask] = moments[mask] / area[mask, None]
+
+    return result
+
+
+def points_in_polygon(points: _ArrayLike, coords: _ArrayLike, ring_offsets: _ArrayLike) -> _np.ndarray:
+    """
+    Returns a boolean array that is ``True`` for each point that lies inside the polygon given by *coords* and
+    *ring_offsets* (e.g. from :func:`gpf.tools.geometry.get_vertex_array`).
+
+    The even-odd (crossing number) rule is used, so that points in holes are considered outside.
+    The result for points that lie exactly on the boundary is undefined.
+
+    :param points:          An (M, 2) array of XY coordinates (Z values are ignored).
+    :param coords:          An (N, 2) or (N, 3) coordinate array of the polygon rings.
+    :param ring_offsets:    The start index of each ring in *coords*, followed by N.
+    :rtype:                 numpy.ndarray
+    :raises ValueError:     If the coordinates or ring offsets are invalid.
+    """
+    coords, ring_offsets = _prepare(coords, ring_offsets)
+    points = _np.atleast_2d(_np.asarray(points, dtype=_np.float64))
+    _vld.pass_if(points.ndim == 2 and points.shape[1] >= 2, ValueError, 'Points must have at least 2 dimensions')
+
+    x1, y1 = coords[:, 0], coords[:, 1]
+    nxt = _next_vertex(ring_offsets)
+    x2, y2 = x1[nxt], y1[nxt]
+    edges = y1 != y2  # horizontal (and zero-length) edges are never crossed
+    x1, y1, x2, y2 = x1[edges], y1[edges], x2[edges], y2[edges]
+    slopes = (x2 - x1) / (y2 - y1)
+
+    result = _np.zeros(len(points), dtype=bool)
+    step = max(1, _PIP_CHUNK // max(len(x1), 1))
+    for i in range(0, len(points), step):
+        px, py = points[i:i + step, 0, None], points[i:i + step, 1, None]
+        straddles = (y1 > py) != (y2 > py)
+        crossings = straddles & (px < x1 + (py - y1) * slopes)
+        result[i:i + step] = (crossings.sum(axis=1) % 2).astype(bool)
+    return result
+
+
+def _cross(a: _np.ndarray, b: _np.ndarray) -> _np.ndarray:
+    """ Returns the 2D cross product of two (N, 2) vector arrays. """
+    return a[..., 0] * b[..., 1] - a[..., 1] * b[..., 0]
+
+
+def intersect_segments(p1: _ArrayLike, p2: _ArrayLike,
+                       q1: _ArrayLike, q2: _ArrayLike) -> _tp.Tuple[_np.ndarray, _np.ndarray]:
+    """
+    Tests pairwise if segments *p1-p2* intersect with segments *q1-q2*.
+    All inputs are (N, 2) arrays (or a single XY pair) and are broadcast against each other,
+    so that a single segment can be tested against many segments at once.
+
+    Returns a boolean array that is ``True`` where the segments intersect (touching end points included) and
+    an (N, 2) array with the intersection points. If the segments do not intersect or if they are collinear and
+    overlap (i.e. there is no single intersection point), the intersection point is ``NaN``.
+
+    Example:
+
+        >>> intersect_segments([0, 0], [2, 2], [[0, 2], [3, 3]], [[2, 0], [4, 4]])
+        (array([ True, False]), array([[ 1.,  1.], [nan, nan]]))
+
+    :param p1:  The start points of the first segments.
+    :param p2:  The end points of the first segments.
+    :param q1:  The start points of the second segments.
+    :param q2:  The end points of the second segments.
+    :rtype:     tuple
+    """
+    p1, p2, q1, q2 = _np.broadcast_arrays(*(_np.atleast_2d(_np.asarray(v, dtype=_np.float64))[..., :2]
+                                            for v in (p1, p2, q1, q2)))
+    r, s, qp = p2 - p1, q2 - q1, q1 - p1
+    denom = _cross(r, s)
+    qp_r = _cross(qp, r)
+    parallel = denom == 0
+
+    with _np.errstate(invalid='ignore', divide='ignore'):
+        t = _cross(qp, s) / denom
+        u = qp_r / denom
+        hits = ~parallel & (t >= 0) & (t <= 1) & (u >= 0) & (u <= 1)
+
+        # Collinear segments intersect if their projections on p1-p2 overlap.
+        # If p1-p2 is degenerate (a point), it must lie on q1-q2 instead.
+        rr, ss = (r ** 2).sum(axis=-1), (s ** 2).sum(axis=-1)
+        t0 = (qp * r).sum(axis=-1) / rr
+        t1 = t0 + (s * r).sum(axis=-1) / rr
+        tq = -(qp * s).sum(axis=-1) / ss
+        on_q = _np.where(ss > 0, (tq >= 0) & (tq <= 1) & (_cross(qp, s) == 0), (qp == 0).all(axis=-1))
+        overlaps = _np.where(rr > 0, (_np.maximum(t0, t1) >= 0) & (_np.minimum(t0, t1) <= 1), on_q)
+        collinear = parallel & (qp_r == 0) & overlaps
+
+    points = _np.where(hits[:, None], p1 + t[:, None] * r, _np.nan)
+    return hits | collinear, points
@@ -0,0 +1,321 @@
+# coding: utf-8
+#
+# Copyright 2019 Geocom Informatik AG / VertiGIS
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+The *projection* module contains transformers that reproject coordinate arrays (e.g. from
+:func:`gpf.tools.geometry.get_vertex_arrays`) between spatial references in batches.
+
+A transformer resolves the spatial references and the (datum) transformation only once, after which each batch of
+coordinates is projected in a single ArcPy call. Use :func:`get_transformer` to obtain a cached transformer:
+
+    >>> transformer = get_transformer(21781, 2056)
+    >>> coords, geometry_offsets, part_offsets, ring_offsets = get_vertex_arrays(shapes)
+    >>> coords = transformer.transform(coords)
+
+For transformations between the Swiss LV03 (CH1903) and LV95 (CH1903+) coordinate systems,
+the :class:`SwissTransformer` does not require ArcPy at all.
+"""
+
+import abc as _abc
+import typing as _tp
+
+import more_itertools as _iter
+import numpy as _np
+
+import gpf.common.textutils as _tu
+import gpf.common.validate as _vld
+import gpf.tools.geometry as _geo
+import gpf.tools.spatialindex as _si
+from gpf import arcpy as _arcpy
+
+#: WKID of the Swiss CH1903 LV03 coordinate system
+WKID_LV03 = 21781
+#: WKID of the Swiss CH1903+ LV95 coordinate system
+WKID_LV95 = 2056
+
+#: Transformation name that makes :func:`get_transformer` return a :class:`SwissTransformer` for LV03/LV95
+TRANSFORMATION_LV_OFFSET = 'LV03_To_LV95_Offset'
+
+# False easting and northing difference between LV95 and LV03
+_LV_OFFSET = _np.array([2000000., 1000000.])
+
+# Maximum number of vertices that are projected in a single ArcPy call
+_PROJECT_CHUNK = 100000
+
+# Cached transformers by (source, target, transformation) key
+_TRANSFORMERS = {}
+
+
+def _sr_key(spatial_reference: _tp.Union[str, int, _arcpy.SpatialReference]) -> _tp.Union[str, int]:
+    """ Returns a hashable key (WKID or string) for a SpatialReference, WKID or (name, WKT) string. """
+    _vld.pass_if(spatial_reference is not None, ValueError, 'A spatial reference is required')
+    if isinstance(spatial_reference, (int, str)):
+        return spatial_reference
+    return spatial_reference.factoryCode or spatial_reference.exportToString()
+
+
+class _BaseTransformer(_abc.ABC):
+    """ Base class for coordinate array transformers. """
+
+    __slots__ = ()
+
+    @_abc.abstractmethod
+    def transform(self, coords: _np.ndarray) -> _np.ndarray:
+        """
+        Returns a new (N, 2) or (N, 3) array with the transformed coordinates.
+        Rows with ``NaN`` X or Y values remain ``NaN``. Z values are not transformed.
+
+        :param coords:  An (N, 2) or (N, 3) coordinate array.
+        :rtype:         numpy.ndarray
+        """
+        pass
+
+    @property
+    @_abc.abstractmethod
+    def spatial_reference(self) -> _tp.Union[str, int, _arcpy.SpatialReference]:
+        """ Returns the spatial reference of the transformed coordinates. """
+        pass
+
+    def transform_rows(self, rows: _tp.Iterable[_tp.Sequence], shape_index: int = 0,
+                       batch_size: int = 1000) -> _tp.Generator:
+        """
+        Generator that transforms the geometries in a stream of rows (e.g. from a ``SearchCursor``),
+        and yields each row as a list in which the geometry has been replaced by the transformed geometry.
+        The vertices of each batch of *batch_size* rows are transformed at once.
+        All geometries must have the same shape type (as is the case for the rows of a feature class).
+
+        Example:
+
+            >>> transformer = get_transformer(21781, 2056)
+            >>> with SearchCursor(src_fc, ('SHAPE@', 'NAME')) as rows, InsertCursor(dst_fc, ('SHAPE@', 'NAME')) as out:
+            >>>     for row in transformer.transform_rows(rows):
+            >>>         out.insertRow(row)
+
+        :param rows:            An iterable of rows (sequences) that contain an Esri Geometry or EsriJSON.
+        :param shape_index:     The index of the geometry in each row (default = 0).
+        :param batch_size:      The number of rows that are transformed at once (default = 1000).
+        :raises GeometryError:  If a transformed geometry could not be created.
+        """
+        for batch in _iter.chunked(rows, batch_size):
+            batch = [list(row) for row in batch]
+            shapes = [row[shape_index] for row in batch]
+            shape_type = next((_geo.get_shape_type(s) for s in shapes if s is not None), None)
+            if shape_type is None:
+                yield from batch
+                continue
+            coords, geometry_offsets, part_offsets, ring_offsets = _geo.get_vertex_arrays(shapes)
+            results = _geo.from_vertex_arrays(self.transform(coords), geometry_offsets, part_offsets, ring_offsets,
+                                              shape_type, self.spatial_reference)
+            for row, shape in zip(batch, results):
+                row[shape_index] = shape
+                yield row
+
+
+class Transformer(_BaseTransformer):
+    """
+    Transformer(source, target, {transformation})
+
+    Projects coordinate arrays from one spatial reference to another using ArcPy.
+    The coordinates are projected in batches as a single ``Multipoint`` geometry,
+    so that only one ArcPy call is needed for each batch instead of one for each geometry.
+
+    Instead of creating a ``Transformer`` directly, consider using :func:`get_transformer`,
+    which returns a cached instance for each (source, target, transformation) combination.
+
+    **Params:**
+
+    -   **source** (str, int, arcpy.SpatialReference):
+
+        The spatial reference (or its WKID or string representation) of the input coordinates.
+
+    -   **target** (str, int, arcpy.SpatialReference):
+
+        The spatial reference (or its WKID or string representation) of the output coordinates.
+
+    -   **transformation** (str):
+
+        The name of the (geographic) datum transformation. If omitted, the first transformation that
+        ``arcpy.ListTransformations`` returns for the source and target is used (if any).
+
+    :raises ValueError:     If the spatial references or transformation cannot be resolved.
+    """
+
+    __slots__ = '_source', '_target', '_transformation'
+
+    def __init__(self, source: _tp.Union[str, int, _arcpy.SpatialReference],
+                 target: _tp.Union[str, int, _arcpy.SpatialReference], transformation: _tp.Union[str, None] = None):
+        _vld.pass_if(source is not None and target is not None, ValueError, 'A spatial reference is required')
+        try:
+            self._source = source if hasattr(source, 'factoryCode') else _arcpy.SpatialReference(source)
+            self._target = target if hasattr(target, 'factoryCode') else _arcpy.SpatialReference(target)
+            if transformation is None:
+                transformation = _iter.first(_arcpy.ListTransformations(self._source, self._target), None)
+        except Exception as e:
+            raise ValueError(f'Failed to resolve transformation from {_tu.to_repr(source)} '
+                             f'to {_tu.to_repr(target)}: {e}')
+        self._transformation = transformation
+
+    @property
+    def spatial_reference(self) -> _arcpy.SpatialReference:
+        """ Returns the target ``SpatialReference``. """
+        return self._target
+
+    @property
+    def transformation(self) -> _tp.Union[str, None]:
+        """ Returns the name of the datum transformation (or ``None`` if there is none). """
+        return self._transformation
+
+    def _project(self, coords: _np.ndarray) -> _np.ndarray:
+        """ Projects a chunk of coordinates (without NaN values) using a single ArcPy call. """
+        geometry = _arcpy.AsShape(_geo.get_esri_json(coords, [0, len(coords)], 'Multipoint', self._source), True)
+        if self._transformation:
+            geometry = geometry.projectAs(self._target, self._transformation)
+        else:
+            geometry = geometry.projectAs(self._target)
+        result, _, _ = _geo.get_vertex_array(geometry)
+        _vld.pass_if(result.shape == coords.shape, ValueError, 'Projected vertices do not match the input vertices')
+        return result
+
+    def transform(self, coords: _np.ndarray) -> _np.ndarray:
+        coords = _np.asarray(coords, dtype=_np.float64)
+        _vld.pass_if(coords.ndim == 2 and coords.shape[1] in (2, 3), ValueError, 'Coordinates must be 2D or 3D')
+        result = _np.full_like(coords, _np.nan)
+        valid = _np.flatnonzero(~_np.isnan(coords[:, :2]).any(axis=1))
+        for i in range(0, len(valid), _PROJECT_CHUNK):
+            chunk = valid[i:i + _PROJECT_CHUNK]
+            result[chunk] = self._project(coords[chunk])
+        return result
+
+    transform.__doc__ = _BaseTransformer.transform.__doc__
+
+
+class SwissTransformer(_BaseTransformer):
+    """
+    SwissTransformer({inverse}, {mesh})
+
+    Transforms coordinate arrays from the Swiss LV03 (CH1903) to the LV95 (CH1903+) coordinate system
+    (or the other way around) using NumPy only.
+
+    By default, the coordinates are shifted by the difference of the false eastings and northings
+    (2'000'000 m and 1'000'000 m). Because the LV03 reference frame contains local distortions,
+    this is accurate to about 1.6 m only. For the official FINELTRA transformation (with an accuracy of 1 cm
+    or better), pass the triangular CHENyx06 mesh of swisstopo as *mesh*: each vertex is then transformed
+    by the affine transformation of the triangle that contains it (i.e. using its barycentric coordinates).
+
+    **Params:**
+
+    -   **inverse** (bool):
+
+        If ``True``, the coordinates are transformed from LV95 to LV03. Defaults to ``False``.
+
+    -   **mesh** (tuple):
+
+        An optional (LV03 nodes, LV95 nodes, triangles) tuple, where the nodes are (M, 2) coordinate arrays
+        of the same mesh nodes in both reference frames, and the triangles are a (T, 3) array of node indices.
+        Vertices that lie outside of the mesh are set to ``NaN``.
+
+    :raises ValueError:     If the mesh arrays have a bad shape.
+    """
+
+    __slots__ = '_inverse', '_source', '_target', '_triangles', '_index'
+
+    def __init__(self, inverse: bool = False,
+                 mesh: _tp.Union[_tp.Tuple[_np.ndarray, _np.ndarray, _np.ndarray], None] = None):
+        self._inverse = inverse
+        self._source = self._target = self._triangles = self._index = None
+        if mesh is None:
+            return
+
+        lv03, lv95, triangles = (_np.asarray(a) for a in mesh)
+        _vld.pass_if(lv03.ndim == 2 and lv03.shape[1] == 2 and lv03.shape == lv95.shape, ValueError,
+                     'Mesh nodes must be (M, 2) arrays of equal length')
+        _vld.pass_if(triangles.ndim == 2 and triangles.shape[1] == 3, ValueError,
+                     'Mesh triangles must be a (T, 3) array')
+        self._source, self._target = (lv95, lv03) if inverse else (lv03, lv95)
+        self._source = self._source.astype(_np.float64)
+        self._target = self._target.astype(_np.float64)
+        self._triangles = triangles.astype(_np.int64)
+        corners = self._source[self._triangles]
+        self._index = _si.SpatialIndex.from_extents(_np.hstack((corners.min(axis=1), corners.max(axis=1))))
+
+    @property
+    def spatial_reference(self) -> int:
+        """ Returns the WKID of the target coordinate system. """
+        return WKID_LV03 if self._inverse else WKID_LV95
+
+    def _interpolate(self, points: _np.ndarray) -> _np.ndarray:
+        """ Transforms the given (N, 2) points using the barycentric coordinates in the containing mesh triangle. """
+        result = _np.full_like(points, _np.nan)
+        valid = _np.flatnonzero(~_np.isnan(points).any(axis=1))
+        pairs = self._index.join(_si.SpatialIndex.from_extents(_np.hstack((points[valid], points[valid])), valid))
+        triangles, ids = self._triangles[pairs[:, 0]], pairs[:, 1]
+
+        # Barycentric coordinates, relative to the first corner of each triangle to preserve precision
+        a = self._source[triangles[:, 0]]
+        ab, ac, ap = self._source[triangles[:, 1]] - a, self._source[triangles[:, 2]] - a, points[ids] - a
+        det = ab[:, 0] * ac[:, 1] - ab[:, 1] * ac[:, 0]
+        with _np.errstate(divide='ignore', invalid='ignore'):
+            v = (ap[:, 0] * ac[:, 1] - ap[:, 1] * ac[:, 0]) / det
+            w = (ab[:, 0] * ap[:, 1] - ab[:, 1] * ap[:, 0]) / det
+        weights = _np.column_stack((1. - v - w, v, w))
+
+        # Use the first triangle that contains each point (points on shared edges yield the same result)
+        inside = _np.flatnonzero((weights >= -1e-12).all(axis=1))
+        ids, first = _np.unique(ids[inside], return_index=True)
+        hits = inside[first]
+        result[ids] = _np.einsum('ij,ijk->ik', weights[hits], self._target[triangles[hits]])
+        return result
+
+    def transform(self, coords: _np.ndarray) -> _np.ndarray:
+        coords = _np.asarray(coords, dtype=_np.float64)
+        _vld.pass_if(coords.ndim == 2 and coords.shape[1] in (2, 3), ValueError, 'Coordinates must be 2D or 3D')
+        result = coords.copy()
+        if self._index is None:
+            result[:, :2] += -_LV_OFFSET if self._inverse else _LV_OFFSET
+        else:
+            result[:, :2] = self._interpolate(coords[:, :2])
+        return result
+
+    transform.__doc__ = _BaseTransformer.transform.__doc__
+
+
+def get_transformer(source: _tp.Union[str, int, _arcpy.SpatialReference],
+                    target: _tp.Union[str, int, _arcpy.SpatialReference],
+                    transformation: _tp.Union[str, None] = None) -> _tp.Union[Transformer, SwissTransformer]:
+    """
+    Returns a cached transformer for the given source and target spatial references and datum transformation,
+    so that these only have to be resolved once per session.
+
+    If the source and target are the Swiss LV03 and LV95 WKIDs (or the other way around) and the transformation
+    is :attr:`TRANSFORMATION_LV_OFFSET`, an offset-based :class:`SwissTransformer` is returned,
+    which does not use ArcPy. Otherwise, a :class:`Transformer` is returned.
+
+    :param source:          The spatial reference (or its WKID or string representation) of the input coordinates.
+    :param target:          The spatial reference (or its WKID or string representation) of the output coordinates.
+    :param transformation:  The optional name of the datum transformation (see :class:`Transformer`).
+    :raises ValueError:     If the spatial references or transformation cannot be resolved.
+    """
+    key = _sr_key(source), _sr_key(target), transformation
+    transformer = _TRANSFORMERS.get(key)
+    if transformer is None:
+        if transformation == TRANSFORMATION_LV_OFFSET:
+            _vld.pass_if(set(key[:2]) == {WKID_LV03, WKID_LV95}, ValueError,
+                         f'{TRANSFORMATION_LV_OFFSET} requires WKIDs {WKID_LV03} and {WKID_LV95}')
+            transformer = SwissTransformer(key[0] == WKID_LV95)
+        else:
+            transformer = Transformer(source, target, transformation)
+        _TRANSFORMERS[key] = transformer
+    return transformer
@@ -0,0 +1,319 @@
+# coding: utf-8
+#
+# Copyright 2019 Geocom Informatik AG / VertiGIS
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+The *spatialindex* module contains a static R-tree over feature extents (bounding boxes),
+which can be used as a fast prefilter for spatial overlay checks.
+"""
+
+import math as _math
+import typing as _tp
+
+import numpy as _np
+
+import gpf.common.const as _const
+import gpf.common.textutils as _tu
+import gpf.common.validate as _vld
+import gpf.cursors as _cursors
+import gpf.tools.queries as _q
+
+# Record type of the index rows: the bounding box (XMin, YMin, XMax, YMax) and a reference, which is the feature ID
+# for leaf entries and the row index of the first child for nodes
+_ROW_DTYPE = _np.dtype([('box', _np.float64, 4), ('ref', _np.int64)])
+
+# Maximum number of node pairs that are evaluated at once in a join
+_JOIN_CHUNK = 2 ** 20
+
+
+def _str_order(boxes: _np.ndarray, capacity: int) -> _np.ndarray:
+    """
+    Returns the Sort-Tile-Recursive order of the given (N, 4) boxes: the boxes are sorted by X center into
+    vertical slices, which are then sorted by Y center, so that each run of *capacity* boxes forms a compact node.
+    """
+    num_boxes = len(boxes)
+    num_slices = _math.ceil(_math.sqrt(_math.ceil(num_boxes / capacity)))
+    centers = boxes[:, :2] + boxes[:, 2:]
+    slice_ids = _np.empty(num_boxes, dtype=_np.int64)
+    slice_ids[_np.argsort(centers[:, 0], kind='stable')] = _np.arange(num_boxes) // (num_slices * capacity)
+    return _np.lexsort((centers[:, 1], slice_ids))
+
+
+def _intersects(boxes: _np.ndarray, other: _np.ndarray) -> _np.ndarray:
+    """ Returns a boolean array that is ``True`` where the boxes intersect (or touch) the other box(es). """
+    return (boxes[..., 0] <= other[..., 2]) & (other[..., 0] <= boxes[..., 2]) & \
+           (boxes[..., 1] <= other[..., 3]) & (other[..., 1] <= boxes[..., 3])
+
+
+def _get_box(*args) -> _np.ndarray:
+    """ Returns a (XMin, YMin, XMax, YMax) array for 4 values, an Esri ``Extent`` or an Esri ``Geometry``. """
+    if len(args) == 1:
+        extent = getattr(args[0], 'extent', args[0])
+        args = extent.XMin, extent.YMin, extent.XMax, extent.YMax
+    _vld.pass_if(len(args) == 4, ValueError, 'Expected 4 coordinates (XMin, YMin, XMax, YMax) or an Extent')
+    return _np.array(args, dtype=_np.float64)
+
+
+class SpatialIndex(object):
+    """
+    SpatialIndex(fc_path, {where_clause}, {node_capacity})
+
+    Creates a static R-tree over the extents (bounding boxes) of the features in a feature class.
+    The tree is bulk-loaded using the Sort-Tile-Recursive (STR) algorithm and stored in a single NumPy record array,
+    so that queries are evaluated level by level for all candidate nodes at once.
+
+    The index is meant to be used as a prefilter: the queries return the IDs of all features of which the extent
+    intersects (or touches) the query extent, after which exact geometry tests are only needed for these candidates.
+
+    Example:
+
+        >>> parcels = SpatialIndex('C:/Temp/test.gdb/parcels')
+        >>> parcels.query(2600000, 1200000, 2600100, 1200100)
+        array([12, 57, 58])
+        >>> # candidate (parcel ID, building ID) pairs of which the extents intersect
+        >>> pairs = parcels.join(SpatialIndex('C:/Temp/test.gdb/buildings'))
+        >>> # persist the index and load it (memory-mapped) in another process
+        >>> parcels.save('C:/Temp/parcels.npy')
+        >>> parcels = SpatialIndex.load('C:/Temp/parcels.npy')
+
+    **Params:**
+
+    -   **fc_path** (str, unicode):
+
+        The full path to the feature class. The index is built from a single ``SearchCursor`` pass
+        over the Object IDs and shapes. Features without a geometry are skipped.
+
+    -   **where_clause** (str, unicode, :class:`gpf.tools.queries.Where`):
+
+        An optional where clause to filter the feature class.
+
+    -   **node_capacity** (int):
+
+        The maximum number of children per node (default = 16).
+
+    :raises RuntimeError:       When the index cannot be created or populated.
+    """
+
+    __slots__ = '_rows', '_ends', '_height', '_num_entries', '_fanout'
+
+    def __init__(self, fc_path: str, where_clause: _tp.Union[None, str, _q.Where] = None, node_capacity: int = 16):
+        try:
+            ids, boxes = [], []
+            with _cursors.SearchCursor(fc_path, (_const.FIELD_OID, _const.FIELD_SHAPE), where_clause) as rows:
+                for oid, shape in rows:
+                    if shape is None:
+                        continue
+                    extent = shape.extent
+                    ids.append(oid)
+                    boxes.append((extent.XMin, extent.YMin, extent.XMax, extent.YMax))
+        except Exception as e:
+            raise RuntimeError(f'Failed to create {self.__class__.__name__} for {_tu.to_repr(fc_path)}: {e}')
+
+        self._build(_np.array(boxes, dtype=_np.float64).reshape(-1, 4), _np.array(ids, dtype=_np.int64), node_capacity)
+
+    @classmethod
+    def from_extents(cls, extents: _tp.Union[_np.ndarray, _tp.Sequence],
+                     ids: _tp.Union[None, _np.ndarray, _tp.Sequence] = None,
+                     node_capacity: int = 16) -> 'SpatialIndex':
+        """
+        Creates a ``SpatialIndex`` from an (N, 4) array (or sequence) of (XMin, YMin, XMax, YMax) extents,
+        e.g. the output of :func:`gpf.tools.geomkernel.extents`.
+
+        :param extents:         The feature extents.
+        :param ids:             The (integer) ID of each feature. If omitted, the extent index is used as ID.
+        :param node_capacity:   The maximum number of children per node (default = 16).
+        :raises ValueError:     If the extents have a bad shape or if the number of IDs does not match.
+        """
+        extents = _np.asarray(extents, dtype=_np.float64)
+        _vld.pass_if(extents.ndim == 2 and extents.shape[1] == 4, ValueError, 'Extents must be an (N, 4) array')
+        ids = _np.arange(len(extents)) if ids is None else _np.asarray(ids, dtype=_np.int64)
+        _vld.pass_if(len(ids) == len(extents), ValueError, 'The number of IDs must match the number of extents')
+        instance = cls.__new__(cls)
+        instance._build(extents, ids, node_capacity)
+        return instance
+
+    def _build(self, boxes: _np.ndarray, ids: _np.ndarray, capacity: int):
+        """ Packs the boxes into an STR tree and lays out all levels (leaf entries first) in a single record array. """
+        _vld.pass_if(capacity >= 2, ValueError, 'The node capacity must be at least 2')
+        _vld.pass_if(not _np.isnan(boxes).any(), ValueError, 'Extents must not contain NaN values')
+
+        # Pack the tree bottom-up: the children of node k of a level are orders[level][k * capacity:][:capacity]
+        orders, levels = [], [boxes]
+        while len(levels[-1]) > 1 or (len(levels) == 1 and len(boxes)):
+            child_boxes = levels[-1]
+            order = _str_order(child_boxes, capacity)
+            starts = _np.arange(0, len(order), capacity)
+            packed = child_boxes[order]
+            orders.append(order)
+            levels.append(_np.hstack((_np.minimum.reduceat(packed[:, :2], starts),
+                                      _np.maximum.reduceat(packed[:, 2:], starts))))
+
+        # Lay out the levels top-down, so that the children of each node are stored contiguously
+        layouts = [_np.arange(len(levels[-1]))]
+        child_starts = []
+        for order in reversed(orders):
+            parents = layouts[-1]
+            counts = _np.minimum(capacity, len(order) - parents * capacity)
+            offsets = _np.cumsum(counts) - counts
+            positions = _np.repeat(parents * capacity - offsets, counts) + _np.arange(counts.sum())
+            layouts.append(order[positions])
+            child_starts.append(offsets)
+
+        # Rows: leaf entries first, followed by the node levels (bottom-up), so that the root is the last row
+        layouts.reverse()
+        child_starts.reverse()
+        level_offsets = _np.cumsum([0] + [len(layout) for layout in layouts])
+        rows = _np.empty(level_offsets[-1], dtype=_ROW_DTYPE)
+        for level, layout in enumerate(layouts):
+            section = rows[level_offsets[level]:level_offsets[level + 1]]
+            section['box'] = levels[level][layout]
+            section['ref'] = ids[layout] if level == 0 else child_starts[level - 1] + level_offsets[level - 1]
+        self._init(rows)
+
+    def _init(self, rows: _np.ndarray):
+        """ Derives the tree height and the end of the child range of each node from the index rows. """
+        refs = rows['ref']
+        ends = _np.zeros(len(rows), dtype=_np.int64)
+        height, level_start, level_end = 0, len(rows) - 1, len(rows)
+        while level_start > 0:
+            # The first node of a level refers to the start of the level below, which ends where this level starts
+            ends[level_start:level_end - 1] = refs[level_start + 1:level_end]
+            ends[level_end - 1] = level_start
+            level_start, level_end = int(refs[level_start]), level_start
+            height += 1
+
+        self._rows = rows
+        self._ends = ends
+        self._height = height
+        self._num_entries = level_end if height else 0
+        self._fanout = int((ends - refs)[self._num_entries:].max()) if height else 0
+
+    def __len__(self):
+        return self._num_entries
+
+    @property
+    def extent(self) -> _tp.Tuple[float, float, float, float]:
+        """ Returns the (XMin, YMin, XMax, YMax) extent of all features in the index, or ``None`` if it is empty. """
+        return tuple(self._rows['box'][-1].tolist()) if self._num_entries else None
+
+    def _children(self, nodes: _np.ndarray) -> _np.ndarray:
+        """ Returns the row indices of all children of the given node rows. """
+        starts = self._rows['ref'][nodes]
+        counts = self._ends[nodes] - starts
+        offsets = _np.cumsum(counts) - counts
+        return _np.repeat(starts - offsets, counts) + _np.arange(counts.sum())
+
+    def query(self, *args) -> _np.ndarray:
+        """
+        query(xmin, ymin, xmax, ymax)
+        query(extent)
+
+        Returns the IDs of all features of which the extent intersects (or touches) the given query window.
+
+        :param args:        The window as (XMin, YMin, XMax, YMax) values, an Esri ``Extent`` or an Esri ``Geometry``
+                            (of which the extent is used).
+        :rtype:             numpy.ndarray
+        :raises ValueError: If the query window is invalid.
+        """
+        window = _get_box(*args)
+        if not self._num_entries:
+            return _np.zeros(0, dtype=_np.int64)
+        boxes = self._rows['box']
+        rows = _np.array([len(self._rows) - 1])
+        for _ in range(self._height):
+            rows = self._children(rows[_intersects(boxes[rows], window)])
+        return self._rows['ref'][rows[_intersects(boxes[rows], window)]]
+
+    def _expand(self, rows: _np.ndarray, other: 'SpatialIndex', other_rows: _np.ndarray,
+                expand_self: bool, expand_other: bool) -> _tp.Tuple[_np.ndarray, _np.ndarray]:
+        """ Replaces each pair of rows by all pairs of their children (for the side(s) that should be expanded). """
+        def _ranges(index, nodes, expand):
+            if not expand:
+                return nodes, _np.ones(len(nodes), dtype=_np.int64)
+            starts = index._rows['ref'][nodes]
+            return starts, index._ends[nodes] - starts
+
+        starts, counts = _ranges(self, rows, expand_self)
+        other_starts, other_counts = _ranges(other, other_rows, expand_other)
+        sizes = counts * other_counts
+        pairs = _np.repeat(_np.arange(len(rows)), sizes)
+        local = _np.arange(sizes.sum()) - _np.repeat(_np.cumsum(sizes) - sizes, sizes)
+        return starts[pairs] + local // other_counts[pairs], other_starts[pairs] + local % other_counts[pairs]
+
+    def join(self, other: 'SpatialIndex') -> _np.ndarray:
+        """
+        Returns all candidate pairs of features of which the extents intersect (or touch), as an (N, 2) array
+        of (ID in this index, ID in the *other* index) rows. Both trees are traversed simultaneously,
+        so that only node pairs of which the extents intersect are visited.
+
+        To find the candidate pairs within a single index, the index can be joined with itself.
+        In that case, the output includes the (ID, ID) pairs, as well as both (ID1, ID2) and (ID2, ID1).
+
+        :param other:   Another ``SpatialIndex`` instance (or the same one).
+        :rtype:         numpy.ndarray
+        """
+        _vld.pass_if(isinstance(other, SpatialIndex), ValueError, f'Can only join with a {SpatialIndex.__name__}')
+        if not (self._num_entries and other._num_entries):
+            return _np.zeros((0, 2), dtype=_np.int64)
+
+        boxes, other_boxes = self._rows['box'], other._rows['box']
+        stack = [(_np.array([len(self._rows) - 1]), _np.array([len(other._rows) - 1]), self._height, other._height)]
+        pairs = []
+        while stack:
+            rows, other_rows, height, other_height = stack.pop()
+            hits = _intersects(boxes[rows], other_boxes[other_rows])
+            rows, other_rows = rows[hits], other_rows[hits]
+            if not (height or other_height):
+                pairs.append(_np.column_stack((self._rows['ref'][rows], other._rows['ref'][other_rows])))
+                continue
+            # Descend one tree at a time (the highest one first), so that the children of one side are filtered
+            # before they are combined with the children of the other side. Large batches are split
+            # (and processed depth-first) to limit the number of node pairs that are evaluated at once.
+            expand_self = height >= other_height
+            expand_other = not expand_self
+            fanout = self._fanout if expand_self else other._fanout
+            step = max(1, _JOIN_CHUNK // fanout)
+            if len(rows) > step:
+                stack.extend((rows[i:i + step], other_rows[i:i + step], height, other_height)
+                             for i in reversed(range(0, len(rows), step)))
+                continue
+            stack.append(self._expand(rows, other, other_rows, expand_self, expand_other) +
+                         (height - expand_self, other_height - expand_other))
+        return _np.vstack(pairs)
+
+    def save(self, path: str):
+        """
+        Saves the index to a NumPy ``.npy`` file, which can be memory-mapped using :func:`load`.
+
+        :param path:    The output file path.
+        """
+        _np.save(path, self._rows, allow_pickle=False)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> 'SpatialIndex':
+        """
+        Loads an index that was saved using :func:`save`.
+
+        :param path:    The path to the ``.npy`` file.
+        :param mmap:    If ``True`` (default), the file is memory-mapped (read-only), so that the index is not read
+                        into memory entirely and can be shared between processes.
+        :raises ValueError: If the file does not contain a spatial index.
+        """
+        rows = _np.load(path, mmap_mode='r' if mmap else None, allow_pickle=False)
+        _vld.pass_if(rows.dtype == _ROW_DTYPE and rows.ndim == 1, ValueError,
+                     f'{_tu.to_repr(path)} does not contain a {cls.__name__}')
+        instance = cls.__new__(cls)
+        instance._init(rows)
+        return instance
@@ -14,7 +14,17 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from gpf.lookups import get_nodekey
+import ast
+import os
+import pickle
+import re
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import gpf.cursors as _cursors
+from gpf.lookups import *
 
 
 def test_coord_key():
@@ -22,3 +32,568 @@ def test_coord_key():
     assert get_nodekey(*coord) == (42451, 232454)
     assert get_nodekey(53546343.334242254, 23542233.354352246) == (535463433342, 235422333543)
     assert get_nodekey(1, 2, 3) == (10000, 20000, 30000)
+
+
+def test_coord_keys():
+    coords = [(4.2452, 23.24541), (53546343.334242254, 23542233.354352246), (-1.00005, 2)]
+    keys = get_nodekeys(coords)
+    assert keys.dtype == np.int64
+    assert [tuple(k) for k in keys.tolist()] == [get_nodekey(*c) for c in coords]
+    assert get_nodekeys([(1, 2, 3)]).tolist() == [[10000, 20000, 30000]]
+    assert get_nodekeys([(1, 2, np.nan)]).shape == (1, 2)
+    np.testing.assert_allclose(get_coordtuples(get_nodekeys([(1, 2)])), [(1, 2)])
+    with pytest.raises(ValueError):
+        get_nodekeys([1, 2])
+    with pytest.raises(ValueError):
+        get_nodekeys([(1, 2, 3), (1, 2, np.nan)])
+
+
+def test_pack_keys():
+    keys = np.array([(5, -3), (-7, 2), (5, -4), (-7, 2)], dtype=np.int64)
+    packed = pack_nodekeys(keys)
+    assert unpack_nodekeys(packed).tolist() == keys.tolist()
+    # Packed keys sort in the same (X, Y) order as the node keys
+    assert unpack_nodekeys(np.unique(packed)).tolist() == [[-7, 2], [5, -4], [5, -3]]
+    origin = get_nodekey(2660000, 1185000)
+    lv95_keys = get_nodekeys([(2485000, 1075000), (2834000, 1296000)])
+    assert unpack_nodekeys(pack_nodekeys(lv95_keys, origin), origin).tolist() == lv95_keys.tolist()
+    with pytest.raises(ValueError):
+        pack_nodekeys(lv95_keys)
+    with pytest.raises(ValueError):
+        pack_nodekeys(np.array([(1, 2, 3)]))
+
+
+def test_fingerprint():
+    square = {'rings': [[[0, 0], [0, 10], [10, 10], [10, 0], [0, 0]]]}
+    rotated = {'rings': [[[10, 10], [10, 0], [0, 0], [0, 10], [10, 10]]]}
+    noisy = {'rings': [[[0.00001, 0], [0, 10], [10, 10], [10, 0], [0.00001, 0]]]}
+    assert get_fingerprint(square) == get_fingerprint(noisy)
+    assert get_fingerprint(square) != get_fingerprint(rotated)
+    assert get_fingerprint(square, rotation_invariant=True) == get_fingerprint(rotated, rotation_invariant=True)
+    assert 0 <= get_fingerprint(square) < 2 ** 64
+    assert get_fingerprint(square, 128) >> 64 == get_fingerprint(square)
+    assert get_fingerprint(None) is None
+    with pytest.raises(ValueError):
+        get_fingerprint(square, 32)
+
+
+def test_fingerprints():
+    shapes = [
+        {'paths': [[[1, 2], [3, 4]], [[5, 6], [7, 8]]]},
+        {'paths': [[[1, 2], [3, 4], [5, 6], [7, 8]]]},
+        {'paths': [[[1, 2], [3, 4]], [[7, 8], [5, 6]]]},
+        {'x': 1, 'y': 2, 'z': 3},
+        {'x': 1, 'y': 2},
+        None
+    ]
+    fingerprints = get_fingerprints(shapes)
+    assert fingerprints.dtype == np.uint64
+    # Same vertices with a different part structure or vertex order must not collide
+    assert len(set(fingerprints[:3].tolist())) == 3
+    assert fingerprints[3] != fingerprints[4]
+    # Fingerprints do not depend on the other geometries in the batch (e.g. on the presence of Z values)
+    assert fingerprints.tolist() == [get_fingerprints([s])[0] for s in shapes]
+    assert get_fingerprints(shapes, 128).shape == (6, 2)
+    assert get_fingerprints([]).shape == (0, )
+
+
+def test_nodearray():
+    a = NodeArray.from_keys([(3, 1), (1, 2), (3, 1), (-1, 5)])
+    b = NodeArray.from_keys([(1, 2), (7, 7)])
+    assert len(a) == 3
+    assert a.keys.tolist() == [[-1, 5], [1, 2], [3, 1]]
+    assert set(a) == {(3, 1), (1, 2), (-1, 5)}
+    assert (a | b).keys.tolist() == [[-1, 5], [1, 2], [3, 1], [7, 7]]
+    assert (a & b).keys.tolist() == [[1, 2]]
+    assert (a - b).keys.tolist() == [[-1, 5], [3, 1]]
+    assert a.contains_many([(1, 2), (7, 7), (3, 1)]).tolist() == [True, False, True]
+    assert (1, 2) in a and (7, 7) not in a and (1, 2, 3) not in a
+    assert NodeArray.from_coords([(0.0001, 0.0002), (0.00011, 0.00021)]) == NodeArray.from_keys([(1, 2)])
+
+
+def test_nodearray_3d():
+    a = NodeArray.from_keys([(1, 2, 3), (1, 2, 3), (1, 2, 2), (10 ** 12, 0, 0)])
+    b = NodeArray.from_keys([(1, 2, 2), (-10 ** 12, 0, 0)])
+    assert a.dims == 3 and len(a) == 3
+    assert a.keys.tolist() == [[1, 2, 2], [1, 2, 3], [10 ** 12, 0, 0]]
+    assert (a & b).keys.tolist() == [[1, 2, 2]]
+    assert len(a | b) == 4
+    assert a.contains_many([(1, 2, 3), (0, 0, 0)]).tolist() == [True, False]
+    with pytest.raises(ValueError):
+        a | NodeArray.from_keys([(1, 2)])
+
+
+def test_nodearray_wide_extent():
+    # 2D keys that are too far apart to be packed
+    a = NodeArray.from_keys([(10 ** 12, 1), (-10 ** 12, 1), (0, 0)])
+    assert a.keys.tolist() == [[-10 ** 12, 1], [0, 0], [10 ** 12, 1]]
+    assert (a & NodeArray.from_keys([(0, 0), (5, 5)])).keys.tolist() == [[0, 0]]
+    assert not NodeArray.from_keys([]).contains_many([(0, 0)]).any()
+
+
+def test_nodeset_all_vertices(mocker):
+    desc = mocker.Mock(shapeType='Polyline', hasZ=False, is_pointclass=False, is_multipointclass=False,
+                       is_multipatchclass=False)
+    mocker.patch('gpf.lookups.NodeSet._get_desc', return_value=desc)
+    mocker.patch('gpf.lookups._BATCH_SIZE', 2)
+    cursor = mocker.patch('gpf.lookups._cursors.SearchCursor')
+    cursor.return_value.__enter__.return_value = iter([((1, 2), ), ((1.00001, 2), ), ((3, 4), ), ((None, None), )])
+    assert NodeSet('lines', all_vertices=True) == {(10000, 20000), (30000, 40000)}
+    assert cursor.call_args.kwargs['explode_to_points']
+
+
+def _sample_graph():
+    # Two separate networks: a Y-shape with a tail (edges 0-3) and a single edge (4)
+    from_coords = [(0, 0), (1, 0), (1, 0), (2, 1), (10, 10)]
+    to_coords = [(1, 0), (2, 1), (2, -1), (3, 1), (11, 10)]
+    return ConnectivityGraph.from_coords(from_coords, to_coords, oids=[10, 11, 12, 13, 14], source='lines')
+
+
+def test_graph_build():
+    graph = _sample_graph()
+    assert graph.num_edges == 5
+    assert graph.num_nodes == 7
+    assert graph.get_feature(3) == ('lines', 13)
+    assert graph.edge_index('lines', 12) == 2
+    assert graph.node_index([(10000, 0), (5, 5)]).tolist()[1] == -1
+    node = graph.node_index(get_nodekey(1, 0))
+    assert sorted(graph.incident_edges(node).tolist()) == [0, 1, 2]
+    with pytest.raises(KeyError):
+        graph.edge_index('lines', 99)
+
+
+def test_graph_analysis():
+    graph = _sample_graph()
+    assert graph.trace(get_nodekey(0, 0)).tolist() == [0, 1, 2, 3]
+    assert graph.trace(get_nodekey(0, 0), max_depth=1).tolist() == [0]
+    assert graph.trace(get_nodekey(0, 0), barriers=[get_nodekey(2, 1)]).tolist() == [0, 1, 2]
+    assert graph.trace_edge(4).tolist() == [4]
+    assert sorted(graph.iter_dfs(get_nodekey(3, 1))) == [0, 1, 2, 3]
+    labels = graph.components()
+    assert labels.tolist() == [0, 0, 0, 0, 1]
+    assert sorted(map(tuple, graph.dangles().tolist())) == sorted(
+        get_nodekey(*c) for c in ((0, 0), (2, -1), (3, 1), (10, 10), (11, 10)))
+
+
+def test_graph_serialize(tmp_path):
+    graph = _sample_graph()
+    path = str(tmp_path / 'graph.npz')
+    graph.save(path)
+    loaded = ConnectivityGraph.load(path)
+    assert loaded.source_paths == ('lines', )
+    assert np.array_equal(loaded.nodes, graph.nodes)
+    assert loaded.trace(get_nodekey(0, 0)).tolist() == [0, 1, 2, 3]
+
+
+@pytest.fixture
+def table(mocker):
+    """ Patches the lookup cursor and field validation, so that lookups can be built from in-memory rows. """
+    data = {}
+
+    def matches(where_clause, row):
+        # Only supports the simple where clauses that are used to refresh lookups (optionally combined using AND)
+        if where_clause.startswith('('):
+            return all(matches(clause, row) for clause in where_clause[1:-1].split(') AND ('))
+        field, operator, literal = re.match(r'(\w+) (IS NOT NULL|>=|>|IN)\s*(.*)', where_clause).groups()
+        value = row[data['fields'].index(field.upper())]
+        if operator == 'IN':
+            return value in ast.literal_eval(f'({literal[1:-1]}, )')
+        if value is None or operator == 'IS NOT NULL':
+            return value is not None
+        if literal.startswith('TIMESTAMP'):
+            literal = datetime.strptime(literal[11:-1], '%Y-%m-%d %H:%M:%S')
+        else:
+            literal = int(literal)
+        return value >= literal if operator == '>=' else value > literal
+
+    def search_cursor(table_path, fields, where_clause=None, **kwargs):
+        fields = [fields] if isinstance(fields, str) else fields
+        columns = [data['fields'].index(f.upper()) for f in fields]
+        rows = [row for row in data['rows'] if not where_clause or matches(where_clause, row)]
+        if str(kwargs.get('sql_clause', (None, None))[1]).startswith('ORDER BY'):
+            rows.sort(key=lambda r: r[columns[0]], reverse=True)
+        cursor = mocker.MagicMock()
+        cursor.__enter__.return_value = iter(tuple(row[i] for i in columns) for row in rows)
+        return cursor
+
+    def set_data(fields, rows):
+        data['fields'] = [f.upper() for f in fields]
+        data['rows'] = rows
+
+    mocker.patch('gpf.lookups._cursors.SearchCursor', side_effect=search_cursor)
+    mocker.patch('gpf.lookups.Lookup._get_fields', side_effect=lambda _: data['fields'])
+    mocker.patch('gpf.lookups.Lookup._get_tracking', side_effect=lambda _, t: t and (t, t.upper()))
+    mocker.patch('gpf.lookups.Lookup._get_dbms', return_value='')
+    return set_data
+
+
+def test_composite_keys(table):
+    table(('A', 'B', 'C', 'D'), [(1, 'x', 'PE', 10), (1, 'y', 'PE', 20), (2, 'x', 'PVC', 30), (None, None, 'X', 0)])
+    lookup = RowLookup('test', ('A', 'B'), ('C', 'D'))
+    assert len(lookup) == 3
+    assert lookup[(1, 'y')] == ('PE', 20)
+    assert lookup.get_value((2, 'x'), 'd') == 30
+    values = ValueLookup('test', ('A', 'B'), 'D')
+    assert values[(1, 'x')] == 10
+    with pytest.raises(ValueError):
+        RowLookup('test', ('A', 'SHAPE@XY'), ('C', 'D'))
+
+
+def test_secondary_index(table):
+    table(('A', 'C', 'D'), [(1, 'PE', 10), (2, 'PE', 20), (3, 'PVC', 30), (1, 'PVC', 40)])
+    lookup = RowLookup('test', 'A', ('C', 'D'), indexes='C')
+    assert lookup.find_by('C', 'PE') == [2]
+    assert lookup.find_by('c', 'PVC') == [3, 1]
+    assert lookup.find_by('C', 'steel') == []
+    with pytest.raises(ValueError):
+        lookup.find_by('D', 10)
+    dupes = RowLookup('test', 'A', ('C', 'D'), indexes=('C', 'D'), duplicate_keys=True)
+    assert dupes.find_by('C', 'PVC') == [3, 1]
+    assert dupes.find_by('D', 10) == [1]
+    with pytest.raises(ValueError):
+        RowLookup('test', 'A', ('C', 'D'), indexes='E')
+
+
+def test_columnar_lookup(table):
+    table(('A', 'B', 'C', 'D', 'E'), [(1, 'PE', 10, 1.5, None), (2, 'PE', 20, None, 'x'), (3, None, 30, 2.5, 4)])
+    lookup = RowLookup('test', 'A', ('B', 'C', 'D', 'E'), storage=STORAGE_COLUMNAR, indexes='B')
+    assert lookup[3] == 2
+    assert lookup.get_row(1) == ('PE', 10, 1.5, None)
+    assert lookup.get_row(3) == (None, 30, 2.5, 4)
+    assert lookup.get_row(4, ()) == ()
+    assert lookup.get_value(2, 'D') is None
+    assert lookup.get_value(2, 'c') == 20
+    assert lookup.get_value(9, 'c', -1) == -1
+    assert lookup.find_by('B', 'PE') == [1, 2]
+    assert lookup.column('C').dtype == np.int64 and lookup.column('C').sum() == 60
+    assert np.nanmean(lookup.column('D')) == 2.0
+    assert lookup.column('B').tolist() == ['PE', 'PE', None]
+    assert lookup.column('B', decode=False).tolist() == [0, 0, -1]
+    assert lookup.column('E').dtype == object
+    with pytest.raises(ValueError):
+        RowLookup('test', 'A', ('B', 'C'), storage=STORAGE_COLUMNAR, mutable_values=True)
+    with pytest.raises(ValueError):
+        RowLookup('test', 'A', ('B', 'C'), storage='rows').column('B')
+
+
+def test_columnar_dupes(table):
+    table(('A', 'B', 'C'), [(1, 'PE', 10), (1, 'PVC', 20), (2, 'PE', 30)])
+    lookup = RowLookup('test', 'A', ('B', 'C'), storage=STORAGE_COLUMNAR, duplicate_keys=True)
+    assert lookup.get_row(1) == [('PE', 10), ('PVC', 20)]
+    assert lookup.get_value(1, 'C') == [10, 20]
+    rows = RowLookup('test', 'A', ('B', 'C'))
+    assert rows.get_row(2) == rows[2] == ('PE', 30)
+
+
+def test_frozen_lookup(table):
+    table(('A', 'B', 'C'), [('{a}', 'PE', 10), ('{b}', 'PVC', 20), ('{c}', None, 30)])
+    lookup = RowLookup('test', 'A', ('B', 'C'))
+    with FrozenLookup.from_lookup(lookup) as frozen:
+        assert len(frozen) == 3
+        assert frozen['{b}'] == ('PVC', 20)
+        assert frozen.get('{x}', 1) == 1
+        assert '{c}' in frozen and '{x}' not in frozen
+        assert frozen.get_value('{a}', 'c') == 10
+        assert sorted(frozen) == ['{a}', '{b}', '{c}']
+        attached = pickle.loads(pickle.dumps(frozen))
+        assert attached.name == frozen.name
+        assert attached.get_value('{c}', 'B') is None
+        attached.close()
+
+
+def test_frozen_file(table, tmp_path):
+    table(('A', 'B'), [((1, 2), 'x'), ((3, 4), 'y')])
+    path = str(tmp_path / 'lookup.bin')
+    with FrozenLookup.from_lookup(ValueLookup('test', 'A', 'B'), path) as frozen:
+        assert FrozenLookup.attach(path)[(3, 4)] == 'y'
+        with pytest.raises(KeyError):
+            frozen[(5, 6)]
+        with pytest.raises(ValueError):
+            frozen.get_value((1, 2), 'B')
+    assert not os.path.exists(path)
+
+
+def test_range_lookup(table):
+    table(('F', 'T', 'V', 'W'), [(1, 9, 'a', 1), (10, 19, 'b', 2), (30, None, 'c', 3), (None, None, 'x', 0)])
+    ranges = RangeLookup('test', 'F', 'T', 'V')
+    assert len(ranges) == 3
+    assert ranges.get(1) == 'a' and ranges.get(9) == 'a' and ranges.get(9.5) is None
+    assert ranges.get(10 ** 9) == 'c'
+    assert 0 not in ranges
+    assert ranges.get_many([5, 15, 25, 35, 0], '-') == ['a', 'b', '-', 'c', '-']
+    assert RangeLookup('test', 'F', 'T', 'V', inclusive=False).get(9) is None
+    assert RangeLookup('test', 'F', 'T', ('V', 'W')).get(15) == ('b', 2)
+
+
+def test_range_lookup_overlaps():
+    ranges = RangeLookup.from_ranges([(0, 100, 'a'), (10, 20, 'b'), (15, 30, 'c'), (50, 60, 'd')])
+    assert ranges.get_all(17) == ['a', 'b', 'c']
+    assert ranges.get(17) == 'c'
+    assert ranges.get(40) == 'a'
+    assert ranges.get_many([25, 40, 55, 101]) == ['c', 'a', 'd', None]
+    assert RangeLookup.from_ranges([]).get_many([1]) == [None]
+
+
+def test_range_lookup_open_ended():
+    # A single open-ended range overlaps all others: queries must still find the right (most specific) range
+    ranges = RangeLookup.from_ranges([(0, None, 'open')] + [(i, i + .5, i) for i in range(1000)], inclusive=False)
+    assert ranges.get_many([10.25, 10.5, 999.75, -1]) == [10, 'open', 'open', None]
+    assert ranges.get_all(500) == ['open', 500]
+    assert ranges.get_all(500.5) == ['open']
+    assert RangeLookup.from_ranges([(5, 5, 'empty')], inclusive=False).get(5) is None
+
+
+def test_range_lookup_dates():
+    ranges = RangeLookup.from_ranges([(datetime(2020, 1, 1), datetime(2021, 1, 1), 'old'),
+                                      (datetime(2021, 1, 1), None, 'new')], inclusive=False)
+    assert ranges.get(datetime(2020, 12, 31, 23)) == 'old'
+    assert ranges.get(datetime(2021, 1, 1)) == 'new'
+    assert ranges.get_many([datetime(2019, 1, 1), datetime(2030, 1, 1)]) == [None, 'new']
+
+
+def test_valueset_distinct(table, mocker):
+    table(('A', ), [(1, ), (2, ), (1, ), (None, )])
+    cursor = mocker.patch('gpf.lookups._cursors.SearchCursor', wraps=_cursors.SearchCursor)
+    assert ValueSet('C:/data/test.gdb/table', 'A') == {1, 2, None}
+    assert cursor.call_args[1] == {'sql_clause': ('DISTINCT', None)}
+    assert ValueSet('C:/data/table.shp', 'A') == {1, 2, None}
+    assert cursor.call_args[1] == {}
+
+
+def test_valuesketch():
+    sketch = ValueSketch.from_values(range(100000))
+    assert abs(sketch.estimate() - 100000) < 3000
+    assert ValueSketch.from_values(['a', 'b', 'a', None, 1, 1.0]).estimate() == 3
+    other = ValueSketch.from_values(range(50000, 150000))
+    assert abs(sketch.merge(other).estimate() - 150000) < 4500
+    assert ValueSketch.from_bytes(sketch.to_bytes()).estimate() == sketch.estimate()
+    with pytest.raises(ValueError):
+        sketch.merge(ValueSketch.from_values([], precision=10))
+
+
+def test_keyfilter(table):
+    keys = [f'{{{i:08d}}}' for i in range(20000)]
+    table(('A', ), [(k, ) for k in keys] + [(None, )])
+    for key_filter in (KeyFilter('test', 'A', fp_rate=0.01), KeyFilter('test', 'A', capacity=20000)):
+        assert len(key_filter) == 20000
+        assert key_filter.might_contain(keys).all()
+        others = key_filter.might_contain([f'[{i}]' for i in range(20000)] + [None])
+        assert others.mean() < 0.02 and not others[-1]
+        assert 0.005 < key_filter.fp_rate < 0.015
+    restored = KeyFilter.from_bytes(key_filter.to_bytes())
+    assert keys[5] in restored and len(restored) == 20000
+    numbers = KeyFilter.from_keys(range(100), fp_rate=0.001)
+    assert 5 in numbers and 5.0 in numbers and numbers.might_contain(range(100)).all()
+    with pytest.raises(ValueError):
+        KeyFilter.from_keys([], fp_rate=1.5)
+
+
+def test_batch_processing(table):
+    table(('A', 'B'), [(i, f'v{i}') for i in range(25)] + [(None, 'x')])
+    batches = []
+
+    def upper_batch(lookup: dict, rows: list, **kwargs):
+        batches.append(len(rows))
+        lookup.update((k, v.upper()) for k, v in rows if k is not None)
+
+    lookup = Lookup('test', 'A', 'B', batch_func=upper_batch, batch_size=10)
+    assert batches == [10, 10, 6]
+    assert lookup[24] == 'V24' and len(lookup) == 25
+
+    class CountingLookup(Lookup):
+        def _process_batch(self, rows, **kwargs):
+            self[len(self)] = len(rows)
+
+    assert CountingLookup('test', 'A', 'B', batch_size=20) == {0: 20, 1: 6}
+    assert ValueLookup('test', 'A', 'B', batch_func=upper_batch)[3] == 'v3'
+    assert RowLookup('test', 'A', ('B', 'A'))[3] == ('v3', 3)
+    with pytest.raises(RuntimeError):
+        Lookup('test', 'A', 'B', batch_func=lambda rows: None)
+
+
+def test_row_override(table):
+    # Subclasses that only override _process_row must not be bypassed by the built-in batch fast paths
+    table(('A', 'B', 'C'), [(i, ''.join(('p', 'e')), i) for i in range(3)])
+
+    class UpperValueLookup(ValueLookup):
+        def _process_row(self, row, **kwargs):
+            self[row[0]] = row[1].upper()
+
+    class UpperRowLookup(RowLookup):
+        def _process_row(self, row, **kwargs):
+            self[row[0]] = (row[1].upper(), row[2])
+
+    assert UpperValueLookup('test', 'A', 'B')[1] == 'PE'
+    assert UpperRowLookup('test', 'A', ('B', 'C'))[1] == ('PE', 1)
+
+
+def test_refresh_oid(table):
+    rows = [(1, 'a', 'PE', 10), (2, 'b', 'PE', 20), (3, 'c', 'PVC', 30)]
+    table(('OID', 'A', 'B', 'C'), rows)
+    lookup = RowLookup('test', 'A', ('B', 'C'), change_tracking=TRACK_OID, indexes='B')
+    rows.remove((2, 'b', 'PE', 20))
+    rows.append((4, 'd', 'PE', 40))
+    stats = lookup.refresh()
+    assert (stats['added'], stats['updated'], stats['removed']) == (1, 0, 1)
+    assert stats['elapsed'] >= 0
+    assert lookup == {'a': ('PE', 10), 'c': ('PVC', 30), 'd': ('PE', 40)}
+    assert lookup.find_by('B', 'PE') == ['a', 'd']
+    assert lookup.refresh()['added'] == 0
+    with pytest.raises(ValueError):
+        RowLookup('test', 'A', ('B', 'C')).refresh()
+
+    # Secondary indexes must be updated from the column arrays as well
+    rows[:] = [(1, 'a', 'PE', 10), (2, 'b', 'PE', 20), (3, 'c', 'PVC', 30)]
+    columnar = RowLookup('test', 'A', ('B', 'C'), change_tracking=TRACK_OID, indexes='B', storage=STORAGE_COLUMNAR)
+    rows.remove((2, 'b', 'PE', 20))
+    rows.append((4, 'd', 'PE', 40))
+    stats = columnar.refresh()
+    assert (stats['added'], stats['updated'], stats['removed']) == (1, 0, 1)
+    assert {k: columnar.get_row(k) for k in columnar} == {'a': ('PE', 10), 'c': ('PVC', 30), 'd': ('PE', 40)}
+    assert columnar.find_by('B', 'PE') == ['a', 'd']
+
+
+def test_refresh_edits(table):
+    rows = [('a', 'PE', datetime(2020, 1, 1)), ('b', 'PE', datetime(2020, 1, 2)), ('c', 'PVC', None)]
+    table(('A', 'B', 'EDITS'), rows)
+    lookup = ValueLookup('test', 'A', 'B', change_tracking=TRACK_EDITS)
+    rows[0] = ('a', 'PVC', datetime(2020, 1, 3))
+    rows.append(('d', 'PE', datetime(2020, 1, 3)))
+    stats = lookup.refresh()
+    # Row 'b' was edited in the same second as the previous watermark, so it is read again
+    assert (stats['added'], stats['updated'], stats['removed']) == (1, 2, 0)
+    assert lookup == {'a': 'PVC', 'b': 'PE', 'c': 'PVC', 'd': 'PE'}
+
+    table(('A', 'B', 'C', 'EDITS'), [(1, 'x', 10, None), (1, 'y', 20, None), (2, 'z', 30, None)])
+    columnar = RowLookup('test', 'A', ('B', 'C'), duplicate_keys=True, storage=STORAGE_COLUMNAR,
+                         change_tracking=TRACK_EDITS)
+    table(('A', 'B', 'C', 'EDITS'), [(1, 'x', 10, None), (2, 'z', 30, None), (2, 'w', 1.5, datetime(2020, 1, 1))])
+    stats = columnar.refresh()
+    assert (stats['added'], stats['updated'], stats['removed']) == (0, 2, 0)
+    assert columnar.get_row(1) == [('x', 10)]
+    assert sorted(columnar.get_row(2)) == [('w', 1.5), ('z', 30)]
+
+
+def test_refresh_where(table):
+    # The watermark must only take the rows into account that match the where clause
+    table(('OID', 'A', 'C'), [(1, 'a', 20), (2, 'b', 5)])
+    lookup = ValueLookup('test', 'OID', 'A', 'C > 15', change_tracking=TRACK_OID)
+    assert lookup._watermark == 1 and lookup == {1: 'a'}
+
+
+def test_changes_timestamp(mocker):
+    edited = datetime(2020, 1, 2, 3, 4, 5)
+    assert Lookup._sql_timestamp(edited, '') == "TIMESTAMP '2020-01-02 03:04:05'"
+    assert Lookup._sql_timestamp(edited, 'sqlserver') == "'2020-01-02 03:04:05'"
+    assert Lookup._sql_timestamp(edited, 'oracle') == "TO_DATE('2020-01-02 03:04:05', 'YYYY-MM-DD HH24:MI:SS')"
+    describe = mocker.patch('gpf.lookups._meta.Describe')
+    describe.return_value.get.return_value.dbclient = 'SQLServer'
+    assert Lookup._get_dbms('C:/Temp/gis.sde/gis.owner.pipes') == 'sqlserver'
+    assert Lookup._get_dbms('C:/Temp/test.gdb/pipes') == ''
+
+
+def test_refresh_globalid(table):
+    rows = [('{A}', 1, 'x'), ('{B}', 2, 'y')]
+    table(('GLOBALID', 'K', 'V'), rows)
+    lookup = ValueLookup('test', 'K', 'V', change_tracking=TRACK_GLOBALID)
+    rows.append(('{C}', 3, 'z'))
+    assert lookup.refresh()['added'] == 1
+    assert lookup == {1: 'x', 2: 'y', 3: 'z'}
+
+
+class _FakeUpdateCursor(list):
+    fields = ('KEY', 'MATERIAL', 'DIAMETER')
+    updates = []
+
+    def updateRow(self, row):
+        self.updates.append(row)
+
+
+def test_enrich(table):
+    table(('A', 'B', 'C'), [(1, 'PE', 100), (2, 'PVC', 150)])
+    lookup = RowLookup('test', 'A', ('B', 'C'))
+    cursor = _FakeUpdateCursor([(1, 'PE', 90), (2, 'PVC', 150), (3, None, None)])
+    stats = {}
+    rows = list(enrich(cursor, lookup, 'key', ('Material', 'Diameter'), stats=stats))
+    assert rows == [[1, 'PE', 100], [2, 'PVC', 150], [3, None, None]]
+    assert cursor.updates == [[1, 'PE', 100]]
+    assert stats == {'rows': 3, 'matched': 2, 'updated': 1}
+
+    search = type('SearchCursor', (list, ), {'fields': ('A', )})([(2, ), (4, )])
+    assert list(enrich(search, lookup, 'A', ('D', 'E'), value_fields=('C', 'B'))) == [[2, 150, 'PVC'], [4, None, None]]
+    assert list(enrich(search, {2: 'x'}, 'A', 'A')) == [['x'], [4]]
+    with pytest.raises(ValueError):
+        next(enrich(cursor, lookup, 'key', 'unknown'))
+    with pytest.raises(ValueError):
+        next(enrich(search, {}, 'A', ('B', 'C'), value_fields=('B', )))
+
+
+def test_report(table, mocker):
+    table(('A', 'B', 'C'), [(1, 'PE', 10), (1, 'PVC', 20), (2, 'PE', 30.5), (3, None, 40)])
+    lookup = ValueLookup('test', 'A', 'B', duplicate_keys=True)
+    report = get_report(lookup)
+    assert report['type'] == 'ValueLookup' and report['length'] == 3
+    assert report['key_types'] == {'int': 3}
+    assert report['value_types'] == {'str': 3, 'NoneType': 1}
+    assert (report['duplicate_keys'], report['duplicate_rows']) == (1, 1)
+    assert report['build_time'] >= report['fetch_time'] + report['process_time'] - 1e-6
+    assert report['memory'] > 0
+
+    big = RowLookup('test', 'A', ('B', 'C'))
+    exact, estimated = get_report(big, 0)['memory'], get_report(big, 1)['memory']
+    assert exact > 0 and estimated > 0
+    assert get_report(NodeArray.from_keys([(1, 2), (3, 4)]))['memory'] >= 32
+    columnar = RowLookup('test', 'A', ('B', 'C'), storage=STORAGE_COLUMNAR)
+    assert get_report(columnar)['value_types'] == {'b': 'str', 'c': 'float64'}
+
+    logger = mocker.Mock()
+    log_report(lookup, logger)
+    message = logger.info.call_args[0][0]
+    assert message.startswith('ValueLookup: 3 elements') and 'Duplicate keys: 1 (1 duplicate rows)' in message
+
+
+def test_intern_strings(table):
+    table(('A', 'B', 'C'), [(i, ''.join(('P', 'E')), str(i)) for i in range(3)])
+    lookup = RowLookup('test', 'A', ('B', 'C'), intern_strings='B')
+    assert lookup[0][0] is lookup[2][0]
+    assert lookup[1] == ('PE', '1')
+    assert RowLookup('test', 'A', ('B', 'C'), intern_strings=True, mutable_values=True)[1] == ['PE', '1']
+    plain = RowLookup('test', 'A', ('B', 'C'))
+    assert plain[0][0] is not plain[2][0]
+    with pytest.raises(ValueError):
+        RowLookup('test', 'A', ('B', 'C'), intern_strings='D')
+
+
+def test_point_lookup(tmp_path, mocker):
+    rng = np.random.default_rng(7)
+    coords = rng.uniform(0, 1000, (2000, 2))
+    points = PointLookup.from_coords(coords, [f'p{i}' for i in range(2000)])
+    queries = rng.uniform(-50, 1050, (50, 2))
+    brute = np.sqrt(((queries[:, None, :] - coords[None, :, :]) ** 2).sum(axis=2))
+
+    distances, indices = points.nearest_many(queries, k=3)
+    np.testing.assert_allclose(distances, np.sort(brute, axis=1)[:, :3])
+    assert [points.values[i] for i in indices[:, 0]] == [f'p{i}' for i in brute.argmin(axis=1)]
+    distance, value = points.nearest(*queries[0])[0]
+    assert value == f'p{brute[0].argmin()}' and distance == pytest.approx(brute[0].min())
+
+    hits = points.within_many(queries, 40)
+    for row, found in zip(brute, hits):
+        assert sorted(points.values[i] for i in found) == sorted(f'p{i}' for i in np.flatnonzero(row <= 40))
+    assert [d for d, _ in points.within(*queries[1], 40)] == sorted(d for d in brute[1] if d <= 40)
+
+    # The batch queries must give the same results when they are processed in several chunks
+    mocker.patch.object(PointLookup, '_BATCH_SIZE', 7)
+    np.testing.assert_array_equal(points.nearest_many(queries, k=3)[0], distances)
+    assert all(np.array_equal(a, b) for a, b in zip(points.within_many(queries, 40), hits))
+    assert [found.tolist() for found in points.within_many([(-99, -99), (-98, -98)], 5)] == [[], []]
+
+    small = PointLookup.from_coords([(0, 0, 5), (3, 4, 6)])
+    assert small.nearest(0, 0, k=5) == [(0, 0), (5, 1)]
+    assert small.nearest_many([(0, 0)], k=3)[1].tolist() == [[0, 1, -1]]
+    assert PointLookup.from_coords(np.empty((0, 2))).nearest(1, 1) == []
+
+    path = str(tmp_path / 'points.npz')
+    points.save(path)
+    loaded = PointLookup.load(path)
+    assert loaded.nearest(500, 500, 2) == points.nearest(500, 500, 2)
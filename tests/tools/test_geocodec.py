@@ -0,0 +1,138 @@
+# coding: utf-8
+#
+# Copyright 2019 Geocom Informatik AG / VertiGIS
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import struct
+
+import numpy as np
+import pytest
+
+from gpf.tools import geocodec as gc
+
+_RING = [(0., 0.), (0., 10.), (10., 10.), (10., 0.), (0., 0.)]
+_HOLE = [(2., 2.), (4., 2.), (4., 4.), (2., 4.), (2., 2.)]
+
+
+def _polygon_wkb(order='<', code=3, rings=(_RING, _HOLE)):
+    data = struct.pack(order + 'BII', order == '<', code, len(rings))
+    for ring in rings:
+        data += struct.pack(order + 'I', len(ring)) + struct.pack(order + f'{2 * len(ring)}d', *sum(ring, ()))
+    return data
+
+
+def test_read_wkb_polygon():
+    coords, part_offsets, ring_offsets = gc.read_wkb(_polygon_wkb())
+    assert coords.tolist() == [list(v) for v in _RING + _HOLE]
+    assert part_offsets.tolist() == [0, 2]
+    assert ring_offsets.tolist() == [0, 5, 10]
+    assert gc.read_wkb_header(_polygon_wkb()) == ('Polygon', False, None)
+
+
+def test_read_wkb_bigendian():
+    coords, part_offsets, ring_offsets = gc.read_wkb(_polygon_wkb('>'))
+    assert coords.dtype == np.float64
+    assert coords.tolist() == [list(v) for v in _RING + _HOLE]
+    assert ring_offsets.tolist() == [0, 5, 10]
+
+
+def test_read_wkb_zerocopy():
+    buffer = bytearray(struct.pack('<BII6d', 1, 2, 3, 0, 0, 1, 1, 2, 0))
+    coords, part_offsets, ring_offsets = gc.read_wkb(memoryview(buffer))
+    assert coords.tolist() == [[0, 0], [1, 1], [2, 0]]
+    assert part_offsets.tolist() == [0, 1]
+    buffer[9:17] = struct.pack('<d', 5.)
+    assert coords[0, 0] == 5.
+
+
+def test_read_wkb_ewkb_zm():
+    # EWKB PointZM with SRID: the M value must be dropped
+    data = struct.pack('<BIi4d', 1, 1 | 0x80000000 | 0x40000000 | 0x20000000, 2056, 1, 2, 3, 4)
+    assert gc.read_wkb_header(data) == ('Point', True, 2056)
+    coords, part_offsets, ring_offsets = gc.read_wkb(data)
+    assert coords.tolist() == [[1, 2, 3]]
+    assert part_offsets.tolist() == [0, 1]
+
+
+def test_read_wkb_iso_m():
+    # ISO LineStringM (2002)
+    coords, _, _ = gc.read_wkb(struct.pack('<BII6d', 1, 2002, 2, 0, 0, 9, 1, 1, 9))
+    assert coords.tolist() == [[0, 0], [1, 1]]
+
+
+def test_read_wkb_invalid():
+    with pytest.raises(ValueError):
+        gc.read_wkb(struct.pack('<BI', 1, 7))
+    with pytest.raises(ValueError):
+        gc.read_wkb(_polygon_wkb()[:-8])
+
+
+@pytest.mark.parametrize('shape_type, coords, part_offsets, ring_offsets', [
+    ('Point', [[1, 2, 3]], [0, 1], [0, 1]),
+    ('Multipoint', [[1, 2], [3, 4]], [0, 1], [0, 2]),
+    ('Polyline', [[0, 0], [1, 1]], [0, 1], [0, 2]),
+    ('Polyline', [[0, 0], [1, 1], [5, 5], [6, 6]], [0, 1, 2], [0, 2, 4]),
+    ('Polygon', _RING + _HOLE, [0, 2], [0, 5, 10]),
+    ('Polygon', _RING + [(v[0] + 20, v[1]) for v in _RING], [0, 1, 2], [0, 5, 10]),
+])
+@pytest.mark.parametrize('srid', [None, 2056])
+def test_write_wkb_roundtrip(shape_type, coords, part_offsets, ring_offsets, srid):
+    data = gc.write_wkb(np.array(coords, dtype=float), part_offsets, ring_offsets, shape_type, srid)
+    assert gc.read_wkb_header(data) == (shape_type, len(coords[0]) == 3, srid)
+    result = gc.read_wkb(data)
+    assert result[0].tolist() == [list(v) for v in coords]
+    assert result[1].tolist() == part_offsets
+    assert result[2].tolist() == ring_offsets
+
+
+def test_write_wkb_iso_z():
+    data = gc.write_wkb(np.array([[1., 2., 3.]]), [0, 1], [0, 1], 'Point')
+    assert data == struct.pack('<BI3d', 1, 1001, 1, 2, 3)
+    with pytest.raises(ValueError):
+        gc.write_wkb(np.array([[1., 2.]]), [0, 1], [0, 1], 'Curve')
+
+
+def test_wkb_many():
+    buffers = [_polygon_wkb(), None, _polygon_wkb(rings=(_RING,))]
+    coords, geometry_offsets, part_offsets, ring_offsets = gc.read_wkb_many(buffers)
+    assert len(coords) == 15
+    assert geometry_offsets.tolist() == [0, 1, 1, 2]
+    assert part_offsets.tolist() == [0, 2, 3]
+    assert ring_offsets.tolist() == [0, 5, 10, 15]
+
+    results = list(gc.write_wkb_many(coords, geometry_offsets, part_offsets, ring_offsets, 'Polygon'))
+    assert results == buffers
+
+
+def test_esrijson_roundtrip():
+    data = json.dumps({'rings': [_RING, _HOLE], 'spatialReference': {'wkid': 2056}})
+    coords, part_offsets, ring_offsets = gc.read_esrijson(memoryview(data.encode('utf-8')))
+    assert ring_offsets.tolist() == [0, 5, 10]
+    result = json.loads(gc.write_esrijson(coords, part_offsets, ring_offsets, 'Polygon', 2056))
+    assert result['rings'] == [[list(v) for v in _RING], [list(v) for v in _HOLE]]
+    assert result['spatialReference'] == {'wkid': 2056}
+
+
+def test_esrijson_orientation():
+    # OGC polygons usually have a counter-clockwise exterior ring and clockwise interior rings
+    ogc_ring, ogc_hole = _RING[::-1], _HOLE[::-1]
+    coords, part_offsets, ring_offsets = gc.read_wkb(_polygon_wkb(rings=(ogc_ring, ogc_hole)))
+    result = json.loads(gc.write_esrijson(coords, part_offsets, ring_offsets, 'Polygon'))
+    assert result['rings'] == [[list(v) for v in _RING], [list(v) for v in _HOLE]]
+    # The input arrays are not modified
+    assert coords.tolist() == [list(v) for v in ogc_ring + ogc_hole]
+    # The first ring of every part is an exterior ring
+    result = json.loads(gc.write_esrijson(np.array(_RING + _RING), [0, 1, 2], [0, 5, 10], 'Polygon'))
+    assert result['rings'] == [[list(v) for v in _RING]] * 2
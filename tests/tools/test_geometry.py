@@ -15,7 +15,9 @@
 # limitations under the License.
 
 import sys
+from types import SimpleNamespace
 
+import numpy as np
 import pytest
 from mock import Mock
 
@@ -34,3 +36,164 @@ def test_getxyz():
     assert get_xyz(1.05, 2.1, 5.6, 3.24) == (1.05, 2.1, 5.6)
     assert get_xyz({'x': 1, 'y': 2}) == (1, 2, None)
     assert get_xyz({'X': 1, 'Y': 2, 'z': 3}) == (1, 2, 3)
+
+
+def test_vertex_array():
+    polygon = {'hasZ': True, 'rings': [[[0, 0, 0], [0, 10, 0], [10, 10, 1], [10, 0, None], [0, 0, 0]],
+                                       [[2, 2, 0], [4, 2, 0], [4, 4, 0], [2, 2, 0]],
+                                       [[20, 0, 5], [20, 5, 5], [25, 0, 5], [20, 0, 5]]]}
+    coords, part_offsets, ring_offsets = get_vertex_array(polygon)
+    assert coords.shape == (13, 3) and coords.dtype == np.float64
+    assert coords[0].tolist() == [0, 0, 0] and np.isnan(coords[3, 2])
+    assert ring_offsets.tolist() == [0, 5, 9, 13]
+    assert part_offsets.tolist() == [0, 2, 3]
+
+    line = '{"hasM": true, "paths": [[[1, 2, 7], [3, 4, 8]], [[5, 6, 9], [7, 8, 9], [9, 9, 9]]]}'
+    coords, part_offsets, ring_offsets = get_vertex_array(line)
+    assert coords.tolist() == [[1, 2], [3, 4], [5, 6], [7, 8], [9, 9]]
+    assert part_offsets.tolist() == [0, 1, 2] and ring_offsets.tolist() == [0, 2, 5]
+
+    curve = {'curvePaths': [[[0, 0], {'c': [[2, 0], [1, 1]]}, [3, 0]]]}
+    assert get_vertex_array(curve)[0].tolist() == [[0, 0], [2, 0], [3, 0]]
+    assert get_vertex_array({'x': 1, 'y': 2, 'z': 0})[0].tolist() == [[1, 2, 0]]
+    assert get_vertex_array({'x': None})[0].shape == (0, 2)
+    with pytest.raises(ValueError):
+        get_vertex_array({'foo': 1})
+
+
+def test_vertex_arrays():
+    geometries = [{'points': [[0, 0], [1, 1]]}, None, {'x': 5, 'y': 5, 'z': 1},
+                  {'paths': [[[0, 0], [1, 0]], [[2, 0], [3, 0]]]}]
+    coords, geometry_offsets, part_offsets, ring_offsets = get_vertex_arrays(geometries)
+    assert coords.shape == (7, 3) and np.isnan(coords[0, 2]) and coords[2, 2] == 1
+    assert geometry_offsets.tolist() == [0, 1, 1, 2, 4]
+    assert part_offsets.tolist() == [0, 1, 2, 3, 4]
+    assert ring_offsets.tolist() == [0, 2, 3, 5, 7]
+    assert get_vertex_arrays([])[0].shape == (0, 2)
+
+
+def test_from_array(mocker):
+    as_shape = mocker.patch('gpf.tools.geometry._arcpy.AsShape', side_effect=lambda data, esri_json: data)
+    coords = np.array([(0, 0), (0, 10), (10, 10), (10, 0), (2, 2), (4, 2), (4, 4)], dtype=float)
+    builder = ShapeBuilder.from_array(coords, [0, 4])
+    assert builder.num_coords == 7
+    assert builder.as_polygon(2056) == {'rings': [[[0, 0], [0, 10], [10, 10], [10, 0], [0, 0]],
+                                                  [[2, 2], [4, 2], [4, 4], [2, 2]]],
+                                        'spatialReference': {'wkid': 2056}}
+    assert builder.as_polyline(has_z=True)['paths'][1] == [[2, 2, 0], [4, 2, 0], [4, 4, 0]]
+    assert ShapeBuilder.from_array([(1, 2, np.nan)]).as_point(has_z=True) == {'x': 1, 'y': 2, 'z': None, 'hasZ': True}
+    assert as_shape.call_count == 3
+    with pytest.raises(ValueError):
+        ShapeBuilder.from_array(coords, [0, 8])
+
+
+def test_from_vertex_arrays(mocker):
+    mocker.patch('gpf.tools.geometry._arcpy.AsShape', side_effect=lambda data, esri_json: data)
+    geometries = [{'paths': [[[0, 0], [1, 0]], [[2, 0], [3, 0]]]}, None, {'paths': [[[5, 5], [6, 6]]]}]
+    shapes = list(from_vertex_arrays(*get_vertex_arrays(geometries), 'Polyline', 2056))
+    assert shapes[0] == dict(geometries[0], spatialReference={'wkid': 2056})
+    assert shapes[1] is None
+    assert shapes[2]['paths'] == geometries[2]['paths']
+
+
+def test_vertex_snapper():
+    snapper = VertexSnapper([(0, 0), (10, 0), (10.3, 0), (20, 20)], 0.5)
+    coords = np.array([(0.2, 0.2, 1.), (10.2, 0.1, 2.), (5, 5, 3.), (np.nan, 0, 4.), (20.5, 20.1, 5.), (0, 0, 6.)])
+    index, dist = snapper.nearest(coords)
+    assert snapper.reference[index[[0, 1, 5]]].tolist() == [[0, 0], [10.3, 0], [0, 0]]
+    assert index[[2, 3, 4]].tolist() == [-1, -1, -1]
+    assert dist[0] == pytest.approx(0.08 ** .5)
+    snapped, moved = snapper.snap(coords)
+    assert snapped[:2].tolist() == [[0, 0, 1.], [10.3, 0, 2.]]
+    assert moved.tolist() == [True, True, False, False, False, False]
+    with pytest.raises(ValueError):
+        VertexSnapper([(0, 0)], 0)
+
+
+def test_snap_features(mocker):
+    mocker.patch('gpf.tools.geometry._arcpy.AsShape', side_effect=lambda data, esri_json: data)
+    mocker.patch('gpf.tools.geometry._meta.Describe', return_value=SimpleNamespace(
+        shapeType='Polyline', hasZ=False, spatialReference=2056))
+    rows = [(1, {'paths': [[[0.1, 0], [5, 5]]]}), (2, {'paths': [[[7, 7], [8, 8]]]}), (3, None)]
+    search = mocker.patch('gpf.tools.geometry._cursors.SearchCursor')
+    search.return_value.__enter__.return_value = iter(rows)
+    update = mocker.patch('gpf.tools.geometry._cursors.UpdateCursor')
+    cursor = update.return_value.__enter__.return_value
+    cursor.__iter__.return_value = iter([(1, None), (2, None), (3, None)])
+
+    assert VertexSnapper([(0, 0), (8, 8.2)], 0.15).snap_features('test.gdb/pipes', batch_size=2) == 1
+    cursor.updateRow.assert_called_once_with((1, {'paths': [[[0., 0.], [5., 5.]]], 'spatialReference': {'wkid': 2056}}))
+
+
+def test_simplify_vertices():
+    line = np.array([(0, 0), (1, 0.1), (2, -0.1), (3, 0), (4, 3), (5, 6.05), (6, 9)])
+    assert simplify_vertices(line, [0, 7], 0.5).tolist() == [True, False, False, True, False, False, True]
+    assert simplify_vertices(line, [0, 7], 0.5, SIMPLIFY_VISVALINGAM).tolist() == \
+        [True, False, False, True, False, False, True]
+    fixed = np.zeros(7, dtype=bool)
+    fixed[1] = True
+    assert simplify_vertices(line, [0, 7], 0.5, fixed=fixed).tolist() == [True, True, False, True, False, False, True]
+    # Closed rings that would collapse are kept as-is
+    square = [(0, 0), (0, 1), (1, 1), (1, 0), (0, 0)]
+    assert simplify_vertices(square, [0, 5], 10).all()
+    with pytest.raises(ValueError):
+        simplify_vertices(line, [0, 7], 0.5, 'test')
+    # A zero tolerance only removes collinear vertices
+    assert simplify_vertices([(0, 0), (1, 1), (2, 2), (3, 0)], [0, 4], 0).tolist() == [True, False, True, True]
+    with pytest.raises(ValueError):
+        simplify_vertices(line, [0, 7], -0.5)
+
+
+def test_simplify_topology():
+    # Two adjacent polygons that share a wiggly boundary from (10, 0) to (10, 10)
+    shared = [(10, 0), (10.1, 2), (9.9, 4), (10.1, 6), (9.9, 8), (10, 10)]
+    left = shared + [(0, 10), (0, 0), (10, 0)]
+    right = [(20, 0)] + shared + [(20, 10), (20, 0)]
+    geometries = [{'rings': [[list(v) for v in left]]}, {'rings': [[list(v) for v in right]]}]
+    coords, geometry_offsets, part_offsets, ring_offsets = get_vertex_arrays(geometries)
+
+    junctions = find_junctions(coords, ring_offsets)
+    assert sorted(map(tuple, coords[junctions].tolist())) == [(10, 0), (10, 0), (10, 0), (10, 10), (10, 10)]
+
+    simplified, _, _, offsets = simplify_arrays(coords, geometry_offsets, part_offsets, ring_offsets, 0.15,
+                                                preserve_topology=True)
+    left, right = ({tuple(v) for v in simplified[offsets[i]:offsets[i + 1]].tolist() if 9 < v[0] < 11}
+                   for i in range(2))
+    assert left == right
+    assert len(left) < len(shared)
+
+
+def test_simplify_rows(mocker):
+    mocker.patch('gpf.tools.geometry._arcpy.AsShape', side_effect=lambda data, esri_json: data)
+    rows = [({'paths': [[[0, 0], [1, 0.1], [2, 0]]]}, 'a'), (None, 'b'), ({'x': 1, 'y': 2}, 'c'),
+            ({'paths': [[[0, 0], [1, 1], [2, 0]]], 'spatialReference': {'wkid': 2056}}, 'd')]
+    result = list(simplify_rows(iter(rows), 0.5, batch_size=3))
+    assert result[0] == [{'paths': [[[0, 0], [2, 0]]]}, 'a']
+    assert result[1:] == [list(row) for row in rows[1:]]
+
+
+def test_getxyz_dispatch():
+    assert get_xyz(1.0, 2.0) == (1.0, 2.0, None)
+    assert get_xyz(1, 2, 3, 4) == (1, 2, 3)
+    assert get_xyz({'x': 1.0, 'y': 2.0}) == (1.0, 2.0, None)
+    assert get_xyz({'X': 1, 'Y': 2, 'Z': 3}) == (1, 2, 3)
+    assert get_xyz(SimpleNamespace(X=1.0, Y=2.0, Z=None)) == (1.0, 2.0, None)
+    point_geometry = SimpleNamespace(pointCount=1, firstPoint=SimpleNamespace(X=1.0, Y=2.0, Z=3.0))
+    assert get_xyz(point_geometry) == (1.0, 2.0, 3.0)
+    with pytest.raises(ValueError):
+        get_xyz({'x': 1.0, 'y': 'test'})
+    with pytest.raises(ValueError):
+        get_xyz((1.0, 2.0))
+    with pytest.raises(ValueError):
+        get_xyz(SimpleNamespace(pointCount=2))
+
+
+def test_getxyz_many():
+    expected = [[1., 2., np.nan], [3., 4., 5.]]
+    np.testing.assert_equal(get_xyz_many([(1, 2, None), (3, 4, 5)]), expected)
+    np.testing.assert_equal(get_xyz_many([(1, 2), (3, 4, 5)]), expected)
+    np.testing.assert_equal(get_xyz_many(np.array([[1, 2], [3, 4]])), [[1., 2., np.nan], [3., 4., np.nan]])
+    np.testing.assert_equal(get_xyz_many([{'x': 1., 'y': 2.}, SimpleNamespace(X=3., Y=4., Z=5.)]), expected)
+    assert get_xyz_many([]).shape == (0, 3)
+    with pytest.raises(ValueError):
+        get_xyz_many(np.zeros((2, 4)))
@@ -0,0 +1,89 @@
+# coding: utf-8
+#
+# Copyright 2019 Geocom Informatik AG / VertiGIS
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import pytest
+
+from gpf.tools import geomkernel as gk
+
+# Swiss LV95 origin, to verify that large coordinates do not cause a loss of precision
+_X0, _Y0 = 2600000., 1200000.
+
+
+@pytest.fixture
+def polygon():
+    # Clockwise 10x10 exterior ring with a counter-clockwise 2x2 hole, followed by a separate 1x1 part
+    rings = [
+        [(0, 0), (0, 10), (10, 10), (10, 0), (0, 0)],
+        [(2, 2), (4, 2), (4, 4), (2, 4), (2, 2)],
+        [(20, 0), (20, 1), (21, 1), (21, 0), (20, 0)]
+    ]
+    coords = np.array([v for r in rings for v in r], dtype=float) + (_X0, _Y0)
+    return coords, np.array([0, 5, 10, 15])
+
+
+def test_areas(polygon):
+    coords, ring_offsets = polygon
+    assert gk.areas(coords, ring_offsets) == pytest.approx([100., -4., 1.], rel=gk.TOLERANCE)
+    assert gk.areas(coords, ring_offsets, [0, 2, 3]) == pytest.approx([96., 1.], rel=gk.TOLERANCE)
+    assert gk.areas(coords, ring_offsets, [0, 3]) == pytest.approx([97.], rel=gk.TOLERANCE)
+    # Open rings are closed implicitly
+    assert gk.areas([(0, 0), (0, 1), (1, 1), (1, 0)], [0, 4]) == pytest.approx([1.])
+    with pytest.raises(ValueError):
+        gk.areas(coords, [0, 5])
+
+
+def test_lengths(polygon):
+    coords, ring_offsets = polygon
+    assert gk.lengths(coords, ring_offsets, [0, 2, 3]) == pytest.approx([48., 4.], rel=gk.TOLERANCE)
+    line = np.array([(0, 0, 0), (3, 4, 12), (3, 4, np.nan), (3, 0, 0)])
+    assert gk.lengths(line, [0, 2, 4]) == pytest.approx([5., 4.])
+    assert gk.lengths(line, [0, 2, 4], [0, 2], use_z=True) == pytest.approx([17.])
+
+
+def test_extents(polygon):
+    coords, ring_offsets = polygon
+    ext = gk.extents(coords, ring_offsets, [0, 2, 3, 3]) - (_X0, _Y0, _X0, _Y0)
+    assert ext[:2].tolist() == [[0., 0., 10., 10.], [20., 0., 21., 1.]]
+    assert np.isnan(ext[2]).all()
+
+
+def test_centroids(polygon):
+    coords, ring_offsets = polygon
+    cx, cy = gk.centroids(coords, ring_offsets, [0, 2])[0] - (_X0, _Y0)
+    assert cx == pytest.approx(488. / 96.)
+    assert cy == pytest.approx(488. / 96.)
+    # Polyline (L-shape): length-weighted segment midpoints
+    line = [(0, 0), (0, 4), (2, 4)]
+    assert np.allclose(gk.centroids(line, [0, 3], polygon=False), [[1. / 3, 8. / 3]])
+    # Multipoint (a ring per point): vertex mean
+    assert np.allclose(gk.centroids([(0, 0), (2, 0), (2, 2)], [0, 1, 2, 3], [0, 3]), [[4. / 3, 2. / 3]])
+
+
+def test_points_in_polygon(polygon):
+    coords, ring_offsets = polygon
+    points = np.array([(1, 1), (3, 3), (5, 9.5), (11, 5), (20.5, 0.5), (-1, 5)]) + (_X0, _Y0)
+    assert gk.points_in_polygon(points, coords, ring_offsets).tolist() == [True, False, True, False, True, False]
+
+
+def test_intersect_segments():
+    hits, points = gk.intersect_segments([0, 0], [2, 2],
+                                         [(0, 2), (3, 3), (2, 2), (1, 1), (0, 1)],
+                                         [(2, 0), (4, 4), (3, 0), (3, 3), (1, 2)])
+    assert hits.tolist() == [True, False, True, True, False]
+    assert points[0].tolist() == [1., 1.]
+    assert points[2].tolist() == [2., 2.]
+    assert np.isnan(points[[1, 3, 4]]).all()
@@ -0,0 +1,102 @@
+# coding: utf-8
+#
+# Copyright 2019 Geocom Informatik AG / VertiGIS
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from gpf import arcpy
+from gpf.tools import projection as prj
+
+_LV03 = np.array([[600000., 200000.], [700000., 200000.], [700000., 300000.], [600000., 300000.]])
+# LV95 nodes with a small (distortion) shift of the (700000, 300000) node
+_LV95 = _LV03 + prj._LV_OFFSET + [[0, 0], [0, 0], [1., -.5], [0, 0]]
+_MESH = _LV03, _LV95, np.array([[0, 1, 2], [0, 2, 3]])
+
+
+def test_swisstransformer_offset():
+    coords = np.array([[600000., 200000., 450.], [np.nan, np.nan, np.nan]])
+    lv95 = prj.SwissTransformer().transform(coords)
+    assert lv95[0].tolist() == [2600000., 1200000., 450.]
+    assert np.isnan(lv95[1]).all()
+    assert np.array_equal(prj.SwissTransformer(inverse=True).transform(lv95), coords, equal_nan=True)
+
+
+def test_swisstransformer_mesh():
+    coords = np.array([[650000., 250000.], [700000., 300000.], [600000., 300000.], [800000., 200000.]])
+    lv95 = prj.SwissTransformer(mesh=_MESH).transform(coords)
+    # The center lies on the shared edge, halfway between the fixed node and the shifted node
+    assert np.allclose(lv95[:3], [[2650000.5, 1249999.75], [2700001., 1299999.5], [2600000., 1300000.]])
+    # Points outside of the mesh are not transformed
+    assert np.isnan(lv95[3]).all()
+    assert np.allclose(prj.SwissTransformer(True, _MESH).transform(lv95[:3]), coords[:3])
+
+
+def test_swisstransformer_bad_mesh():
+    with pytest.raises(ValueError):
+        prj.SwissTransformer(mesh=(_LV03, _LV95[:3], _MESH[2]))
+
+
+def test_incomplete_transformer():
+    class Incomplete(prj._BaseTransformer):
+        def transform(self, coords):
+            return coords
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_get_transformer_cached(monkeypatch):
+    monkeypatch.setattr(prj, '_TRANSFORMERS', {})
+    transformer = prj.get_transformer(prj.WKID_LV95, prj.WKID_LV03, prj.TRANSFORMATION_LV_OFFSET)
+    assert isinstance(transformer, prj.SwissTransformer)
+    assert transformer.spatial_reference == prj.WKID_LV03
+    assert prj.get_transformer(prj.WKID_LV95, prj.WKID_LV03, prj.TRANSFORMATION_LV_OFFSET) is transformer
+    with pytest.raises(ValueError):
+        prj.get_transformer(prj.WKID_LV95, 4326, prj.TRANSFORMATION_LV_OFFSET)
+
+
+def test_transformer(monkeypatch):
+    monkeypatch.setattr(prj, '_TRANSFORMERS', {})
+    calls = []
+
+    def as_shape(data, esri_json):
+        # Fake projection: shift all points by 1 unit
+        calls.append(len(data['points']))
+        points = [[x + 1, y + 1] for x, y in data['points']]
+        return SimpleNamespace(projectAs=lambda *args: SimpleNamespace(JSON=json.dumps({'points': points})))
+
+    monkeypatch.setattr(arcpy, 'AsShape', as_shape)
+    monkeypatch.setattr(arcpy, 'ListTransformations', lambda *args: ['CH1903_To_WGS_1984_1'])
+    monkeypatch.setattr(prj, '_PROJECT_CHUNK', 2)
+
+    transformer = prj.get_transformer(prj.WKID_LV03, 4326)
+    assert transformer.transformation == 'CH1903_To_WGS_1984_1'
+    assert prj.get_transformer(prj.WKID_LV03, 4326) is transformer
+    result = transformer.transform([[0., 0.], [np.nan, 0.], [1., 1.], [2., 2.]])
+    assert np.array_equal(result, [[1., 1.], [np.nan, np.nan], [2., 2.], [3., 3.]], equal_nan=True)
+    assert calls == [2, 1]
+
+
+def test_transform_rows(monkeypatch):
+    monkeypatch.setattr(arcpy, 'AsShape', lambda data, esri_json: data)
+    rows = [({'paths': [[[600000., 200000.], [600010., 200000.]]]}, 1), (None, 2)]
+    result = list(prj.SwissTransformer().transform_rows(rows, batch_size=1))
+    assert result[0] == [{'paths': [[[2600000., 1200000.], [2600010., 1200000.]]],
+                          'spatialReference': {'wkid': prj.WKID_LV95}}, 1]
+    assert result[1] == [None, 2]
@@ -0,0 +1,97 @@
+# coding: utf-8
+#
+# Copyright 2019 Geocom Informatik AG / VertiGIS
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from gpf.tools.spatialindex import SpatialIndex
+
+
+def _random_extents(num, seed):
+    rng = np.random.default_rng(seed)
+    xy = rng.random((num, 2)) * 1000
+    return np.hstack((xy, xy + rng.random((num, 2)) * 20))
+
+
+def _brute_force(a, b):
+    return ((a[:, None, 0] <= b[None, :, 2]) & (b[None, :, 0] <= a[:, None, 2]) &
+            (a[:, None, 1] <= b[None, :, 3]) & (b[None, :, 1] <= a[:, None, 3]))
+
+
+@pytest.mark.parametrize('num', [0, 1, 4, 5, 100, 2000])
+def test_query(num):
+    extents = _random_extents(num, num)
+    index = SpatialIndex.from_extents(extents, np.arange(num) + 10, node_capacity=4)
+    assert len(index) == num
+    for window in _random_extents(25, 1) + (0, 0, 100, 100):
+        expected = np.nonzero(_brute_force(extents, window[None])[:, 0])[0] + 10
+        assert sorted(index.query(*window).tolist()) == expected.tolist()
+    if num:
+        assert index.extent == (*extents[:, :2].min(axis=0), *extents[:, 2:].max(axis=0))
+    else:
+        assert index.extent is None
+
+
+def test_query_extent():
+    index = SpatialIndex.from_extents([(0, 0, 1, 1), (5, 5, 6, 6)], [1, 2])
+    assert index.query(SimpleNamespace(XMin=1, YMin=1, XMax=2, YMax=2)).tolist() == [1]
+    with pytest.raises(ValueError):
+        index.query(1, 2)
+    with pytest.raises(ValueError):
+        SpatialIndex.from_extents([(0, 0, 1, 1)], [1, 2])
+
+
+@pytest.mark.parametrize('num', [0, 1, 50, 1500])
+def test_join(num):
+    a, b = _random_extents(num, 2), _random_extents(700, 3)
+    index_a, index_b = SpatialIndex.from_extents(a, node_capacity=8), SpatialIndex.from_extents(b)
+    expected = sorted(map(tuple, np.argwhere(_brute_force(a, b)).tolist()))
+    assert sorted(map(tuple, index_a.join(index_b).tolist())) == expected
+    assert sorted(map(tuple, index_b.join(index_a)[:, ::-1].tolist())) == expected
+
+
+def test_save_load(tmp_path):
+    extents = _random_extents(500, 4)
+    index = SpatialIndex.from_extents(extents)
+    path = str(tmp_path / 'index.npy')
+    index.save(path)
+    loaded = SpatialIndex.load(path)
+    assert isinstance(loaded._rows, np.memmap)
+    assert len(loaded) == 500
+    assert loaded.query(100, 100, 300, 300).tolist() == index.query(100, 100, 300, 300).tolist()
+    assert loaded.join(index).tolist() == index.join(index).tolist()
+
+    np.save(path, extents)
+    with pytest.raises(ValueError):
+        SpatialIndex.load(path)
+
+
+def test_feature_class(mocker):
+    def shape(xmin, ymin, xmax, ymax):
+        return SimpleNamespace(extent=SimpleNamespace(XMin=xmin, YMin=ymin, XMax=xmax, YMax=ymax))
+
+    rows = [(1, shape(0, 0, 1, 1)), (2, None), (3, shape(2, 2, 4, 4))]
+    cursor = mocker.patch('gpf.tools.spatialindex._cursors.SearchCursor')
+    cursor.return_value.__enter__.return_value = iter(rows)
+    index = SpatialIndex('test.gdb/parcels')
+    assert len(index) == 2
+    assert sorted(index.query(0.5, 0.5, 3, 3).tolist()) == [1, 3]
+
+    cursor.side_effect = RuntimeError('cannot open')
+    with pytest.raises(RuntimeError):
+        SpatialIndex('test.gdb/parcels')